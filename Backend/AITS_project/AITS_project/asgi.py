@@ -3,6 +3,12 @@ ASGI config for AITS_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The notification event stream (/api/notifications/stream/) and the async
+read endpoints under /api/async/ (issues.async_views) are async views and
+need this entry point, e.g.:
+
+    gunicorn AITS_project.asgi:application -k uvicorn.workers.UvicornWorker
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
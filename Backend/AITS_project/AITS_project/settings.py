@@ -1,5 +1,6 @@
 # This is a partial settings file with the relevant configurations
 import os
+import tempfile
 from datetime import timedelta
 from pathlib import Path
 
@@ -34,8 +35,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so its timings cover the whole chain (see issues.metrics)
+    'issues.middleware.MetricsMiddleware',
+    # Only loaded when QUERY_DETECTOR is enabled
+    'issues.middleware.QueryDetectorMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # WhiteNoiseMiddleware, able to run async so that async views stay on the event loop
+    'issues.middleware.AsyncWhiteNoiseMiddleware',
+    # Lets issues.routers send read-only requests to a replica
+    'issues.middleware.ReadReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -66,24 +74,141 @@ TEMPLATES = [
 WSGI_APPLICATION = 'AITS_project.wsgi.application'
 
 # Database
+# SQLite connection profiles (see issues.sqlite), picked with SQLITE_PROFILE.
+# 'concurrent' is for several worker processes: WAL lets readers run while one
+# writer commits, synchronous=NORMAL is durable in WAL mode apart from the
+# last commits on power loss, and the mmap and page cache sizes keep hot pages
+# in memory. Write transactions BEGIN IMMEDIATE so a writer waits for the lock
+# up front (for up to 'timeout' seconds) instead of failing when it tries to
+# upgrade a read lock. 'rollback' is Django's default setup.
+SQLITE_PROFILES = {
+    'rollback': {},
+    'concurrent': {
+        'init_command': (
+            'PRAGMA journal_mode=WAL;'
+            'PRAGMA synchronous=NORMAL;'
+            'PRAGMA mmap_size=268435456;'
+            'PRAGMA cache_size=-65536;'
+            'PRAGMA temp_store=MEMORY'
+        ),
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': 20,
+    },
+}
+SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'concurrent')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': SQLITE_PROFILES[SQLITE_PROFILE],
+        # Keep each worker's connection (and its page cache) between requests
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# Django cache used by the per-user response cache (issues.response_cache) and
+# the read replica router's marks (issues.routers).
+# locmem is per process; point CACHE_BACKEND at
+# django.core.cache.backends.filebased.FileBasedCache (with CACHE_LOCATION a
+# directory) or a shared server so that several workers share entries
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'aits-default'),
     }
 }
 
+# Read replicas: DATABASE_REPLICAS lists SQLite files kept as copies of the
+# primary by `manage.py sync_replica`, as aliases replica1, replica2, ...
+# Tests read them through the primary's connection.
+for number, name in enumerate(filter(None, os.environ.get('DATABASE_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'NAME': name.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Safe-method requests to READ_VIEWS read from one of REPLICAS; a user's reads
+# stay on the primary for STICKY_SECONDS after they write (see issues.routers).
+# That mark lives in the cache, which with a per-process backend (locmem) only
+# the worker that handled the write sees: the user's next read could go to a
+# replica that has not caught up yet. So replicas are read from by default only
+# with a shared backend; REPLICA_ROUTING=1 forces it on, which with locmem is
+# only correct for a single worker process.
+REPLICA_ROUTING = os.environ.get(
+    'REPLICA_ROUTING', '0' if CACHE_BACKEND in PROCESS_LOCAL_CACHES else '1',
+) == '1'
+DATABASE_ROUTERS = ['issues.routers.ReadReplicaRouter']
+DATABASE_ROUTING = {
+    'REPLICAS': [alias for alias in DATABASES if alias != 'default'] if REPLICA_ROUTING else [],
+    'READ_VIEWS': [
+        'issues.views.IssueViewSet',
+        'issues.views.DashboardView',
+        'issues.views.NotificationViewSet',
+        'issues.views.UserListView',
+        'issues.async_views',
+    ],
+    'STICKY_SECONDS': 5,
+}
+
+# Request metrics served at /metrics (see issues.metrics). Each process writes
+# its figures to DIRECTORY every FLUSH_INTERVAL seconds; all workers on the host
+# must share it. BUCKETS are the latency histogram bounds in seconds. With TOKEN
+# set, scrapes must send `Authorization: Bearer <TOKEN>`; without it only
+# loopback clients may scrape, which behind a local reverse proxy is everyone,
+# so recording is on by default only once a token is set.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+METRICS = {
+    'ENABLED': os.environ.get('METRICS_ENABLED', '1' if METRICS_TOKEN else '0') == '1',
+    'DIRECTORY': os.environ.get('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'aits-metrics')),
+    'BUCKETS': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    'FLUSH_INTERVAL': 5,
+    'TOKEN': METRICS_TOKEN,
+}
+
+# N+1 and slow-query detection for development and test runs (see
+# issues.query_detector), off unless QUERY_DETECTOR=log or QUERY_DETECTOR=raise
+# is set in the environment. A SELECT template repeated REPEAT_THRESHOLD times
+# in one request or test, or a query taking SLOW_QUERY_MS, is reported. IGNORE
+# lists regexes of query templates never to report.
+QUERY_DETECTOR = {
+    'ENABLED': os.environ.get('QUERY_DETECTOR', '') in ('log', 'raise'),
+    'ACTION': os.environ.get('QUERY_DETECTOR') or 'log',
+    'REPEAT_THRESHOLD': 5,
+    'SLOW_QUERY_MS': 100,
+    'IGNORE': [],
+}
+
+# Write requests on SQLite that still find the database locked after the busy
+# timeout are rolled back and run again up to RETRIES times, waiting BACKOFF
+# seconds (doubled per attempt, with jitter) in between
+SQLITE_WRITE_RETRY = {
+    'RETRIES': 3,
+    'BACKOFF': 0.05,
+}
+
 # Custom user model
 AUTH_USER_MODEL = 'issues.User'
 
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'issues.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # Cursor pagination on (created_at, id); clients may ask for ?page_size= up to
+    # KeysetPagination.max_page_size
+    'DEFAULT_PAGINATION_CLASS': 'issues.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
 }
 
 # JWT settings
@@ -102,6 +227,55 @@ SIMPLE_JWT = {
     'TOKEN_TYPE_CLAIM': 'token_type',
 }
 
+# Notification fan-out: 'inline' writes in the request, 'thread' writes on a local
+# worker pool after the triggering transaction commits, 'queue' enqueues a job
+# for `manage.py runworker`
+NOTIFICATION_FANOUT = {
+    'MODE': os.environ.get('NOTIFICATION_FANOUT_MODE', 'inline'),
+    'BATCH_SIZE': 500,
+    'WORKERS': 2,
+}
+
+# In-process cache of authenticated users (issues.authentication): most entries
+# per process and seconds before a row is re-read
+AUTH_USER_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': 300,
+}
+
+# Colleges, course units and role fields (issues.reference): seconds a process
+# trusts its snapshot, and the browser/proxy cache lifetime of the responses
+REFERENCE_DATA = {
+    'TTL': 300,
+    'MAX_AGE': 86400,
+}
+
+# Response cache for the dashboard, issue stats and issue/comment lists: seconds
+# an entry lives, and how long a request waits for another one already
+# computing the same entry before computing it itself.
+# A write invalidates entries by bumping versions in the cache, which only the
+# worker that handled it sees when the backend is per process (locmem): other
+# gunicorn/uvicorn workers would keep serving stale responses for up to
+# TIMEOUT. So it is on by default only with a shared backend (Redis, Memcached,
+# file or database cache). RESPONSE_CACHE_ENABLED=1 forces it on, which with
+# locmem is only correct for a single worker process.
+RESPONSE_CACHE = {
+    'ENABLED': os.environ.get(
+        'RESPONSE_CACHE_ENABLED', '0' if CACHE_BACKEND in PROCESS_LOCAL_CACHES else '1',
+    ) == '1',
+    'TIMEOUT': 300,
+    'LOCK_TIMEOUT': 10,
+    'LOCK_WAIT': 2.0,
+}
+
+# Bulk user/issue import (`manage.py import_data`, /api/import/<kind>/): rows per
+# bulk insert, processes hashing passwords (0 = in-process), errors reported in full
+BULK_IMPORT = {
+    'CHUNK_SIZE': 500,
+    'HASH_WORKERS': 2,
+    'MAX_ERRORS': 1000,
+}
+
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True  # For development only, restrict in production
 
@@ -2,10 +2,12 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from issues.metrics import metrics_view
 # main project refernce route
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('issues.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 if settings.DEBUG:
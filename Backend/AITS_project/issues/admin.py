@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, Issue, Comment, Notification   
+from .models import User, Issue, Comment, Notification, Job, College, CourseUnit
 # registering and creating users roles
 class CustomUserAdmin(UserAdmin): 
     model = User
@@ -41,7 +41,20 @@ class NotificationAdmin(admin.ModelAdmin):
     search_fields = ('message',)
     date_hierarchy = 'created_at'  
 
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'run_after', 'locked_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('last_error',)
+
+class ReferenceDataAdmin(admin.ModelAdmin):
+    list_display = ('name', 'position', 'is_active')
+    list_editable = ('position', 'is_active')
+    search_fields = ('name',)
+
 admin.site.register(User, CustomUserAdmin)
 admin.site.register(Issue, IssueAdmin) 
 admin.site.register(Comment) 
 admin.site.register(Notification, NotificationAdmin) 
+admin.site.register(Job, JobAdmin)
+admin.site.register(College, ReferenceDataAdmin)
+admin.site.register(CourseUnit, ReferenceDataAdmin)
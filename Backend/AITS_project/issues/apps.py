@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 # project app
 class IssuesConfig(AppConfig): 
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'issues' 
+
+    def ready(self):
+        # Connect signal receivers and register job tasks
+        from . import authentication, counters, metrics, notifications, reference, response_cache, search  # noqa: F401
+
+        post_migrate.connect(search.create_index_tables, sender=self)
+        post_migrate.connect(reference.seed, sender=self)
@@ -0,0 +1,162 @@
+"""
+Native async versions of the read endpoints, served under ``/api/async/``.
+
+Under the ASGI entry point (``AITS_project.asgi``) these run on the event
+loop with Django's async ORM. A request waiting on the database does not
+hold a worker, so one worker process keeps serving other requests in the
+meantime. Under WSGI they still work, but Django runs each one in its own
+event loop.
+
+Each view returns the same JSON body as its DRF counterpart, with the same
+JWT authentication, role scoping, filters, keyset pagination and conditional
+GET. They skip DRF's request wrapping, content negotiation and permission
+classes, all of which run synchronously. See ``manage.py bench_asgi`` for
+throughput under concurrent clients.
+"""
+import functools
+
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from . import counters, fast_serializers
+from .authentication import CachedJWTAuthentication
+from .conditional import conditional_response
+from .filters import IssueFilter
+from .models import Issue, IssueCounter, Notification, User
+from .pagination import KeysetPagination
+
+_renderer = JSONRenderer()
+
+
+def json_response(data, status=200):
+    """The body DRF's JSONRenderer would produce for ``data``"""
+    return HttpResponse(_renderer.render(data), status=status, content_type='application/json')
+
+
+def async_api_view(view):
+    """Authenticate the Bearer token, then answer API errors as DRF's exception handler would"""
+    @require_GET
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            result = await CachedJWTAuthentication().aauthenticate(request)
+            if result is None:
+                raise exceptions.NotAuthenticated()
+            request.user = result[0]
+            return await view(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return _error_response(exc)
+    return wrapper
+
+
+def _error_response(exc):
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    response = json_response(data, status=exc.status_code)
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        response['WWW-Authenticate'] = 'Bearer realm="api"'
+        response.status_code = 401
+    return response
+
+
+async def _page(request, queryset, serializer, keyset, validator_fields):
+    """A keyset-paginated, conditional list response, as ConditionalGetMixin.list"""
+    paginator = KeysetPagination()
+    queryset = paginator.seek(
+        serializer.queryset(queryset, *validator_fields), Request(request), keyset=keyset
+    )
+    rows = paginator.take([row async for row in queryset])
+    return conditional_response(
+        request, rows, (paginator.has_next, paginator.has_previous),
+        lambda: json_response(paginator.get_paginated_data(serializer.serialize(rows))), validator_fields,
+    )
+
+
+@async_api_view
+async def issue_list(request):
+    issue_filter = IssueFilter(request.GET)
+    queryset = issue_filter.filter_queryset(Issue.objects.visible_to(request.user))
+    return await _page(
+        request, queryset, fast_serializers.issues, issue_filter.keyset, ('pk', 'updated_at')
+    )
+
+
+@async_api_view
+async def issue_detail(request, pk):
+    queryset = fast_serializers.issues.queryset(Issue.objects.visible_to(request.user).filter(pk=pk))
+    row = await queryset.afirst()
+    if row is None:
+        raise exceptions.NotFound("No Issue matches the given query.")
+    return conditional_response(
+        request, [row], (), lambda: json_response(fast_serializers.issues.serialize([row])[0]),
+        ('pk', 'updated_at'), 'updated_at',
+    )
+
+
+@async_api_view
+async def issue_stats(request):
+    user = request.user
+    counts = await counters.acounts_by_status(*counters.visible_terms(user))
+    stats = {
+        'total': sum(counts.values()),
+        'by_status': {status: count for status, count in counts.items() if count},
+    }
+    if user.role == User.ACADEMIC_REGISTRAR:
+        stats['by_college'] = {
+            college or 'Unknown': count for college, count in (await counters.acollege_totals()).items()
+        }
+    return json_response(stats)
+
+
+@async_api_view
+async def notification_list(request):
+    queryset = Notification.objects.filter(user=request.user)
+    return await _page(
+        request, queryset, fast_serializers.notifications, ('created_at', True), ('pk', 'is_read')
+    )
+
+
+@async_api_view
+async def unread_count(request):
+    return json_response({'unread': await Notification.objects.filter(user=request.user, is_read=False).acount()})
+
+
+async def _recent(queryset):
+    serializer = fast_serializers.issues
+    return serializer.serialize([row async for row in serializer.queryset(queryset.order_by('-created_at')[:5])])
+
+
+@async_api_view
+async def dashboard(request):
+    """DashboardView, field for field"""
+    user = request.user
+    data = {
+        'user': {
+            'id': user.id,
+            'name': user.get_full_name(),
+            'role': user.role,
+            'college': user.college
+        }
+    }
+    if user.role == User.STUDENT:
+        data['issues'] = counters.breakdown(
+            await counters.acounts_by_status((IssueCounter.CREATOR, str(user.pk), 1))
+        )
+        data['recent_issues'] = await _recent(Issue.objects.filter(created_by=user))
+    elif user.role == User.LECTURER:
+        data['assigned_issues'] = counters.breakdown(
+            await counters.acounts_by_status((IssueCounter.ASSIGNEE, str(user.pk), 1))
+        )
+        data['recent_assigned'] = await _recent(Issue.objects.filter(assigned_to=user))
+    elif user.role == User.ACADEMIC_REGISTRAR:
+        data['all_issues'] = counters.breakdown(
+            await counters.acounts_by_status((IssueCounter.GLOBAL, '', 1))
+        )
+        data['college_stats'] = [
+            {'college': college, 'count': count} for college, count in await counters.acollege_breakdown()
+        ]
+        data['unassigned_issues'] = await _recent(Issue.objects.filter(assigned_to__isnull=True))
+    data['unread_notifications'] = await Notification.objects.filter(user=user, is_read=False).acount()
+    return json_response(data)
@@ -0,0 +1,164 @@
+"""
+JWT authentication that does not read the users table on every request.
+
+``CachedJWTAuthentication`` resolves the token's user through ``user_cache``,
+a bounded LRU of user rows per process. Each entry expires after
+``AUTH_USER_CACHE['TTL']`` seconds, and User post_save/post_delete drop it
+straight away. Every request gets its own copy of the cached row, so
+changes one request makes to ``request.user`` are never seen by another.
+
+Misses read the primary database even when the request's other reads go
+to a replica (``routers``), so a user who has just registered or changed
+their password is never judged by a stale copy.
+
+A process only sees its own signals. A user changed in another process or
+by a queryset ``update()`` is picked up when the TTL runs out.
+
+Access tokens also carry the user's ``role`` and ``college`` claims (see
+``with_user_claims``) for clients. Permission checks use the cached user row
+instead, since a claim keeps its value until the token expires.
+"""
+import copy
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import User
+
+CLAIMS = ('role', 'college')
+
+
+def cache_settings():
+    options = {'MAX_SIZE': 10000, 'TTL': 300}
+    options.update(getattr(settings, 'AUTH_USER_CACHE', {}))
+    return options
+
+
+class UserCache:
+    """Thread-safe LRU of user rows by id, each entry valid for ``ttl`` seconds"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        key = str(user_id)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return copy.copy(entry[1])
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, user):
+        key = str(user.pk)
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, copy.copy(user))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self.lock:
+            self.entries.pop(str(user_id), None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+
+user_cache = UserCache(**{key.lower(): value for key, value in cache_settings().items()})
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` with the user looked up in ``user_cache`` first"""
+
+    def get_user(self, validated_token):
+        user_id = self.token_user_id(validated_token)
+        user = user_cache.get(user_id)
+        if user is None:
+            try:
+                user = self.user_model.objects.using(DEFAULT_DB_ALIAS).get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            user_cache.put(user)
+        return self.check_user(user, validated_token)
+
+    async def aauthenticate(self, request):
+        """``authenticate()`` for async views: (user, token) or None"""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = self.token_user_id(validated_token)
+        user = user_cache.get(user_id)
+        if user is None:
+            try:
+                user = await self.user_model.objects.using(DEFAULT_DB_ALIAS).aget(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            user_cache.put(user)
+        return self.check_user(user, validated_token)
+
+    def token_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    def check_user(self, user, validated_token):
+        # The same checks JWTAuthentication makes, applied to cached rows too
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
+
+
+def with_user_claims(access, user):
+    """Re-sign the encoded access token ``access`` with ``user``'s role and college claims"""
+    token = AccessToken(access)
+    for claim in CLAIMS:
+        token[claim] = getattr(user, claim)
+    return str(token)
+
+
+def token_claim(request, claim):
+    """A claim from the request's access token, or None (e.g. session or forced auth)"""
+    token = getattr(request, 'auth', None)
+    if token is None or not hasattr(token, 'get'):
+        return None
+    return token.get(claim)
@@ -0,0 +1,110 @@
+"""
+Bulk issue triage.
+
+``update_issues`` applies one set of changes (assignee, status, priority) to
+many issues in a single transaction: one read of the affected rows, one
+set-based UPDATE, one counter upsert and one batched notification write,
+however many issues are involved. The per-issue work the single-issue
+endpoints do in ``save()`` and the serializer is reproduced from the rows
+read up front.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import counters, response_cache
+from .models import Issue, Notification
+from .notifications import NotificationBatch
+
+MAX_IDS = 5000
+FIELDS = ('assigned_to', 'status', 'priority')
+
+STATUS_LABELS = dict(Issue.STATUS_CHOICES)
+
+
+def update_issues(scope, ids, changes, actor):
+    """
+    Apply ``changes`` (a subset of ``FIELDS``; ``assigned_to`` is a User or
+    None) to the issues in ``scope`` whose ids are listed. Returns a report of
+    which ids were updated, already had these values, or were not found.
+    """
+    ids = list(dict.fromkeys(ids))
+    values = {
+        f'{field}_id' if field == 'assigned_to' else field: getattr(value, 'pk', value)
+        for field, value in changes.items()
+    }
+    with transaction.atomic():
+        rows = {
+            row['pk']: row
+            for row in scope.filter(pk__in=ids).values(
+                'pk', 'title', 'status', 'priority', 'created_by_id', 'assigned_to_id', 'created_by__college'
+            )
+        }
+        changed = [
+            row for row in rows.values() if any(row[column] != value for column, value in values.items())
+        ]
+        if changed:
+            Issue.objects.filter(pk__in=[row['pk'] for row in changed]).update(
+                updated_at=timezone.now(), **values
+            )
+            counters.apply_deltas(_counter_deltas(changed, values))
+            # update() sends no post_save
+            response_cache.bump(*response_cache.issue_change_scopes(*{
+                user_id for row in changed for user_id in (row['created_by_id'], row['assigned_to_id'])
+            }, values.get('assigned_to_id')))
+            _notifications(changed, values, changes.get('assigned_to'), actor).send()
+
+    updated = {row['pk'] for row in changed}
+    return {
+        'updated': [pk for pk in ids if pk in updated],
+        'unchanged': [pk for pk in ids if pk in rows and pk not in updated],
+        'not_found': [pk for pk in ids if pk not in rows],
+    }
+
+
+def _counter_deltas(rows, values):
+    deltas = Counter()
+    for row in rows:
+        old_state = (row['status'], row['created_by_id'], row['assigned_to_id'])
+        new_state = (
+            values.get('status', row['status']), row['created_by_id'],
+            values.get('assigned_to_id', row['assigned_to_id']),
+        )
+        for key in counters.counter_keys(old_state, row['created_by__college']):
+            deltas[key] -= 1
+        for key in counters.counter_keys(new_state, row['created_by__college']):
+            deltas[key] += 1
+    return deltas
+
+
+def _notifications(rows, values, assignee, actor):
+    """The notifications IssueSerializer.update would send for each changed issue"""
+    batch = NotificationBatch()
+    for row in rows:
+        title = row['title']
+        status = values.get('status')
+        assigned_to_id = values.get('assigned_to_id', row['assigned_to_id'])
+        if status is not None and status != row['status']:
+            batch.add(
+                row['created_by_id'], Notification.STATUS_CHANGED, row['pk'],
+                f"Status of your issue '{title}' has been changed to {STATUS_LABELS[status]}"
+            )
+            if assigned_to_id and assigned_to_id != row['created_by_id']:
+                batch.add(
+                    assigned_to_id, Notification.STATUS_CHANGED, row['pk'],
+                    f"Status of issue '{title}' has been changed to {STATUS_LABELS[status]}"
+                )
+        if 'assigned_to_id' in values and assigned_to_id != row['assigned_to_id']:
+            if assignee is not None:
+                batch.add(
+                    assignee, Notification.ASSIGNED, row['pk'],
+                    f"Issue '{title}' has been assigned to you by {actor.get_full_name()}"
+                )
+            if row['created_by_id'] != actor.pk:
+                batch.add(
+                    row['created_by_id'], Notification.ISSUE_UPDATED, row['pk'],
+                    f"Your issue '{title}' has been assigned to "
+                    f"{assignee.get_full_name() if assignee else 'no one'}"
+                )
+    return batch
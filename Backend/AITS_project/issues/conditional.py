@@ -0,0 +1,83 @@
+"""
+Conditional GET for the list and detail endpoints.
+
+``ConditionalGetMixin`` works out a validator from the rows a request has
+already loaded, before anything is serialized:
+
+- for a list, an ETag over the page's row count and each row's
+  ``validator_fields``, plus whether further pages exist;
+- for a detail, the same for the one row, and ``Last-Modified`` from its
+  ``last_modified_field``.
+
+Lists carry no ``Last-Modified``: deleting a row leaves the newest timestamp
+on the page where it was, so ``If-Modified-Since`` would answer 304 for a
+stale page. For the same reason a view whose rows change without touching
+``last_modified_field`` sets it to None.
+
+When the client's ``If-None-Match`` or ``If-Modified-Since`` still matches,
+the view answers 304 with no serialization. An unchanged poll therefore
+costs the indexed page query and nothing more. Responses carry
+``Cache-Control: private, no-cache``, so browsers keep their copy but check
+it with the server before each use.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+class ConditionalGetMixin:
+    # Bumped by every change to a row's representation, or None
+    last_modified_field = 'updated_at'
+    # Per-row values that change whenever the row's representation does
+    validator_fields = ('pk', 'updated_at')
+    # A FastSerializer producing the same list output as serializer_class from values_list rows
+    fast_serializer = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.fast_serializer is not None:
+            queryset = self.fast_serializer.queryset(queryset, *self.validator_fields)
+        page = self.paginate_queryset(queryset)
+        rows = list(queryset) if page is None else page
+
+        def render():
+            if self.fast_serializer is not None:
+                data = self.fast_serializer.serialize(rows)
+            else:
+                data = self.get_serializer(rows, many=True).data
+            return Response(data) if page is None else self.get_paginated_response(data)
+
+        links = (getattr(self.paginator, 'has_next', None), getattr(self.paginator, 'has_previous', None))
+        return conditional_response(request, rows, links, render, self.validator_fields)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return conditional_response(
+            request, [instance], (), lambda: Response(self.get_serializer(instance).data),
+            self.validator_fields, self.last_modified_field,
+        )
+
+
+def conditional_response(request, rows, extra, render, validator_fields, last_modified_field=None):
+    """
+    304 if the client's copy of ``rows`` is current, otherwise ``render()``,
+    with validators; ``last_modified_field`` only for a single row
+    """
+    last_modified = getattr(rows[0], last_modified_field) if last_modified_field and rows else None
+    state = [tuple(getattr(row, field) for field in validator_fields) for row in rows]
+    # The URL (page, filters) and caller are part of what the body depends on
+    key = repr((request.user.pk, request.get_full_path(), len(rows), state, extra))
+    etag = f'W/"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+    timestamp = int(last_modified.timestamp()) if last_modified is not None else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = render()
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Authorization',))
+    return response
@@ -0,0 +1,284 @@
+"""
+Incrementally maintained issue statistics.
+
+Every Issue insert, update and delete adjusts ``IssueCounter`` rows keyed by
+scope x status inside the same transaction, so the stats and dashboard
+endpoints read a handful of counter rows instead of counting the Issue table.
+The per-college scope follows the creator's college, the same grouping the
+stats endpoints have always reported. When a user's college changes, their
+issues' college counts move with it (``user_college_changed``); changes that
+bypass ``User.save``, such as ``QuerySet.update``, leave drift for a rebuild. ``manage.py rebuild_issue_counters``
+recomputes the table from the source rows and reports any drift.
+"""
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.db import connections, router, transaction
+from django.db.models import Count, F, Q
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import College, Issue, IssueCounter, User
+
+STATUSES = [status for status, _ in Issue.STATUS_CHOICES]
+
+
+def counter_keys(state, college):
+    """The (scope, key, status) rows an issue in ``state`` contributes one to"""
+    if state is None:
+        return []
+    status, created_by_id, assigned_to_id = state
+    keys = [
+        (IssueCounter.GLOBAL, '', status),
+        (IssueCounter.COLLEGE, college or '', status),
+        (IssueCounter.CREATOR, str(created_by_id), status),
+    ]
+    if assigned_to_id is not None:
+        keys.append((IssueCounter.ASSIGNEE, str(assigned_to_id), status))
+        if assigned_to_id == created_by_id:
+            keys.append((IssueCounter.SELF_ASSIGNED, str(created_by_id), status))
+    return keys
+
+
+def load_state(pk, for_update=False):
+    """
+    The stored ``counter_state`` of issue ``pk``; ``for_update`` locks the row
+    where the database supports it (SQLite's write lock covers the database)
+    """
+    queryset = Issue.objects.filter(pk=pk)
+    if for_update:
+        queryset = queryset.select_for_update()
+    row = queryset.values_list('status', 'created_by_id', 'assigned_to_id').first()
+    return tuple(row) if row else None
+
+
+def record_change(old_state, new_state, college):
+    """Move one issue's contribution from ``old_state`` to ``new_state``"""
+    if old_state == new_state:
+        return
+    deltas = Counter()
+    for key in counter_keys(old_state, college):
+        deltas[key] -= 1
+    for key in counter_keys(new_state, college):
+        deltas[key] += 1
+    apply_deltas(deltas)
+
+
+def apply_deltas(deltas):
+    """
+    Add ``{(scope, key, status): delta}`` to the counters with a single
+    ``INSERT ... ON CONFLICT DO UPDATE`` (SQLite 3.24+ and PostgreSQL).
+    """
+    rows = [(scope, key, status, delta) for (scope, key, status), delta in deltas.items() if delta]
+    if not rows:
+        return
+    connection = connections[router.db_for_write(IssueCounter)]
+    table = connection.ops.quote_name(IssueCounter._meta.db_table)
+    placeholders = ', '.join(['(%s, %s, %s, %s)'] * len(rows))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ("scope", "key", "status", "count") VALUES {placeholders} '
+            f'ON CONFLICT ("scope", "key", "status") DO UPDATE SET "count" = {table}."count" + excluded."count"',
+            [value for row in rows for value in row],
+        )
+
+
+@receiver(post_delete, sender=Issue)
+def issue_deleted(sender, instance, **kwargs):
+    # Runs inside the deletion's transaction, like the save path in Issue.save
+    state = getattr(instance, '_counted_state', None) or instance.counter_state()
+    record_change(state, None, instance.created_by.college)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    # Their created issues were cascaded above; assigned ones were set to NULL
+    # without signals, so drop the per-user rows wholesale
+    IssueCounter.objects.filter(
+        scope__in=[IssueCounter.ASSIGNEE, IssueCounter.CREATOR, IssueCounter.SELF_ASSIGNED],
+        key=str(instance.pk),
+    ).delete()
+
+
+@receiver(pre_save, sender=User)
+def user_college_loading(sender, instance, raw=False, using=None, update_fields=None, **kwargs):
+    if raw or instance.pk is None or (update_fields is not None and 'college' not in update_fields):
+        return
+    instance._stored_college = (
+        User.objects.using(using).filter(pk=instance.pk).values_list('college', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=User)
+def user_college_changed(sender, instance, using=None, **kwargs):
+    """Move the user's created issues from their old college's counters to the new one"""
+    if '_stored_college' not in instance.__dict__:
+        return
+    old, new = instance.__dict__.pop('_stored_college') or '', instance.college or ''
+    if old == new:
+        return
+    deltas = Counter()
+    created = IssueCounter.objects.using(using).filter(scope=IssueCounter.CREATOR, key=str(instance.pk))
+    for status, count in created.values_list('status', 'count'):
+        deltas[(IssueCounter.COLLEGE, old, status)] -= count
+        deltas[(IssueCounter.COLLEGE, new, status)] += count
+    apply_deltas(deltas)
+
+
+def counts_by_status(*terms):
+    """
+    Sum counters for ``(scope, key, sign)`` terms in one query, returning
+    ``{status: count}`` for every status.
+    """
+    queryset, signs = _counter_rows(terms)
+    return _sum_by_status(queryset, signs)
+
+
+async def acounts_by_status(*terms):
+    """``counts_by_status`` for async views"""
+    queryset, signs = _counter_rows(terms)
+    return _sum_by_status([row async for row in queryset], signs)
+
+
+def _counter_rows(terms):
+    condition = Q()
+    signs = {}
+    for scope, key, sign in terms:
+        condition |= Q(scope=scope, key=key)
+        signs[(scope, key)] = sign
+    return IssueCounter.objects.filter(condition).values_list('scope', 'key', 'status', 'count'), signs
+
+
+def _sum_by_status(rows, signs):
+    counts = dict.fromkeys(STATUSES, 0)
+    for scope, key, status, count in rows:
+        counts[status] = counts.get(status, 0) + signs[(scope, key)] * count
+    return counts
+
+
+def visible_terms(user):
+    """Counter terms for the issues ``user`` can see, following IssueViewSet's role rules"""
+    if user.role in (User.ADMIN, User.ACADEMIC_REGISTRAR):
+        return [(IssueCounter.GLOBAL, '', 1)]
+    if user.role == User.LECTURER:
+        # Assigned OR created: issues that are both are subtracted once
+        return [
+            (IssueCounter.ASSIGNEE, str(user.pk), 1),
+            (IssueCounter.CREATOR, str(user.pk), 1),
+            (IssueCounter.SELF_ASSIGNED, str(user.pk), -1),
+        ]
+    return [(IssueCounter.CREATOR, str(user.pk), 1)]
+
+
+def visible_counts(user):
+    """Per-status counts of the issues ``user`` can see"""
+    return counts_by_status(*visible_terms(user))
+
+
+def breakdown(counts):
+    """Dashboard shape of a ``counts_by_status`` result"""
+    data = {'total': sum(counts.values())}
+    data.update((status, counts.get(status, 0)) for status in STATUSES)
+    return data
+
+
+def college_totals():
+    """``{college: total issues}`` by creator college; '' stands for no college"""
+    return _college_totals(_college_rows())
+
+
+async def acollege_totals():
+    """``college_totals`` for async views"""
+    return _college_totals([row async for row in _college_rows()])
+
+
+def _college_rows():
+    return IssueCounter.objects.filter(scope=IssueCounter.COLLEGE).values_list('key', 'count')
+
+
+def _college_totals(rows):
+    totals = Counter()
+    for key, count in rows:
+        totals[key] += count
+    return dict(totals)
+
+
+def college_breakdown():
+    """
+    ``[(college, total issues)]`` in name order for every known college: the
+    reference list plus any college a user has, those without issues as 0.
+    One query; the distinct user colleges come off the User.college index in
+    order and each total is a seek on the counters' unique index.
+    """
+    connection = connections[router.db_for_read(IssueCounter)]
+    quote = connection.ops.quote_name
+    users, college = quote(User._meta.db_table), quote('college')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT names.name, COALESCE((SELECT SUM(counter.{quote("count")}) '
+            f'FROM {quote(IssueCounter._meta.db_table)} counter '
+            f'WHERE counter.{quote("scope")} = %s AND counter.{quote("key")} = names.name), 0) FROM ('
+            f'SELECT {college} AS name FROM {users} WHERE {college} > %s GROUP BY {college} '
+            f'UNION ALL SELECT {quote("name")} FROM {quote(College._meta.db_table)} '
+            f'WHERE {quote("name")} NOT IN (SELECT {college} FROM {users} WHERE {college} > %s)'
+            ') names',
+            [IssueCounter.COLLEGE, '', ''],
+        )
+        # A handful of rows: sorted here rather than with a temporary index
+        return sorted(cursor.fetchall())
+
+
+async def acollege_breakdown():
+    """``college_breakdown`` for async views"""
+    return await sync_to_async(college_breakdown)()
+
+
+def compute_from_source():
+    """Recount every counter from the Issue table, keyed like IssueCounter rows"""
+    expected = Counter()
+    grouped = [
+        (IssueCounter.GLOBAL, Issue.objects.values('status'), None),
+        (IssueCounter.COLLEGE, Issue.objects.values('status', 'created_by__college'), 'created_by__college'),
+        (IssueCounter.CREATOR, Issue.objects.values('status', 'created_by_id'), 'created_by_id'),
+        (
+            IssueCounter.ASSIGNEE,
+            Issue.objects.filter(assigned_to__isnull=False).values('status', 'assigned_to_id'),
+            'assigned_to_id',
+        ),
+        (
+            IssueCounter.SELF_ASSIGNED,
+            Issue.objects.filter(assigned_to=F('created_by')).values('status', 'created_by_id'),
+            'created_by_id',
+        ),
+    ]
+    for scope, queryset, key_field in grouped:
+        for row in queryset.annotate(n=Count('id')).order_by():
+            key = '' if key_field is None or row[key_field] is None else str(row[key_field])
+            expected[(scope, key, row['status'])] += row['n']
+    return expected
+
+
+def verify():
+    """List ``(scope, key, status, stored, expected)`` for every counter that has drifted"""
+    expected = compute_from_source()
+    stored = {
+        (scope, key, status): count
+        for scope, key, status, count in IssueCounter.objects.values_list('scope', 'key', 'status', 'count')
+    }
+    mismatches = []
+    for counter_key in sorted(set(expected) | set(stored)):
+        if stored.get(counter_key, 0) != expected.get(counter_key, 0):
+            mismatches.append((*counter_key, stored.get(counter_key, 0), expected.get(counter_key, 0)))
+    return mismatches
+
+
+@transaction.atomic
+def rebuild():
+    """Replace the counter table with a fresh recount; returns the number of rows written"""
+    expected = compute_from_source()
+    IssueCounter.objects.all().delete()
+    IssueCounter.objects.bulk_create(
+        IssueCounter(scope=scope, key=key, status=status, count=count)
+        for (scope, key, status), count in expected.items()
+    )
+    return len(expected)
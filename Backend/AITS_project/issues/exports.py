@@ -0,0 +1,132 @@
+"""
+Streaming CSV/NDJSON export of issues and comments.
+
+Rows are read with ``values_list().iterator()``, so the database hands them
+over ``CHUNK_SIZE`` at a time and no model instances are built, and each
+row is formatted as soon as it is read. Output is gathered into blocks of
+about ``BLOCK_SIZE`` bytes before being handed to the server. The header
+block goes out before the first query runs. Memory use stays the same
+whatever the number of rows.
+
+Column names and value formats follow IssueSerializer and CommentSerializer.
+"""
+import csv
+import io
+import json
+
+from asgiref.sync import sync_to_async
+from rest_framework import serializers
+
+from .models import Comment
+
+CSV = 'csv'
+NDJSON = 'ndjson'
+CONTENT_TYPES = {CSV: 'text/csv; charset=utf-8', NDJSON: 'application/x-ndjson'}
+
+CHUNK_SIZE = 2000  # rows per fetch from the database cursor
+BLOCK_SIZE = 64 * 1024  # bytes per block written to the response
+
+ISSUE_COLUMNS = (
+    ('id', 'id'),
+    ('title', 'title'),
+    ('description', 'description'),
+    ('status', 'status'),
+    ('priority', 'priority'),
+    ('created_by', 'created_by_id'),
+    ('created_by_name', ('created_by__first_name', 'created_by__last_name')),
+    ('assigned_to', 'assigned_to_id'),
+    ('assigned_to_name', ('assigned_to__first_name', 'assigned_to__last_name')),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+    ('course_unit', 'course_unit'),
+    ('college', 'college'),
+)
+
+COMMENT_COLUMNS = (
+    ('id', 'id'),
+    ('issue', 'issue_id'),
+    ('content', 'content'),
+    ('created_by', 'created_by_id'),
+    ('created_by_name', ('created_by__first_name', 'created_by__last_name')),
+    ('created_at', 'created_at'),
+)
+
+_datetime_field = serializers.DateTimeField()
+
+
+def issue_rows(issues, ordering):
+    """``issues`` as export rows; ``ordering`` is an IssueFilter ordering"""
+    descending = ordering.startswith('-')
+    queryset = issues.order_by(ordering, '-pk' if descending else 'pk')
+    return _rows(queryset, ISSUE_COLUMNS)
+
+
+def comment_rows(issues):
+    """Comments on ``issues``, newest issue first and each issue's comments oldest first"""
+    queryset = Comment.objects.order_by('-issue_id', 'created_at', 'id')
+    if issues.query.where:
+        queryset = queryset.filter(issue__in=issues.order_by().values('pk'))
+    return _rows(queryset, COMMENT_COLUMNS)
+
+
+def _rows(queryset, columns):
+    lookups = []
+    for _, source in columns:
+        lookups.extend(source if isinstance(source, tuple) else (source,))
+    names = [name for name, _ in columns]
+
+    def rows():
+        for values in queryset.values_list(*lookups).iterator(chunk_size=CHUNK_SIZE):
+            values = iter(values)
+            row = {}
+            for name, source in columns:
+                if isinstance(source, tuple):
+                    first, last = next(values), next(values)
+                    row[name] = None if first is None else f"{first} {last}".strip()
+                else:
+                    value = next(values)
+                    row[name] = value if not hasattr(value, 'isoformat') else _datetime_field.to_representation(value)
+            yield row
+
+    return names, rows()
+
+
+def render(names, rows, output):
+    """Yield the export as text blocks, starting with the header (CSV) at once"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=names) if output == CSV else None
+    if writer is not None:
+        writer.writeheader()
+        yield _drain(buffer)
+    for row in rows:
+        if writer is not None:
+            writer.writerow(row)
+        else:
+            buffer.write(json.dumps(row))
+            buffer.write('\n')
+        if buffer.tell() >= BLOCK_SIZE:
+            yield _drain(buffer)
+    if buffer.tell():
+        yield _drain(buffer)
+
+
+def _drain(buffer):
+    text = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return text
+
+
+async def as_async(blocks):
+    """
+    Serve a synchronous block iterator from an async iterator. Under ASGI,
+    Django would otherwise collect a synchronous iterator into a list before
+    it sent anything. Every block is read in the thread the view ran in,
+    which is the thread that owns the database connection.
+    """
+    step = sync_to_async(lambda: next(blocks, None))
+    while True:
+        block = await step()
+        if block is None:
+            break
+        yield block
@@ -0,0 +1,155 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .models import Issue
+
+
+class IssueFilter:
+    """
+    Server-side filtering and ordering for issue lists.
+
+    Only the parameters below are accepted, and only in combinations an
+    index serves in keyset order (see Issue.Meta.indexes):
+
+    - each equality filter in ``INDEXED_FILTERS[<ordering column>]`` leads an
+      index on ``(<filter column>, <ordering column>, id)``; further equality
+      filters are checked on the rows that index returns;
+    - date ranges apply only to the ordering column, the keyset itself;
+    - a list of values (``status=pending,resolved``) is one seek per value,
+      merged by ``IssueQuerySet.limited()``.
+
+    Anything else is rejected with a 400 rather than answered with a scan or
+    a sort of the whole table.
+    """
+    CHOICE_FILTERS = {
+        'status': {value for value, _ in Issue.STATUS_CHOICES},
+        'priority': {value for value, _ in Issue.PRIORITY_CHOICES},
+    }
+    EXACT_FILTERS = ('college', 'course_unit')
+    DATE_FILTERS = {
+        'created_after': ('created_at', 'gte'),
+        'created_before': ('created_at', 'lt'),
+        'updated_after': ('updated_at', 'gte'),
+        'updated_before': ('updated_at', 'lt'),
+    }
+    ORDERINGS = ('-created_at', 'created_at', '-updated_at', 'updated_at')
+    # Equality filters each ordering column combines with
+    INDEXED_FILTERS = {
+        'created_at': {'status', 'priority', 'college', 'course_unit', 'assigned'},
+        'updated_at': {'status'},
+    }
+    DEFAULT_ORDERING = '-created_at'
+    # Handled elsewhere: pagination and DRF's format override
+    PASSTHROUGH = ('cursor', 'page_size', 'format')
+
+    def __init__(self, params):
+        self.params = params
+        self.lookups = {}
+        # field -> values that are each sought separately
+        self.branches = {}
+        self.ordering = self.DEFAULT_ORDERING
+        self.errors = {}
+        self.parse()
+        if self.errors:
+            raise ValidationError(self.errors)
+
+    @classmethod
+    def allowed_params(cls):
+        return (
+            set(cls.CHOICE_FILTERS) | set(cls.EXACT_FILTERS) | set(cls.DATE_FILTERS)
+            | {'assigned', 'ordering'} | set(cls.PASSTHROUGH)
+        )
+
+    def parse(self):
+        unknown = set(self.params) - self.allowed_params()
+        for name in sorted(unknown):
+            self.errors[name] = "Unknown filter parameter."
+
+        for name, choices in self.CHOICE_FILTERS.items():
+            values = [
+                value.strip() for raw in self.params.getlist(name) for value in raw.split(',') if value.strip()
+            ]
+            if not values:
+                continue
+            invalid = sorted(set(values) - choices)
+            if invalid:
+                self.errors[name] = f"Invalid choice(s): {', '.join(invalid)}. Expected one of: {', '.join(sorted(choices))}."
+            elif len(set(values)) == 1:
+                self.lookups[name] = values[0]
+            else:
+                self.lookups[f'{name}__in'] = self.branches[name] = sorted(set(values))
+
+        for name in self.EXACT_FILTERS:
+            value = self.params.get(name)
+            if value:
+                self.lookups[name] = value
+
+        assigned = self.params.get('assigned')
+        if assigned is not None:
+            if assigned.lower() not in ('true', 'false'):
+                self.errors['assigned'] = "Expected 'true' or 'false'."
+            else:
+                self.lookups['assigned_to__isnull'] = assigned.lower() == 'false'
+
+        for name, (field, lookup) in self.DATE_FILTERS.items():
+            value = self.params.get(name)
+            if value:
+                moment = self.parse_moment(value, end_of_day=(lookup == 'lt'))
+                if moment is None:
+                    self.errors[name] = "Expected an ISO 8601 date or datetime."
+                else:
+                    self.lookups[f'{field}__{lookup}'] = moment
+
+        ordering = self.params.get('ordering')
+        if ordering:
+            if ordering not in self.ORDERINGS:
+                self.errors['ordering'] = f"Expected one of: {', '.join(self.ORDERINGS)}."
+            else:
+                self.ordering = ordering
+        self.check_indexed()
+
+    def check_indexed(self):
+        """Reject filters no index serves under the requested ordering"""
+        column = self.ordering.lstrip('-')
+        for name in [*self.CHOICE_FILTERS, *self.EXACT_FILTERS, 'assigned']:
+            if self.params.get(name) and name not in self.INDEXED_FILTERS[column] and name not in self.errors:
+                self.errors[name] = f"Cannot be combined with ordering={self.ordering}."
+        for name, (field, _) in self.DATE_FILTERS.items():
+            if self.params.get(name) and field != column and name not in self.errors:
+                self.errors[name] = f"Needs ordering={field} or ordering=-{field}."
+
+    @staticmethod
+    def parse_moment(value, end_of_day=False):
+        """
+        Aware datetime for ``value``; a bare date means the start of that day,
+        or the start of the next one for an exclusive upper bound.
+        """
+        try:
+            moment = parse_datetime(value)
+            if moment is None:
+                day = parse_date(value)
+                if day is None:
+                    return None
+                if end_of_day:
+                    day += timedelta(days=1)
+                moment = datetime.combine(day, time.min)
+        except ValueError:
+            return None
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
+
+    @property
+    def keyset(self):
+        """(field, descending) for KeysetPagination"""
+        return self.ordering.lstrip('-'), self.ordering.startswith('-')
+
+    def filter_queryset(self, queryset):
+        queryset = queryset.filter(**self.lookups)
+        for field, values in self.branches.items():
+            queryset = queryset.branches(*(Q(**{field: value}) for value in values))
+        return queryset
@@ -20,17 +20,12 @@ class CustomUserCreationForm(UserCreationForm):
         cleaned_data = super().clean() 
         role = cleaned_data.get('role') 
         
-        if role == User.STUDENT: 
-            if not cleaned_data.get('student_number'): 
-                self.add_error('student_number', 'Student number is required for students') 
-            if not cleaned_data.get('college'):
-                self.add_error('college', 'College is required for students')
-        else: 
+        if role != User.STUDENT: 
             # Clear student_number for non-students
             cleaned_data['student_number'] = None
-            if role in [User.LECTURER, User.ACADEMIC_REGISTRAR]: 
-                if not cleaned_data.get('college'):
-                    self.add_error('college', 'College is required') 
+        errors = User.role_field_errors(role, cleaned_data.get('student_number'), cleaned_data.get('college'))
+        for field, message in errors.items(): 
+            self.add_error(field, message) 
                 
         return cleaned_data
      
@@ -49,15 +44,9 @@ class CustomUserChangeForm(UserChangeForm):
     def clean(self):
         cleaned_data = super().clean()
         role = cleaned_data.get('role') 
-         
-        if role == User.STUDENT:
-            if not cleaned_data.get('student_number'):
-                self.add_error('student_number', 'Student number is required for students')
-            if not cleaned_data.get('college'):
-                self.add_error('college', 'College is required for students') 
-        elif role in [User.LECTURER, User.ACADEMIC_REGISTRAR]: 
-            if not cleaned_data.get('college'): 
-                self.add_error('college', 'College is required')
+        errors = User.role_field_errors(role, cleaned_data.get('student_number'), cleaned_data.get('college'))
+        for field, message in errors.items():
+            self.add_error(field, message)
                 
         return cleaned_data 
 
@@ -0,0 +1,305 @@
+"""
+Streaming bulk import of users and issues from CSV or NDJSON.
+
+Rows are read one at a time from the file, validated with the same rules
+as registration (``UserImportSerializer``) or issue creation
+(``IssueImportSerializer``), and inserted with ``bulk_create`` once
+``CHUNK_SIZE`` valid rows have accumulated. Checks that need the database
+(unique usernames, the users an issue names) run once per chunk, and
+password hashing is spread over a process pool, shared by every import in
+the process and started with the first one. Invalid rows are reported
+by line number and skipped; every chunk commits on its own, so a bad row
+never undoes the rows around it.
+
+``manage.py import_data`` and the admin-only ``/api/import/<kind>/`` upload
+both go through ``run_import``.
+"""
+import csv
+import io
+import json
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import DatabaseError, transaction
+
+from . import counters, response_cache, search
+from .models import Issue, User
+from .serializers import IssueImportSerializer, UserImportSerializer
+
+CSV = 'csv'
+NDJSON = 'ndjson'
+FORMATS = {'.csv': CSV, '.ndjson': NDJSON, '.jsonl': NDJSON}
+
+
+def import_settings():
+    options = {'CHUNK_SIZE': 500, 'HASH_WORKERS': 2, 'MAX_ERRORS': 1000}
+    options.update(getattr(settings, 'BULK_IMPORT', {}))
+    return options
+
+
+def detect_format(filename):
+    return FORMATS.get(os.path.splitext(filename or '')[1].lower())
+
+
+def read_rows(stream, file_format):
+    """
+    Yield ``(line, row)`` from a text stream, where ``row`` is a dict of the
+    non-empty values or, for a line that cannot be parsed, an error message.
+    """
+    if file_format == CSV:
+        reader = csv.DictReader(stream)
+        for row in reader:
+            if None in row:
+                yield reader.line_num, "More values than header columns."
+                continue
+            yield reader.line_num, _clean(row)
+    else:
+        for line, text in enumerate(stream, start=1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError as exc:
+                yield line, f"Invalid JSON: {exc}"
+                continue
+            if not isinstance(row, dict):
+                yield line, "Expected a JSON object."
+                continue
+            yield line, _clean(row)
+
+
+def _clean(row):
+    # Blank CSV cells mean "not given", not an empty string
+    cleaned = {}
+    for key, value in row.items():
+        if isinstance(value, str):
+            value = value.strip()
+        if key and value not in (None, ''):
+            cleaned[key.strip()] = value
+    return cleaned
+
+
+class ImportReport:
+    def __init__(self, max_errors):
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+        self.max_errors = max_errors
+
+    def error(self, line, errors):
+        self.failed += 1
+        # Keep memory bounded on a file that is wrong throughout
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+class Importer:
+    serializer_class = None
+
+    def __init__(self, chunk_size, report):
+        self.chunk_size = chunk_size
+        self.report = report
+
+    def run(self, rows):
+        pending = []
+        for line, row in rows:
+            if isinstance(row, str):
+                self.report.error(line, {'non_field_errors': [row]})
+                continue
+            serializer = self.serializer_class(data=row)
+            if not serializer.is_valid():
+                self.report.error(line, serializer.errors)
+                continue
+            pending.append((line, serializer.validated_data))
+            if len(pending) >= self.chunk_size:
+                self.flush(pending)
+                pending = []
+        if pending:
+            self.flush(pending)
+
+    def flush(self, pending):
+        rows = self.check(pending)
+        if not rows:
+            return
+        objects = self.build(rows)
+        try:
+            with transaction.atomic():
+                self.insert(objects)
+        except DatabaseError as exc:
+            # Typically a unique value taken by a concurrent write since check()
+            for line, _ in rows:
+                self.report.error(line, {'non_field_errors': [f"Chunk rejected by the database: {exc}"]})
+            return
+        self.report.created += len(objects)
+
+    def check(self, pending):
+        """The ``(line, data)`` rows that pass the per-chunk database checks"""
+        return pending
+
+    def build(self, rows):
+        raise NotImplementedError
+
+    def insert(self, objects):
+        raise NotImplementedError
+
+
+def _init_hash_worker():
+    # Forked workers (the default on Linux) inherit the configured Django;
+    # under the spawn or forkserver start methods they start without it
+    if not apps.ready:
+        django.setup()
+
+
+_hash_pools = {}
+_hash_pools_lock = Lock()
+
+
+def hash_pool(workers):
+    """This process's pool of ``workers`` password hashing processes, started on first use"""
+    with _hash_pools_lock:
+        key = (os.getpid(), workers)
+        if key not in _hash_pools:
+            _hash_pools[key] = ProcessPoolExecutor(max_workers=workers, initializer=_init_hash_worker)
+        return _hash_pools[key]
+
+
+class UserImporter(Importer):
+    serializer_class = UserImportSerializer
+
+    def __init__(self, chunk_size, report, pool=None):
+        super().__init__(chunk_size, report)
+        self.pool = pool
+
+    def check(self, pending):
+        taken = {
+            field: set(User.objects.filter(**{f'{field}__in': [
+                data[field] for _, data in pending if data.get(field)
+            ]}).values_list(field, flat=True))
+            for field in ('username', 'student_number')
+        }
+        rows = []
+        for line, data in pending:
+            errors = {}
+            for field, values in taken.items():
+                value = data.get(field)
+                if value and value in values:
+                    errors[field] = [f"A user with that {field.replace('_', ' ')} already exists."]
+            if errors:
+                self.report.error(line, errors)
+                continue
+            # Later rows in the same chunk clash with this one
+            for field, values in taken.items():
+                if data.get(field):
+                    values.add(data[field])
+            rows.append((line, data))
+        return rows
+
+    def build(self, rows):
+        passwords = [data.pop('password', None) for _, data in rows]
+        if self.pool is not None:
+            hashed = list(self.pool.map(make_password, passwords, chunksize=max(1, len(passwords) // 16)))
+        else:
+            hashed = [make_password(password) for password in passwords]
+        return [User(password=password, **data) for (_, data), password in zip(rows, hashed)]
+
+    def insert(self, objects):
+        # bulk_create sends no post_save: drop cached responses that show users
+        # (colleges, names) here. New users have no issues, so no counter moves.
+        User.objects.bulk_create(objects)
+        response_cache.bump('users')
+
+
+class IssueImporter(Importer):
+    serializer_class = IssueImportSerializer
+    STAFF = (User.LECTURER, User.ACADEMIC_REGISTRAR, User.ADMIN)
+
+    def check(self, pending):
+        names = {data['created_by'] for _, data in pending}
+        names.update(data['assigned_to'] for _, data in pending if data.get('assigned_to'))
+        users = {row['username']: row for row in User.objects.filter(username__in=names).values(
+            'pk', 'username', 'role', 'college'
+        )}
+        rows = []
+        for line, data in pending:
+            errors = {}
+            creator = users.get(data['created_by'])
+            if creator is None:
+                errors['created_by'] = ["No user with this username."]
+            assignee_name = data.get('assigned_to')
+            assignee = users.get(assignee_name) if assignee_name else None
+            if assignee_name and assignee is None:
+                errors['assigned_to'] = ["No user with this username."]
+            elif assignee is not None and assignee['role'] not in self.STAFF:
+                errors['assigned_to'] = ["Can only assign to staff members."]
+            if errors:
+                self.report.error(line, errors)
+                continue
+            data['created_by'] = creator
+            data['assigned_to'] = assignee
+            rows.append((line, data))
+        return rows
+
+    def build(self, rows):
+        issues = []
+        for _, data in rows:
+            creator, assignee = data.pop('created_by'), data.pop('assigned_to')
+            # As IssueSerializer.create: the issue's college defaults to its creator's
+            data.setdefault('college', creator['college'])
+            issue = Issue(created_by_id=creator['pk'], assigned_to_id=assignee and assignee['pk'], **data)
+            issue._creator_college = creator['college']
+            issues.append(issue)
+        return issues
+
+    def insert(self, objects):
+        # bulk_create skips Issue.save() and post_save, so keep the counters and
+        # search index in step here. Imports are historical data: nobody is notified.
+        Issue.objects.bulk_create(objects)
+        deltas = Counter()
+        for issue in objects:
+            state = (issue.status, issue.created_by_id, issue.assigned_to_id)
+            for key in counters.counter_keys(state, issue._creator_college):
+                deltas[key] += 1
+        counters.apply_deltas(deltas)
+        search.index_issues(objects)
+        response_cache.bump(*response_cache.issue_change_scopes(*{
+            user_id for issue in objects for user_id in (issue.created_by_id, issue.assigned_to_id)
+        }))
+
+
+IMPORTERS = {'users': UserImporter, 'issues': IssueImporter}
+
+
+def run_import(kind, stream, file_format, chunk_size=None, workers=None):
+    """
+    Import ``kind`` ('users' or 'issues') rows from the text ``stream``;
+    returns the report as a dict.
+    """
+    options = import_settings()
+    chunk_size = chunk_size or options['CHUNK_SIZE']
+    workers = options['HASH_WORKERS'] if workers is None else workers
+    report = ImportReport(options['MAX_ERRORS'])
+    rows = read_rows(stream, file_format)
+    if kind == 'users' and workers > 0:
+        UserImporter(chunk_size, report, hash_pool(workers)).run(rows)
+    else:
+        IMPORTERS[kind](chunk_size, report).run(rows)
+    return report.as_dict()
+
+
+def text_stream(binary):
+    """Wrap an uploaded or opened binary file for ``read_rows``"""
+    return io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
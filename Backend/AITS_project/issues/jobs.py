@@ -0,0 +1,122 @@
+"""
+Database-backed job queue.
+
+Slow side effects are registered as tasks and enqueued as ``Job`` rows in
+the caller's transaction, so a job exists exactly when the work that caused
+it was committed. ``manage.py runworker`` claims due jobs in batches and runs
+them on a thread or process pool.
+
+Claiming is a single conditional UPDATE that re-checks the claimable
+condition, so concurrent workers never take the same job. A claimed job is
+invisible to other workers until its visibility timeout lapses; if the worker
+dies before finishing, the job is claimed again. Failed jobs are retried with
+exponential backoff until ``max_attempts`` is reached.
+"""
+import logging
+import os
+import random
+import socket
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+BACKOFF_BASE = 5  # seconds
+BACKOFF_MAX = 3600
+
+
+def task(name):
+    """Register a function as a job task under ``name``"""
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def enqueue(name, payload=None, delay=None, max_attempts=5):
+    """Queue ``TASKS[name](**payload)`` to run at least ``delay`` from now"""
+    if name not in TASKS:
+        raise KeyError(f"Unknown job task {name!r}")
+    run_after = timezone.now() + (delay or timedelta(0))
+    return Job.objects.create(name=name, payload=payload or {}, run_after=run_after, max_attempts=max_attempts)
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claimable(now):
+    return Q(status=Job.QUEUED, run_after__lte=now) | Q(status=Job.RUNNING, locked_until__lt=now)
+
+
+def claim(worker, batch_size, visibility_timeout):
+    """Lock up to ``batch_size`` due jobs for ``worker`` and return them with their claim token"""
+    now = timezone.now()
+    candidates = list(
+        Job.objects.filter(claimable(now)).order_by('run_after', 'id').values_list('pk', flat=True)[:batch_size]
+    )
+    if not candidates:
+        return None, []
+    token = f"{worker}:{uuid.uuid4().hex[:12]}"
+    # Re-checking claimable() in the UPDATE makes the claim atomic per row
+    Job.objects.filter(claimable(now), pk__in=candidates).update(
+        status=Job.RUNNING,
+        locked_by=token,
+        locked_until=now + timedelta(seconds=visibility_timeout),
+        attempts=F('attempts') + 1,
+    )
+    return token, list(Job.objects.filter(locked_by=token, status=Job.RUNNING))
+
+
+def backoff(attempts):
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def run(job_id, token):
+    """Run one claimed job and record the outcome; returns the job's new status"""
+    job = Job.objects.filter(pk=job_id, locked_by=token).first()
+    if job is None:
+        return None
+    owned = Job.objects.filter(pk=job.pk, locked_by=token, status=Job.RUNNING)
+    try:
+        with transaction.atomic():
+            TASKS[job.name](**job.payload)
+            # The outcome is only recorded if the claim was not lost to a timeout
+            if owned.update(status=Job.DONE, finished_at=timezone.now(), locked_until=None, last_error=''):
+                return Job.DONE
+            raise _ClaimLost()
+    except _ClaimLost:
+        logger.warning("Job %s outlived its visibility timeout; its result was discarded", job.pk)
+        return None
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception("Job %s (%s) failed on attempt %s", job.pk, job.name, job.attempts)
+        if job.attempts >= job.max_attempts:
+            owned.update(status=Job.FAILED, finished_at=timezone.now(), locked_until=None, last_error=error)
+            return Job.FAILED
+        owned.update(
+            status=Job.QUEUED, run_after=timezone.now() + backoff(job.attempts),
+            locked_until=None, last_error=error,
+        )
+        return Job.QUEUED
+
+
+class _ClaimLost(Exception):
+    pass
+
+
+def purge_finished(older_than):
+    """Delete finished jobs completed before ``older_than`` ago"""
+    cutoff = timezone.now() - older_than
+    deleted, _ = Job.objects.filter(status__in=[Job.DONE, Job.FAILED], finished_at__lt=cutoff).delete()
+    return deleted
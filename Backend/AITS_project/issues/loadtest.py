@@ -0,0 +1,125 @@
+"""
+Helpers for the load-benchmark commands (``bench_asgi``, ``bench_api``).
+
+``start_server`` runs a server command on a free local port and waits until
+it accepts connections. ``drive`` keeps a number of keep-alive client
+connections busy against it for a fixed time and ``summarize`` turns the
+latencies into requests/s and percentiles. Clients are threads in this
+process; they are light next to the server, but on a small machine they
+share its CPU, so compare runs made on the same machine.
+"""
+import http.client
+import json
+import socket
+import statistics
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import CommandError
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def wait_until_listening(port, server, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise CommandError(f"Server exited with status {server.returncode}")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError("Server did not start listening")
+
+
+@contextmanager
+def start_server(command, env):
+    """Run ``command`` (``{port}`` filled in) from BASE_DIR; yields the port once it listens"""
+    port = free_port()
+    server = subprocess.Popen(
+        [part.format(port=port) for part in command], cwd=settings.BASE_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_listening(port, server)
+        yield port
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def get(path, token):
+    return 'GET', path, None, {'Authorization': f'Bearer {token}'}
+
+
+def post_json(path, data):
+    return 'POST', path, json.dumps(data), {'Content-Type': 'application/json'}
+
+
+def drive(port, requests, clients, duration):
+    """
+    Keep ``clients`` keep-alive connections busy for ``duration`` seconds.
+    ``requests`` are ``(method, path, body, headers)`` tuples, as from ``get``
+    and ``post_json``; each client cycles through them from its own offset.
+    Anything but a 200 counts as an error. Returns ``summarize``'s figures.
+    """
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    start = time.monotonic()
+    stop = start + duration
+
+    def client(offset):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        mine, failed, turn = [], 0, offset
+        while time.monotonic() < stop:
+            method, path, body, headers = requests[turn % len(requests)]
+            turn += 1
+            began = time.perf_counter()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    failed += 1
+                    continue
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+                continue
+            mine.append(time.perf_counter() - began)
+        connection.close()
+        with lock:
+            latencies.extend(mine)
+            errors.append(failed)
+
+    threads = [threading.Thread(target=client, args=(offset,)) for offset in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, sum(errors), time.monotonic() - start)
+
+
+def summarize(latencies, errors, elapsed):
+    """Request count, errors, requests/s and p50/p95/p99 latency of successful requests"""
+    if not latencies:
+        return {'requests': 0, 'errors': errors, 'throughput': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0}
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput': len(latencies) / elapsed,
+        'p50_ms': quantiles[49] * 1000,
+        'p95_ms': quantiles[94] * 1000,
+        'p99_ms': quantiles[98] * 1000,
+    }
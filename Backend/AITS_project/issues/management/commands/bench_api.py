@@ -0,0 +1,146 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone as dt_timezone
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from issues import loadtest
+from issues.authentication import with_user_claims
+from issues.management.commands.seed_benchmark import PASSWORD
+from issues.models import Comment, Issue, Notification, User
+
+ENDPOINTS = ['issues/', 'issues/stats/', 'dashboard/', 'notifications/', 'token/']
+ROLES = [User.STUDENT, User.LECTURER, User.ACADEMIC_REGISTRAR]
+# Figures compared between runs, and whether a higher value is better
+FIGURES = [('throughput', True), ('p50_ms', False), ('p95_ms', False), ('p99_ms', False)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the main API endpoints of a gunicorn server on the current database (see seed_benchmark) "
+        "with concurrent clients, as a mix of students, lecturers and registrars, and report requests/s "
+        "and p50/p95/p99 latency per endpoint. --json saves a run; --compare reports the change from a saved one"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=32, help="Concurrent client connections")
+        parser.add_argument('--duration', type=float, default=10.0, help="Seconds per endpoint")
+        parser.add_argument('--workers', type=int, default=2, help="gunicorn worker processes")
+        parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help="Comma-separated subset of the endpoints")
+        parser.add_argument('--users-per-role', type=int, default=20, help="Users of each role to spread requests over")
+        parser.add_argument('--password', default=PASSWORD, help="Password of those users, for token/")
+        parser.add_argument(
+            '--response-cache', action='store_true', help="Leave the response cache on (default: measure the views)",
+        )
+        parser.add_argument('--json', help="Also write the results to this file")
+        parser.add_argument('--compare', help="A file from an earlier --json run to compare against")
+
+    def handle(self, *args, **options):
+        endpoints = options['endpoints'].split(',')
+        for endpoint in endpoints:
+            if endpoint not in ENDPOINTS:
+                raise CommandError(f"Unknown endpoint {endpoint!r}")
+        previous = None
+        if options['compare']:
+            with open(options['compare']) as source:
+                previous = json.load(source)
+
+        users = self.pick_users(options['users_per_role'])
+        requests = {endpoint: self.requests_for(endpoint, users, options['password']) for endpoint in endpoints}
+        command = [
+            sys.executable, '-m', 'gunicorn', 'AITS_project.wsgi:application',
+            '--workers', str(options['workers']), '--bind', '127.0.0.1:{port}',
+        ]
+        env = dict(os.environ, RESPONSE_CACHE_ENABLED='1' if options['response_cache'] else '0')
+        results = {}
+        with loadtest.start_server(command, env) as port:
+            for endpoint in endpoints:
+                self.stdout.write(f"/api/{endpoint} with {options['clients']} clients for {options['duration']:g}s")
+                results[endpoint] = loadtest.drive(port, requests[endpoint], options['clients'], options['duration'])
+
+        run = {
+            'commit': git_commit(),
+            'timestamp': datetime.now(dt_timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': settings.DATABASES['default']['ENGINE'].rsplit('.', 1)[-1],
+            'rows': {
+                model._meta.model_name: model.objects.count() for model in (User, Issue, Comment, Notification)
+            },
+            'workers': options['workers'],
+            'clients': options['clients'],
+            'duration': options['duration'],
+            'response_cache': options['response_cache'],
+            'results': results,
+        }
+        self.report(run, previous)
+        if options['json']:
+            with open(options['json'], 'w') as output:
+                json.dump(run, output, indent=2)
+
+    def pick_users(self, count):
+        """The first ``count`` users of each role; with seed_benchmark data, the most active come first"""
+        users = {}
+        for role in ROLES:
+            users[role] = list(User.objects.filter(role=role, is_active=True).order_by('pk')[:count])
+            if not users[role]:
+                raise CommandError(f"No active {role} users; run seed_benchmark first")
+        return users
+
+    def requests_for(self, endpoint, users, password):
+        # Interleave the roles, so every client sends a mix
+        mixed = [user for group in zip(*(users[role] for role in ROLES)) for user in group]
+        if endpoint == 'token/':
+            return [
+                loadtest.post_json('/api/token/', {'username': user.username, 'password': password})
+                for user in mixed
+            ]
+        return [
+            loadtest.get(f'/api/{endpoint}', with_user_claims(str(AccessToken.for_user(user)), user))
+            for user in mixed
+        ]
+
+    def report(self, run, previous):
+        results = run['results']
+        earlier = (previous or {}).get('results', {})
+        self.stdout.write(
+            f"\n{'endpoint':<16}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}"
+            + (f"   change from {previous.get('commit') or 'previous run'}, + is better" if previous else '')
+        )
+        for endpoint, row in results.items():
+            line = (
+                f"{endpoint:<16}{row['throughput']:>10.1f}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}"
+                f"{row['p99_ms']:>10.1f}{row['errors']:>8}"
+            )
+            if endpoint in earlier:
+                line += '   ' + '  '.join(
+                    f"{figure} {change:+.1f}%" for figure, change in compare(earlier[endpoint], row).items()
+                )
+            self.stdout.write(line)
+        if previous and previous.get('rows') != run['rows']:
+            self.stdout.write(self.style.WARNING("The earlier run had different row counts; the figures may not compare"))
+
+
+def compare(before, after):
+    """Percentage change of each figure from ``before`` to ``after``, positive meaning better"""
+    changes = {}
+    for figure, higher_is_better in FIGURES:
+        if before.get(figure):
+            change = (after[figure] - before[figure]) / before[figure] * 100
+            changes[figure] = change if higher_is_better else -change
+    return changes
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,77 @@
+import json
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from issues import loadtest
+from issues.authentication import with_user_claims
+from issues.models import User
+
+ENDPOINTS = ['dashboard/', 'issues/', 'issues/stats/', 'notifications/']
+
+SERVERS = {
+    # The current deployment: DRF views on one synchronous gunicorn worker
+    'wsgi': (
+        [sys.executable, '-m', 'gunicorn', 'AITS_project.wsgi:application', '--workers', '1', '--bind', '127.0.0.1:{port}'],
+        '/api/',
+    ),
+    # issues.async_views on one uvicorn worker
+    'asgi': (
+        [sys.executable, '-m', 'uvicorn', 'AITS_project.asgi:application', '--workers', '1', '--port', '{port}',
+         '--log-level', 'warning'],
+        '/api/async/',
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Start one WSGI worker (DRF views) and one ASGI worker (async views) on the current database, "
+        "drive each with concurrent clients and compare requests/s and latency per endpoint"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help="User id to authenticate as (default: the first registrar)")
+        parser.add_argument('--clients', type=int, default=32, help="Concurrent client connections")
+        parser.add_argument('--duration', type=float, default=10.0, help="Seconds per server and endpoint")
+        parser.add_argument('--servers', default='wsgi,asgi', help="Comma-separated subset of: wsgi, asgi")
+        parser.add_argument('--json', help="Also write the results to this file")
+
+    def handle(self, *args, **options):
+        user = self.pick_user(options['user'])
+        token = with_user_claims(str(AccessToken.for_user(user)), user)
+        results = {}
+        for name in options['servers'].split(','):
+            if name not in SERVERS:
+                raise CommandError(f"Unknown server {name!r}")
+            results[name] = self.bench_server(name, token, options['clients'], options['duration'])
+
+        self.stdout.write(f"\n{'endpoint':<16}" + ''.join(f"{name + ' req/s':>14}{'p50 ms':>9}{'p99 ms':>9}" for name in results))
+        for endpoint in ENDPOINTS:
+            line = f"{endpoint:<16}"
+            for stats in results.values():
+                row = stats[endpoint]
+                line += f"{row['throughput']:>14.1f}{row['p50_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+            self.stdout.write(line)
+        if options['json']:
+            with open(options['json'], 'w') as output:
+                json.dump({'user': user.pk, 'clients': options['clients'], 'results': results}, output, indent=2)
+
+    def pick_user(self, user_id):
+        users = User.objects.filter(pk=user_id) if user_id else User.objects.filter(role=User.ACADEMIC_REGISTRAR)
+        user = users.order_by('pk').first()
+        if user is None:
+            raise CommandError("No user to authenticate as; create one first")
+        return user
+
+    def bench_server(self, name, token, clients, duration):
+        command, prefix = SERVERS[name]
+        env = dict(os.environ, RESPONSE_CACHE_ENABLED='0')  # measure the views, not the response cache
+        with loadtest.start_server(command, env) as port:
+            results = {}
+            for endpoint in ENDPOINTS:
+                self.stdout.write(f"{name}: {prefix}{endpoint} with {clients} clients for {duration:g}s")
+                results[endpoint] = loadtest.drive(port, [loadtest.get(prefix + endpoint, token)], clients, duration)
+            return results
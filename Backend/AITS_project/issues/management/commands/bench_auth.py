@@ -0,0 +1,41 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from issues.authentication import CachedJWTAuthentication, user_cache, with_user_claims
+from issues.models import User
+
+
+class Command(BaseCommand):
+    help = "Compare per-request cost of JWTAuthentication and CachedJWTAuthentication"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help="User id to authenticate as (default: the first user)")
+        parser.add_argument('--repeat', type=int, default=2000, help="Authenticated requests per class")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(pk=options['user']).first() if options['user'] else User.objects.first()
+        if user is None:
+            raise CommandError("No user found; create one first")
+        access = with_user_claims(str(RefreshToken.for_user(user).access_token), user)
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access}')
+
+        user_cache.clear()
+        for authenticator in (JWTAuthentication(), CachedJWTAuthentication()):
+            timings = []
+            with CaptureQueriesContext(connection) as ctx:
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    authenticator.authenticate(request)
+                    timings.append((time.perf_counter() - start) * 1e6)
+            timings.sort()
+            self.stdout.write(
+                f"{type(authenticator).__name__:<26} queries/request={len(ctx.captured_queries) / options['repeat']:.3f} "
+                f"p50={statistics.median(timings):.0f}us p95={timings[int(len(timings) * 0.95) - 1]:.0f}us"
+            )
@@ -0,0 +1,79 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from issues import fast_serializers
+from issues.models import Issue, User
+from issues.serializers import IssueSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare IssueSerializer(many=True) with the values_list fast path on an N-issue list: "
+        "query, serialization and JSON rendering. Sample data is created and rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--issues', type=int, default=10000, help="Issues in the list")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per path")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options['issues'])
+                self.run(options['issues'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, count):
+        users = User.objects.bulk_create(
+            User(username=f'bench-serializer-{i}', first_name='Bench', last_name=f'User {i}', role=role)
+            for i, role in enumerate([User.STUDENT] * 50 + [User.LECTURER] * 10)
+        )
+        students, lecturers = users[:50], users[50:]
+        Issue.objects.bulk_create(
+            Issue(
+                title=f'Issue {i}', description='Missing marks for the final exam', created_by=students[i % 50],
+                assigned_to=lecturers[i % 10] if i % 3 else None, course_unit='Database Systems',
+                college='College of Engineering',
+            )
+            for i in range(count)
+        )
+
+    def run(self, count, repeat):
+        queryset = Issue.objects.order_by('-created_at', '-pk')[:count]
+        renderer = JSONRenderer()
+        paths = {
+            'IssueSerializer': lambda: renderer.render(
+                IssueSerializer(queryset.select_related('created_by', 'assigned_to'), many=True).data
+            ),
+            'fast_serializers.issues': lambda: renderer.render(
+                fast_serializers.issues.serialize(fast_serializers.issues.queryset(queryset))
+            ),
+        }
+        bodies = {name: path() for name, path in paths.items()}
+        if len(set(bodies.values())) != 1:
+            self.stderr.write(self.style.ERROR("Outputs differ"))
+            return
+
+        medians = {}
+        for name, path in paths.items():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                path()
+                timings.append(time.perf_counter() - start)
+            medians[name] = statistics.median(timings)
+            self.stdout.write(
+                f"{name:<26} median {medians[name] * 1000:8.1f}ms  {count / medians[name]:10.0f} issues/s"
+            )
+        slow, fast = medians.values()
+        self.stdout.write(f"Speed-up: {slow / fast:.1f}x (identical {len(bodies['IssueSerializer'])}-byte bodies)")
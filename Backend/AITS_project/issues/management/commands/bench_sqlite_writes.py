@@ -0,0 +1,167 @@
+import json
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+
+from issues.models import Comment, Issue, Notification, User
+from issues.sqlite import is_locked, run_with_retry
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure concurrent write throughput and latency on a scratch SQLite database under each "
+        "connection profile in settings.SQLITE_PROFILES, with several writer and reader processes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', default='rollback,concurrent', help="Comma-separated profile names")
+        parser.add_argument('--writers', type=int, default=4, help="Writer processes")
+        parser.add_argument('--readers', type=int, default=2, help="Reader processes running alongside")
+        parser.add_argument('--operations', type=int, default=200, help="Write operations per writer")
+        parser.add_argument('--json', help="Also write the results to this file")
+
+    def handle(self, *args, **options):
+        profiles = options['profiles'].split(',')
+        for profile in profiles:
+            if profile not in settings.SQLITE_PROFILES:
+                raise CommandError(f"Unknown profile {profile!r}; see settings.SQLITE_PROFILES")
+        # Children must open their own connections
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+
+        results = {}
+        for profile in profiles:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'bench.sqlite3')
+                setup = context.Process(target=_prepare, args=(path, profile))
+                setup.start()
+                setup.join()
+                if setup.exitcode:
+                    raise CommandError(f"Preparing the {profile} database failed")
+                self.stdout.write(
+                    f"{profile}: {options['writers']} writers x {options['operations']} operations, "
+                    f"{options['readers']} readers"
+                )
+                results[profile] = _run(context, path, profile, options)
+
+        self.stdout.write(
+            f"\n{'profile':<12}{'writes/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'errors':>8}{'reads/s':>10}"
+        )
+        for profile, row in results.items():
+            self.stdout.write(
+                f"{profile:<12}{row['writes_per_second']:>10.1f}{row['p50_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+                f"{row['max_ms']:>9.1f}{row['errors']:>8}{row['reads_per_second']:>10.1f}"
+            )
+        if options['json']:
+            with open(options['json'], 'w') as output:
+                json.dump(results, output, indent=2)
+
+
+def _use_database(path, profile):
+    connection = connections['default']
+    connection.close()
+    connection.settings_dict.update(NAME=path, OPTIONS=dict(settings.SQLITE_PROFILES[profile]), CONN_MAX_AGE=None)
+
+
+def _prepare(path, profile):
+    _use_database(path, profile)
+    call_command('migrate', run_syncdb=True, verbosity=0)
+    User.objects.create(username='bench-student', role=User.STUDENT, college='College of Engineering')
+    User.objects.create(username='bench-lecturer', role=User.LECTURER, college='College of Engineering')
+
+
+def _write(student, lecturer, number):
+    """What creating an issue, commenting on it and notifying about it writes"""
+    issue = Issue.objects.create(
+        title=f'Benchmark issue {number}', description='Missing marks', created_by=student, assigned_to=lecturer,
+    )
+    Comment.objects.create(issue=issue, content='Looking into it', created_by=lecturer)
+    Notification.objects.create(
+        user=student, notification_type=Notification.COMMENT_ADDED, issue=issue, message='New comment',
+    )
+
+
+def _writer(path, profile, operations, barrier, results):
+    _use_database(path, profile)
+    student = User.objects.get(username='bench-student')
+    lecturer = User.objects.get(username='bench-lecturer')
+    retry = profile != 'rollback'
+    latencies, errors = [], 0
+    barrier.wait()
+    for number in range(operations):
+        began = time.perf_counter()
+        try:
+            if retry:
+                run_with_retry(_write, student, lecturer, number)
+            else:
+                with transaction.atomic():
+                    _write(student, lecturer, number)
+        except OperationalError as exc:
+            if not is_locked(exc):
+                raise
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - began)
+    results.put(('writer', latencies, errors))
+
+
+def _reader(path, profile, barrier, done, results):
+    _use_database(path, profile)
+    reads, errors = 0, 0
+    barrier.wait()
+    while not done.is_set():
+        try:
+            list(Issue.objects.order_by('-created_at').values_list('pk', 'title')[:50])
+            reads += 1
+        except OperationalError as exc:
+            if not is_locked(exc):
+                raise
+            errors += 1
+    results.put(('reader', reads, errors))
+
+
+def _run(context, path, profile, options):
+    barrier = context.Barrier(options['writers'] + options['readers'] + 1)
+    done = context.Event()
+    results = context.Queue()
+    writers = [
+        context.Process(target=_writer, args=(path, profile, options['operations'], barrier, results))
+        for _ in range(options['writers'])
+    ]
+    readers = [context.Process(target=_reader, args=(path, profile, barrier, done, results)) for _ in range(options['readers'])]
+    for process in writers + readers:
+        process.start()
+    barrier.wait()
+    start = time.perf_counter()
+
+    latencies, errors, reads = [], 0, 0
+    for _ in writers:
+        _, mine, failed = results.get()
+        latencies.extend(mine)
+        errors += failed
+    elapsed = time.perf_counter() - start
+    done.set()
+    for _ in readers:
+        _, count, failed = results.get()
+        reads += count
+        errors += failed
+    for process in writers + readers:
+        process.join()
+
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else (latencies or [0.0]) * 99
+    return {
+        'writes': len(latencies),
+        'errors': errors,
+        'writes_per_second': len(latencies) / elapsed,
+        'p50_ms': quantiles[49] * 1000,
+        'p99_ms': quantiles[98] * 1000,
+        'max_ms': max(latencies, default=0.0) * 1000,
+        'reads_per_second': reads / elapsed,
+    }
@@ -0,0 +1,56 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from issues.models import Issue, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the old OR-based lecturer issue scope with Issue.objects.visible_to() "
+        "on the current database: query plans and first-page latency"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lecturer', type=int, help="Lecturer id (default: the one with most assigned issues)")
+        parser.add_argument('--repeat', type=int, default=50, help="Timed runs per plan")
+        parser.add_argument('--page-size', type=int, default=50)
+
+    def handle(self, *args, **options):
+        lecturer = self.pick_lecturer(options['lecturer'])
+        page = options['page_size']
+        plans = {
+            'old (OR)': lambda: (
+                Issue.objects.filter(assigned_to=lecturer) | Issue.objects.filter(created_by=lecturer)
+            ),
+            'new (visible_to + limited)': lambda: Issue.objects.visible_to(lecturer),
+        }
+        self.stdout.write(f"Lecturer {lecturer.pk} ({lecturer.username}), {options['repeat']} runs each\n")
+        for name, scope in plans.items():
+            ordered = scope().select_related('created_by', 'assigned_to').order_by('-created_at', '-id')
+            queryset = ordered.limited(page) if hasattr(ordered, 'limited') else ordered[:page]
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for line in queryset.explain().splitlines():
+                self.stdout.write(f"  {line}")
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                rows = len(list(queryset.all()))
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f"  rows={rows} p50={statistics.median(timings):.2f}ms "
+                f"p95={timings[int(len(timings) * 0.95) - 1]:.2f}ms\n"
+            )
+
+    def pick_lecturer(self, lecturer_id):
+        lecturers = User.objects.filter(role=User.LECTURER)
+        if lecturer_id is not None:
+            lecturer = lecturers.filter(pk=lecturer_id).first()
+        else:
+            lecturer = lecturers.annotate(n=Count('assigned_issues')).order_by('-n').first()
+        if lecturer is None:
+            raise CommandError("No lecturer found; seed some data first")
+        return lecturer
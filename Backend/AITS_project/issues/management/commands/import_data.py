@@ -0,0 +1,47 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from issues import imports
+
+
+class Command(BaseCommand):
+    help = "Stream users or issues from a CSV or NDJSON file into the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(imports.IMPORTERS), help="What the file contains")
+        parser.add_argument('path', help="File to import, or - for stdin")
+        parser.add_argument('--format', choices=[imports.CSV, imports.NDJSON], help="Default: from the file extension")
+        parser.add_argument('--chunk-size', type=int, help="Rows per bulk insert (default: BULK_IMPORT['CHUNK_SIZE'])")
+        parser.add_argument(
+            '--workers', type=int,
+            help="Processes hashing passwords; 0 hashes in this process (default: BULK_IMPORT['HASH_WORKERS'])",
+        )
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or imports.detect_format(options['path'])
+        if file_format is None:
+            raise CommandError("Cannot tell the file format from its name; pass --format")
+        if options['path'] == '-':
+            report = self.run(options, imports.text_stream(sys.stdin.buffer), file_format)
+        else:
+            try:
+                binary = open(options['path'], 'rb')
+            except OSError as exc:
+                raise CommandError(str(exc))
+            with binary:
+                report = self.run(options, imports.text_stream(binary), file_format)
+
+        for error in report['errors']:
+            for field, messages in error['errors'].items():
+                self.stderr.write(f"line {error['line']}: {field}: {' '.join(map(str, messages))}")
+        if report['errors_truncated']:
+            self.stderr.write(f"... {report['failed'] - len(report['errors'])} more rows failed")
+        style = self.style.SUCCESS if not report['failed'] else self.style.WARNING
+        self.stdout.write(style(f"Imported {report['created']} {options['kind']}, {report['failed']} rows rejected"))
+
+    def run(self, options, stream, file_format):
+        return imports.run_import(
+            options['kind'], stream, file_format,
+            chunk_size=options['chunk_size'], workers=options['workers'],
+        )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from issues import counters
+
+
+class Command(BaseCommand):
+    help = "Recompute the issue statistics counters from the Issue table and check them for drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help="Only compare the stored counters with the source rows; exit non-zero on drift",
+        )
+
+    def handle(self, *args, **options):
+        if not options['verify']:
+            written = counters.rebuild()
+            self.stdout.write(f"Rebuilt {written} counter rows")
+
+        mismatches = counters.verify()
+        for scope, key, status, stored, expected in mismatches:
+            self.stderr.write(f"{scope}:{key or '-'}:{status} stored={stored} expected={expected}")
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} issue counters do not match the source rows")
+        self.stdout.write(self.style.SUCCESS("Issue counters match the source rows"))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from issues import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index over issues and comments"
+
+    def handle(self, *args, **options):
+        if not search.enabled():
+            raise CommandError("Full-text search needs the SQLite backend")
+        indexed = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} issues"))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from issues import response_cache
+from issues import views  # noqa: F401  (registers the cached endpoints)
+
+
+class Command(BaseCommand):
+    help = "Show response cache hits, misses and hit ratio per endpoint"
+
+    def handle(self, *args, **options):
+        for name, counts in response_cache.stats().items():
+            ratio = counts['hit_ratio']
+            self.stdout.write(
+                f"{name:<14} hits={counts['hits']:<8} misses={counts['misses']:<8} "
+                f"hit_ratio={'-' if ratio is None else f'{ratio:.1%}'}"
+            )
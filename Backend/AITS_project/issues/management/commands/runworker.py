@@ -0,0 +1,92 @@
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from issues import jobs
+
+PURGE_EVERY = 60  # seconds
+
+
+def _init_process():
+    # Each pool process opens its own database connections
+    django.setup()
+    connections.close_all()
+
+
+def _run_in_pool(job_id, token):
+    close_old_connections()
+    try:
+        return jobs.run(job_id, token)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs from the database job table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help="Jobs run at the same time")
+        parser.add_argument('--mode', choices=['thread', 'process'], default='thread', help="Worker pool type")
+        parser.add_argument('--batch-size', type=int, default=20, help="Most jobs claimed per poll")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to sleep when idle")
+        parser.add_argument(
+            '--visibility-timeout', type=int, default=300,
+            help="Seconds a claimed job stays hidden from other workers before it is retried",
+        )
+        parser.add_argument(
+            '--keep-finished', type=int, default=24, help="Hours to keep done and failed jobs",
+        )
+        parser.add_argument('--once', action='store_true', help="Exit when no job is due")
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        concurrency = max(1, options['concurrency'])
+        if options['mode'] == 'process':
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=concurrency, initializer=_init_process)
+        else:
+            pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='jobs')
+
+        worker = jobs.worker_id()
+        keep_finished = timedelta(hours=options['keep_finished'])
+        self.stdout.write(f"Worker {worker} running {concurrency} {options['mode']}(s)")
+
+        running = set()
+        last_purge = 0
+        try:
+            while not self.stopping:
+                free = concurrency - len(running)
+                claimed = []
+                if free > 0:
+                    token, claimed = jobs.claim(worker, min(free, options['batch_size']), options['visibility_timeout'])
+                    for job in claimed:
+                        running.add(pool.submit(_run_in_pool, job.pk, token))
+
+                if time.monotonic() - last_purge > PURGE_EVERY:
+                    jobs.purge_finished(keep_finished)
+                    last_purge = time.monotonic()
+
+                if not claimed and not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                elif running:
+                    done, _ = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        running.discard(future)
+                        if future.exception():
+                            self.stderr.write(f"Worker error: {future.exception()}")
+        finally:
+            pool.shutdown(wait=True)
+        self.stdout.write(f"Worker {worker} stopped")
+
+    def stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,300 @@
+import math
+import random
+import time
+from array import array
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from issues import counters, search
+from issues.models import College, Comment, CourseUnit, Issue, IssueCounter, Notification, User
+
+PREFIX = 'bench_'
+PASSWORD = 'benchmark'
+# Days of history the data set covers
+SPAN_DAYS = 3 * 365
+
+FIRST_NAMES = [
+    'Aisha', 'Brian', 'Catherine', 'Daniel', 'Esther', 'Fred', 'Grace', 'Henry', 'Irene', 'Joseph',
+    'Kevin', 'Lydia', 'Moses', 'Nora', 'Oscar', 'Patience', 'Ronald', 'Sarah', 'Timothy', 'Winnie',
+]
+LAST_NAMES = [
+    'Achieng', 'Byaruhanga', 'Kato', 'Mugisha', 'Nakato', 'Nansubuga', 'Okello', 'Opio', 'Ssempala',
+    'Tumusiime', 'Wasswa', 'Namutebi', 'Akello', 'Kiggundu', 'Atuhaire', 'Lubega',
+]
+TITLES = [
+    'Missing marks for {unit}', 'Wrong grade recorded in {unit}', 'Coursework mark not uploaded for {unit}',
+    'Exam result missing for {unit}', 'Request for a remark in {unit}', 'Test 1 marks missing in {unit}',
+    'Retake not reflected for {unit}', 'Incorrect total for {unit}',
+]
+DESCRIPTIONS = [
+    'I sat the final exam for {unit} but my result shows as missing on the portal.',
+    'My coursework for {unit} was submitted on time and the mark has not been recorded.',
+    'The mark shown for {unit} does not match the one on my marked script. Please review it.',
+    'The lecturer confirmed my marks for {unit} were submitted, but they are not on my transcript.',
+]
+COMMENTS = [
+    'Looking into this with the department.', 'Please attach a copy of your exam card.',
+    'The marks have been forwarded to the registrar.', 'Thank you, I have attached the script.',
+    'This has been corrected; please confirm on the portal.', 'Any update on this?',
+]
+MESSAGES = {
+    Notification.ISSUE_CREATED: 'A new issue was submitted',
+    Notification.ISSUE_UPDATED: 'An issue you follow was updated',
+    Notification.STATUS_CHANGED: 'The status of your issue changed',
+    Notification.COMMENT_ADDED: 'New comment on your issue',
+    Notification.ASSIGNED: 'An issue was assigned to you',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-load a large synthetic data set with skewed distributions (a few very active students, "
+        "lecturers and colleges; recent issues busiest) for benchmarks. Seeded accounts are "
+        f"{PREFIX}<role>_<n> with password '{PASSWORD}'; the most active of each role is n=0"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200_000)
+        parser.add_argument('--issues', type=int, default=1_000_000)
+        parser.add_argument('--comments', type=int, default=2_000_000)
+        parser.add_argument('--notifications', type=int, default=3_000_000)
+        parser.add_argument('--seed', type=int, default=42, help="Random seed; the same seed gives the same data")
+        parser.add_argument('--batch-size', type=int, default=20_000, help="Rows per INSERT batch and transaction")
+        parser.add_argument(
+            '--flush', action='store_true',
+            help=f"First delete all issues, comments, notifications and {PREFIX}* users",
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = datetime.now(dt_timezone.utc)
+        self.start = self.now - timedelta(days=SPAN_DAYS)
+        self.colleges = list(College.objects.values_list('name', flat=True)) or [None]
+        self.units = list(CourseUnit.objects.values_list('name', flat=True)) or ['General']
+
+        if options['flush']:
+            self.flush()
+        elif User.objects.filter(username__startswith=PREFIX).exists():
+            raise CommandError(f"{PREFIX}* users already exist; pass --flush to replace the data set")
+
+        began = time.monotonic()
+        with self.unsynchronized():
+            self.seed_users(options['users'])
+            self.seed_issues(options['issues'])
+            self.seed_comments(options['comments'])
+            self.seed_notifications(options['notifications'])
+
+        self.step("Rebuilding issue counters", counters.rebuild)
+        if search.enabled():
+            self.step("Rebuilding the search index", search.rebuild)
+        if connection.vendor in ('sqlite', 'postgresql'):
+            self.step("Updating planner statistics", lambda: connection.cursor().execute('ANALYZE'))
+        # Responses cached from the old data must not be served
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS(f"Seeded in {time.monotonic() - began:.1f}s"))
+
+    def step(self, label, func):
+        began = time.monotonic()
+        func()
+        self.stdout.write(f"{label}: {time.monotonic() - began:.1f}s")
+
+    @contextmanager
+    def unsynchronized(self):
+        """On SQLite, skip fsync during the load: a crash mid-way leaves a data set to flush anyway"""
+        if connection.vendor != 'sqlite' or connection.in_atomic_block:
+            # SQLite cannot change it inside a transaction
+            yield
+            return
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            previous = cursor.fetchone()[0]
+            cursor.execute('PRAGMA synchronous=OFF')
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f'PRAGMA synchronous={int(previous)}')
+
+    def flush(self):
+        with transaction.atomic(), connection.cursor() as cursor:
+            for model in (Notification, Comment, Issue, IssueCounter):
+                cursor.execute(f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)}')
+            User.objects.filter(username__startswith=PREFIX)._raw_delete(connection.alias)
+
+    # --- Sampling ------------------------------------------------------------
+
+    def zipf(self, count, exponent=1.1):
+        """Cumulative weights for choosing among ``count`` items, item 0 the most likely"""
+        return list(accumulate(1 / (rank + 1) ** exponent for rank in range(count)))
+
+    def recent(self, count):
+        """An index in range(count), skewed towards the end (the newest rows)"""
+        return count - 1 - int(count * self.rng.random() ** 3)
+
+    def moment(self, fraction):
+        """The time ``fraction`` of the way through the data set, with more activity recently"""
+        return self.start + timedelta(days=SPAN_DAYS * math.sqrt(fraction), minutes=self.rng.random() * 60)
+
+    def later(self, moment, mean_hours):
+        return min(moment + timedelta(hours=self.rng.expovariate(1 / mean_hours)), self.now)
+
+    # --- Loading -------------------------------------------------------------
+
+    def next_id(self, model):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT MAX({connection.ops.quote_name(model._meta.pk.column)}) '
+                f'FROM {connection.ops.quote_name(model._meta.db_table)}'
+            )
+            return (cursor.fetchone()[0] or 0) + 1
+
+    def insert(self, model, fields, rows, total):
+        """INSERT ``rows`` (tuples in ``fields`` order) in batches, each in its own transaction"""
+        quote = connection.ops.quote_name
+        sql = (
+            f'INSERT INTO {quote(model._meta.db_table)} '
+            f'({", ".join(quote(model._meta.get_field(field).column) for field in fields)}) '
+            f'VALUES ({", ".join(["%s"] * len(fields))})'
+        )
+        began = time.monotonic()
+        batch, written = [], 0
+        for row in rows:
+            batch.append(row)
+            if len(batch) == self.batch_size:
+                written += self.write(sql, batch)
+                batch = []
+                self.stdout.write(f"  {model.__name__}: {written}/{total}", ending='\r')
+        written += self.write(sql, batch)
+        elapsed = time.monotonic() - began
+        self.stdout.write(f"{model.__name__}: {written} rows in {elapsed:.1f}s ({written / max(elapsed, 1e-9):,.0f}/s)")
+
+    def write(self, sql, batch):
+        if batch:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, batch)
+        return len(batch)
+
+    def seed_users(self, count):
+        registrars = max(1, count // 500)
+        lecturers = max(1, count * 6 // 100)
+        students = max(1, count - registrars - lecturers)
+        password = make_password(PASSWORD)
+        college_weights = self.zipf(len(self.colleges), exponent=0.8)
+        adapt = connection.ops.adapt_datetimefield_value
+        first_id = self.next_id(User)
+
+        roles = [(User.STUDENT, students), (User.LECTURER, lecturers), (User.ACADEMIC_REGISTRAR, registrars)]
+        self.user_ids = {}
+        # A student's college, for the issues they create
+        self.student_colleges = []
+
+        def rows():
+            user_id = first_id
+            for role, role_count in roles:
+                self.user_ids[role] = range(user_id, user_id + role_count)
+                for number in range(role_count):
+                    college = self.rng.choices(self.colleges, cum_weights=college_weights)[0]
+                    if role == User.STUDENT:
+                        self.student_colleges.append(college)
+                    first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+                    yield (
+                        user_id, password, f'{PREFIX}{role}_{number}', first, last,
+                        f'{PREFIX}{role}_{number}@example.com', False, True, False,
+                        adapt(self.moment(self.rng.random())), role, f'07{self.rng.randrange(10 ** 8):08d}',
+                        f'{PREFIX}{number}' if role == User.STUDENT else None, college,
+                    )
+                    user_id += 1
+
+        self.insert(User, (
+            'id', 'password', 'username', 'first_name', 'last_name', 'email', 'is_superuser', 'is_active',
+            'is_staff', 'date_joined', 'role', 'phone_number', 'student_number', 'college',
+        ), rows(), students + lecturers + registrars)
+
+    def seed_issues(self, count):
+        students, lecturers = self.user_ids[User.STUDENT], self.user_ids[User.LECTURER]
+        student_weights, lecturer_weights = self.zipf(len(students)), self.zipf(len(lecturers))
+        adapt = connection.ops.adapt_datetimefield_value
+        first_id = self.next_id(Issue)
+        self.issue_ids = range(first_id, first_id + count)
+        # Per issue, for the comments and notifications that follow
+        self.issue_creators, self.issue_assignees = array('q'), array('q')
+        self.issue_created = array('d')
+        statuses = [Issue.PENDING, Issue.IN_PROGRESS, Issue.RESOLVED, Issue.CLOSED]
+
+        def rows():
+            for number, issue_id in enumerate(self.issue_ids):
+                creator = self.rng.choices(range(len(students)), cum_weights=student_weights)[0]
+                assigned = self.rng.random() < 0.75
+                assignee = lecturers[self.rng.choices(range(len(lecturers)), cum_weights=lecturer_weights)[0]] if assigned else None
+                created = self.moment(number / count)
+                if not assigned:
+                    status = Issue.PENDING
+                elif (self.now - created).days > 30:
+                    # Older issues have mostly been dealt with
+                    status = self.rng.choices(statuses, weights=(10, 15, 50, 25))[0]
+                else:
+                    status = self.rng.choices(statuses, weights=(45, 35, 15, 5))[0]
+                unit = self.rng.choice(self.units)
+                self.issue_creators.append(students[creator])
+                self.issue_assignees.append(assignee or 0)
+                self.issue_created.append(created.timestamp())
+                yield (
+                    issue_id, self.rng.choice(TITLES).format(unit=unit), self.rng.choice(DESCRIPTIONS).format(unit=unit),
+                    status, self.rng.choices((Issue.LOW, Issue.MEDIUM, Issue.HIGH), weights=(25, 55, 20))[0],
+                    students[creator], assignee, adapt(created), adapt(self.later(created, 72)), unit,
+                    self.student_colleges[creator],
+                )
+
+        self.insert(Issue, (
+            'id', 'title', 'description', 'status', 'priority', 'created_by', 'assigned_to',
+            'created_at', 'updated_at', 'course_unit', 'college',
+        ), rows(), count)
+
+    def pick_issue(self):
+        index = self.recent(len(self.issue_ids))
+        created = datetime.fromtimestamp(self.issue_created[index], dt_timezone.utc)
+        return index, self.issue_creators[index], self.issue_assignees[index] or None, created
+
+    def seed_comments(self, count):
+        if not self.issue_ids:
+            return
+        lecturers = self.user_ids[User.LECTURER]
+        adapt = connection.ops.adapt_datetimefield_value
+        first_id = self.next_id(Comment)
+
+        def rows():
+            for comment_id in range(first_id, first_id + count):
+                index, creator, assignee, created = self.pick_issue()
+                draw = self.rng.random()
+                author = creator if draw < 0.5 else assignee if assignee and draw < 0.9 else self.rng.choice(lecturers)
+                moment = adapt(self.later(created, 48))
+                yield comment_id, self.issue_ids[index], self.rng.choice(COMMENTS), author, moment, moment
+
+        self.insert(Comment, ('id', 'issue', 'content', 'created_by', 'created_at', 'updated_at'), rows(), count)
+
+    def seed_notifications(self, count):
+        if not self.issue_ids:
+            return
+        adapt = connection.ops.adapt_datetimefield_value
+        first_id = self.next_id(Notification)
+        kinds = list(MESSAGES)
+
+        def rows():
+            for notification_id in range(first_id, first_id + count):
+                index, creator, assignee, created = self.pick_issue()
+                kind = self.rng.choices(kinds, weights=(10, 20, 25, 35, 10))[0]
+                user = assignee if assignee and (kind == Notification.ASSIGNED or self.rng.random() < 0.3) else creator
+                moment = self.later(created, 24)
+                read = self.rng.random() < (0.9 if (self.now - moment).days > 14 else 0.4)
+                yield notification_id, user, kind, self.issue_ids[index], MESSAGES[kind], read, adapt(moment)
+
+        self.insert(Notification, (
+            'id', 'user', 'notification_type', 'issue', 'message', 'is_read', 'created_at',
+        ), rows(), count)
@@ -0,0 +1,42 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from issues import routers, sqlite
+
+
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database into the read replicas, once or every --interval seconds"
+
+    def add_arguments(self, parser):
+        parser.add_argument('aliases', nargs='*', help="Replica aliases (default: all in DATABASE_ROUTING)")
+        parser.add_argument('--interval', type=float, default=0, help="Seconds between syncs; 0 syncs once")
+
+    def handle(self, *args, **options):
+        replicas = routers.routing_settings()['REPLICAS']
+        aliases = options['aliases'] or replicas
+        if not aliases:
+            raise CommandError("No replicas configured; set DATABASE_REPLICAS")
+        for alias in aliases:
+            if alias not in replicas:
+                raise CommandError(f"{alias!r} is not a replica")
+            if settings.DATABASES[alias]['ENGINE'] != 'django.db.backends.sqlite3':
+                raise CommandError(f"{alias!r} is not SQLite; replicate it with the database's own tools")
+
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        while not self.stopping:
+            for alias in aliases:
+                began = time.monotonic()
+                sqlite.backup_to(settings.DATABASES[alias]['NAME'])
+                routers.replica_synced(alias)
+                self.stdout.write(f"Synced {alias} in {(time.monotonic() - began) * 1000:.0f}ms")
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def stop(self, signum, frame):
+        self.stopping = True
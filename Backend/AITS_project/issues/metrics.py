@@ -0,0 +1,366 @@
+"""
+Per-request performance metrics, served in Prometheus text format.
+
+``MetricsMiddleware`` times each request and files it under its URL name and
+method. For each it records a latency histogram, a count by status code, and
+totals of database queries, database time, serializer time and response
+bytes. Queries are timed by an execute wrapper that ``instrument_connection``
+adds to every database connection as it opens. Serializer time is the time
+spent in ``TimedSerializerMixin.to_representation`` and
+``FastSerializer.serialize``. Work done outside a request is not recorded.
+
+Each process adds to its own in-memory ``Aggregates`` under a lock. A
+background thread writes them to ``<DIRECTORY>/<pid>.json`` every
+``FLUSH_INTERVAL`` seconds when they have changed, so no request, and no
+event loop, waits on the file. ``/metrics`` (``metrics_view``) adds up every
+process's file, with its own live figures in place of its file, so whichever
+gunicorn worker serves the scrape reports for all of them. A scrape folds the
+files of workers that have exited into ``retired.json``, so that totals never
+go backwards and the directory does not grow with every restart; the
+directory must therefore only be shared by processes on one host. A worker
+that reuses an old pid starts a new file, which Prometheus sees as a counter
+reset.
+
+Without a ``TOKEN`` the endpoint only answers loopback clients, and the
+settings leave recording off unless a token is set.
+"""
+import fcntl
+import hmac
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock, Thread
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+
+PREFIX = 'aits'
+METHODS = {'GET', 'HEAD', 'OPTIONS', 'POST', 'PUT', 'PATCH', 'DELETE'}
+# Fields of a series after its bucket counts
+COUNT, DURATION, QUERIES, DB_SECONDS, SERIALIZER_SECONDS, RESPONSE_BYTES = range(6)
+
+RETIRED = 'retired.json'
+LOOPBACK = {'127.0.0.1', '::1'}
+
+_current = ContextVar('request_metrics', default=None)
+logger = logging.getLogger(__name__)
+
+
+def metrics_settings():
+    options = {
+        'ENABLED': True,
+        'DIRECTORY': os.path.join(tempfile.gettempdir(), 'aits-metrics'),
+        'BUCKETS': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+        'FLUSH_INTERVAL': 5,
+        'TOKEN': None,
+    }
+    options.update(getattr(settings, 'METRICS', {}))
+    return options
+
+
+class RequestStats:
+    """What one request has spent so far"""
+
+    __slots__ = ('queries', 'db_seconds', 'serializer_seconds', 'serializing')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializing = False
+
+
+# --- Recording --------------------------------------------------------------
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    # The wrapper list outlives reconnects, so add it only once
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    began = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - began
+
+
+class serializer_timer:
+    """Count the enclosed block as serializer time, unless an enclosing block already does"""
+
+    __slots__ = ('stats', 'began')
+
+    def __enter__(self):
+        stats = _current.get()
+        if stats is None or stats.serializing:
+            self.stats = None
+            return
+        stats.serializing = True
+        self.stats = stats
+        self.began = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        if self.stats is not None:
+            self.stats.serializer_seconds += time.perf_counter() - self.began
+            self.stats.serializing = False
+
+
+class TimedSerializerMixin:
+    """Record a DRF serializer's output time, ``many=True`` lists included, as serializer time"""
+
+    def to_representation(self, instance):
+        with serializer_timer():
+            return super().to_representation(instance)
+
+
+class Aggregates:
+    """One process's totals per (view, method) series, safe to update from several threads"""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.flusher = None
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.pid = os.getpid()
+            self.buckets = tuple(metrics_settings()['BUCKETS'])
+            self.series = {}
+            self.statuses = {}
+            self.dirty = False
+
+    def record(self, view, method, status, duration, stats, size):
+        if self.pid != os.getpid():
+            # Forked after recording (gunicorn --preload): start this worker afresh
+            self.clear()
+        # The first bucket whose upper bound (le) is at least duration
+        slot = bisect_left(self.buckets, duration)
+        key = f'{view} {method}'
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [0] * (len(self.buckets) + 1) + [0, 0.0, 0, 0.0, 0.0, 0]
+            series[slot] += 1
+            values = len(self.buckets) + 1
+            series[values + COUNT] += 1
+            series[values + DURATION] += duration
+            series[values + QUERIES] += stats.queries
+            series[values + DB_SECONDS] += stats.db_seconds
+            series[values + SERIALIZER_SECONDS] += stats.serializer_seconds
+            series[values + RESPONSE_BYTES] += size
+            status_key = f'{key} {status}'
+            self.statuses[status_key] = self.statuses.get(status_key, 0) + 1
+            self.dirty = True
+            # Threads do not survive a fork, so each worker starts its own
+            if self.flusher is None or not self.flusher.is_alive():
+                self.flusher = Thread(target=self.flush_periodically, name='metrics-flusher', daemon=True)
+                self.flusher.start()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'buckets': list(self.buckets),
+                'series': {key: list(values) for key, values in self.series.items()},
+                'statuses': dict(self.statuses),
+            }
+
+    def flush(self):
+        """Write this process's snapshot for other processes' scrapes"""
+        self.dirty = False
+        _write(metrics_settings()['DIRECTORY'], f'{os.getpid()}.json', self.snapshot())
+
+    def flush_periodically(self):
+        while True:
+            time.sleep(metrics_settings()['FLUSH_INTERVAL'])
+            if self.dirty:
+                try:
+                    self.flush()
+                except OSError:
+                    logger.exception("Writing request metrics failed")
+
+
+aggregates = Aggregates()
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        # Unmatched paths all share one series, so scanners cannot add labels
+        return 'unmatched'
+    return match.view_name or match._func_path
+
+
+def response_size(response):
+    if response.has_header('Content-Length'):
+        return int(response['Content-Length'])
+    if getattr(response, 'streaming', False):
+        return 0
+    return len(response.content)
+
+
+def start():
+    """Begin recording the current request; returns the token for ``finish``"""
+    return _current.set(RequestStats())
+
+
+def finish(token, request, response, began):
+    stats = _current.get()
+    _current.reset(token)
+    method = request.method if request.method in METHODS else 'OTHER'
+    aggregates.record(
+        view_name(request), method, response.status_code, time.perf_counter() - began, stats, response_size(response),
+    )
+
+
+# --- Exposition -------------------------------------------------------------
+
+def _write(directory, name, snapshot):
+    """Replace ``directory/name`` with ``snapshot`` in one step"""
+    os.makedirs(directory, exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(handle, 'w') as output:
+        json.dump(snapshot, output)
+    os.replace(temporary, os.path.join(directory, name))
+
+
+def _read(path):
+    try:
+        with open(path) as source:
+            return json.load(source)
+    except (OSError, ValueError):
+        # Removed or being replaced; its figures are counted again next scrape
+        return None
+
+
+def _add(total, snapshot):
+    """Add ``snapshot`` into ``total`` if both use the same buckets"""
+    if snapshot is None or snapshot['buckets'] != total['buckets']:
+        return
+    for key, values in snapshot['series'].items():
+        series = total['series'].setdefault(key, [0] * len(values))
+        for index, value in enumerate(values):
+            series[index] += value
+    for key, count in snapshot['statuses'].items():
+        total['statuses'][key] = total['statuses'].get(key, 0) + count
+
+
+def _exited(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+def retire_exited(directory):
+    """Fold the files of workers that have exited into RETIRED and remove them"""
+    with open(os.path.join(directory, '.lock'), 'w') as lock:
+        # One scrape at a time, so no file is folded twice
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        exited = [
+            name for name in os.listdir(directory)
+            if re.fullmatch(r'\d+\.json', name) and int(name[:-5]) != os.getpid() and _exited(int(name[:-5]))
+        ]
+        if not exited:
+            return
+        retired = _read(os.path.join(directory, RETIRED)) or {
+            'buckets': list(aggregates.buckets), 'series': {}, 'statuses': {},
+        }
+        for name in exited:
+            _add(retired, _read(os.path.join(directory, name)))
+        _write(directory, RETIRED, retired)
+        for name in exited:
+            os.remove(os.path.join(directory, name))
+
+
+def collect():
+    """Every process's snapshot added up, this one's taken live"""
+    aggregates.flush()
+    directory = metrics_settings()['DIRECTORY']
+    retire_exited(directory)
+    total = {'buckets': list(aggregates.buckets), 'series': {}, 'statuses': {}}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.json'):
+            _add(total, _read(os.path.join(directory, name)))
+    return total
+
+
+def _labels(**labels):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def _escape(value):
+    return re.sub(r'(["\\])', r'\\\1', str(value)).replace('\n', r'\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(total):
+    """``collect()`` output in Prometheus text exposition format"""
+    buckets = total['buckets']
+    values = len(buckets) + 1
+    series = sorted((key.split(' '), data) for key, data in total['series'].items())
+    lines = [
+        f'# HELP {PREFIX}_request_duration_seconds Request latency by URL name and method.',
+        f'# TYPE {PREFIX}_request_duration_seconds histogram',
+    ]
+    for (view, method), data in series:
+        cumulative = 0
+        for bound, count in zip([*map(str, buckets), '+Inf'], data[:values]):
+            cumulative += count
+            lines.append(
+                f'{PREFIX}_request_duration_seconds_bucket{{{_labels(view=view, method=method, le=bound)}}} {cumulative}'
+            )
+        labels = _labels(view=view, method=method)
+        lines.append(f'{PREFIX}_request_duration_seconds_sum{{{labels}}} {_number(data[values + DURATION])}')
+        lines.append(f'{PREFIX}_request_duration_seconds_count{{{labels}}} {data[values + COUNT]}')
+
+    lines += [
+        f'# HELP {PREFIX}_requests_total Requests by URL name, method and status code.',
+        f'# TYPE {PREFIX}_requests_total counter',
+    ]
+    for key, count in sorted(total['statuses'].items()):
+        view, method, status = key.split(' ')
+        lines.append(f'{PREFIX}_requests_total{{{_labels(view=view, method=method, status=status)}}} {count}')
+
+    for name, field, help_text in (
+        ('db_queries_total', QUERIES, 'Database queries run by requests'),
+        ('db_seconds_total', DB_SECONDS, 'Time requests spent in database queries'),
+        ('serializer_seconds_total', SERIALIZER_SECONDS, 'Time requests spent serializing responses'),
+        ('response_bytes_total', RESPONSE_BYTES, 'Response body bytes sent'),
+    ):
+        lines += [f'# HELP {PREFIX}_{name} {help_text}, by URL name and method.', f'# TYPE {PREFIX}_{name} counter']
+        for (view, method), data in series:
+            lines.append(f'{PREFIX}_{name}{{{_labels(view=view, method=method)}}} {_number(data[values + field])}')
+    return '\n'.join(lines) + '\n'
+
+
+@require_GET
+def metrics_view(request):
+    """The scrape endpoint, ``/metrics``"""
+    token = metrics_settings()['TOKEN']
+    if not token and request.META.get('REMOTE_ADDR') not in LOOPBACK:
+        return HttpResponse('Forbidden\n', status=403, content_type='text/plain')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        response = HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+        response['WWW-Authenticate'] = 'Bearer realm="metrics"'
+        return response
+    return HttpResponse(render(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,137 @@
+"""
+Project middleware.
+
+Django runs a request's middleware chain natively async under ASGI only if
+every middleware in it supports async. Otherwise it drops into a thread at
+the first sync-only one and runs the rest, async views included, through
+``async_to_sync``.
+"""
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.core.exceptions import MiddlewareNotUsed
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import metrics, query_detector, routers
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """``WhiteNoiseMiddleware`` that stays async under ASGI; static files are served from a thread"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, **kwargs):
+        super().__init__(get_response, **kwargs)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+class ReadReplicaMiddleware:
+    """Expose the request to ``routers.ReadReplicaRouter`` and mark users who write"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = routers.current_request.set(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.current_request.reset(token)
+        routers.finish(request, response)
+        return response
+
+    async def __acall__(self, request):
+        token = routers.current_request.set(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.current_request.reset(token)
+        routers.finish(request, response)
+        return response
+
+
+class MetricsMiddleware:
+    """Record each request's latency, queries, serializer time and size in ``metrics.aggregates``"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not metrics.metrics_settings()['ENABLED']:
+            return self.get_response(request)
+        began = time.perf_counter()
+        token = metrics.start()
+        response = self.get_response(request)
+        metrics.finish(token, request, response, began)
+        return response
+
+    async def __acall__(self, request):
+        if not metrics.metrics_settings()['ENABLED']:
+            return await self.get_response(request)
+        began = time.perf_counter()
+        token = metrics.start()
+        response = await self.get_response(request)
+        metrics.finish(token, request, response, began)
+        return response
+
+
+class QueryDetectorMiddleware:
+    """Check each request for N+1 and slow queries; unused unless QUERY_DETECTOR is enabled"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not query_detector.detector_settings()['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with query_detector.QueryDetector() as detector:
+            response = self.get_response(request)
+        query_detector.report(detector.findings(), f'{request.method} {request.path}')
+        return response
+
+    async def __acall__(self, request):
+        with query_detector.QueryDetector() as detector:
+            response = await self.get_response(request)
+        query_detector.report(detector.findings(), f'{request.method} {request.path}')
+        return response
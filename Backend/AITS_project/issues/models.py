@@ -1,7 +1,9 @@
 from django.contrib.auth.models import AbstractUser 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from django.utils import timezone
 
 def get_default_user():
     return User.objects.first().id  # Adjust logic if needed 
@@ -27,9 +29,94 @@ class User(AbstractUser):
     student_number = models.CharField(max_length=20, blank=True, null=True, unique=True, default=None)
     college = models.CharField(max_length=100, blank=True, null=True) 
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['role', '-date_joined', '-id'], name='user_role_keyset_idx'),
+            models.Index(fields=['-date_joined', '-id'], name='user_joined_keyset_idx'),
+            # Distinct colleges for the registrar dashboard, without reading the table
+            models.Index(fields=['college'], name='user_college_idx'),
+        ]
+
     def get_full_name(self):
         return f"{self.first_name} {self.last_name}".strip()
 
+    @classmethod
+    def role_field_errors(cls, role, student_number, college):
+        """
+        ``{field: message}`` for the role-specific fields a new account is
+        missing; shared by registration, the admin forms and bulk imports.
+        """
+        errors = {}
+        if role == cls.STUDENT:
+            if not student_number:
+                errors['student_number'] = "Student number is required for students."
+            if not college:
+                errors['college'] = "College is required for students."
+        elif role in (cls.LECTURER, cls.ACADEMIC_REGISTRAR) and not college:
+            errors['college'] = "College is required."
+        return errors
+
+class IssueQuerySet(models.QuerySet):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._branches = ()
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._branches = self._branches
+        return clone
+
+    def visible_to(self, user):
+        """
+        Issues ``user`` may see: everything for admins and registrars, their
+        own for students, and assigned-or-created for lecturers.
+        """
+        if user.role in (User.ADMIN, User.ACADEMIC_REGISTRAR):
+            return self.all()
+        if user.role == User.LECTURER:
+            return self.filter(Q(assigned_to=user) | Q(created_by=user)).branches(
+                Q(assigned_to=user), Q(created_by=user),
+            )
+        return self.filter(created_by=user)
+
+    def branches(self, *alternatives):
+        """
+        Declare that the rows already filtered for are those matching any of
+        ``alternatives``, each of which an index can return in keyset order,
+        for ``limited()``. Declaring again splits every existing branch.
+        """
+        clone = self._chain()
+        clone._branches = tuple(
+            branch & alternative for branch in (self._branches or (Q(),)) for alternative in alternatives
+        )
+        return clone
+
+    def limited(self, limit):
+        """
+        ``self[:limit]`` in the current ordering. No single index returns an
+        OR (the lecturer scope) or an IN list (``status=pending,resolved``) in
+        keyset order, so each branch first takes its own ``limit`` rows off
+        its index. The outer query then fetches only those rows by primary
+        key and sorts at most ``limit`` times the number of branches.
+        Annotated querysets are sliced as they are.
+        """
+        if not self._branches or not self.query.order_by or self.query.annotations:
+            return self[:limit]
+        candidates = Q()
+        for branch in self._branches:
+            candidates |= Q(pk__in=self.filter(branch).values('pk')[:limit])
+        # Every condition is applied inside the branches; repeated here they
+        # would tempt the planner onto an index scan of the whole table, so
+        # the outer query starts afresh with only what shapes the results
+        outer = self.model._default_manager.db_manager(self.db).filter(candidates)
+        outer = outer.order_by(*self.query.order_by).prefetch_related(*self._prefetch_related_lookups)
+        outer.query.select_related = self.query.select_related
+        outer.query.deferred_loading = self.query.deferred_loading
+        if self._fields is not None:
+            outer = outer.values(*self._fields)
+            outer._iterable_class = self._iterable_class
+        return outer[:limit]
+
 # Issue model
 class Issue(models.Model):
     PENDING = 'pending'
@@ -58,24 +145,122 @@ class Issue(models.Model):
     description = models.TextField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
     priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, default=MEDIUM)
-    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_issues')
-    assigned_to = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_issues')
+    # Served by the composite indexes in Meta, which lead with these columns
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_issues', db_index=False)
+    assigned_to = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_issues', db_index=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True) 
     course_unit = models.CharField(max_length=100, blank=True, null=True)
     college = models.CharField(max_length=100, blank=True, null=True)
     
+    objects = IssueQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            # Keyset pagination order, see issues.pagination.KeysetPagination
+            models.Index(fields=['-created_at', '-id'], name='issue_created_keyset_idx'),
+            # Student and lecturer scopes, each read newest first. The assignee index
+            # also serves the registrar's unassigned queue (assigned_to IS NULL)
+            models.Index(fields=['created_by', '-created_at', '-id'], name='issue_creator_keyset_idx'),
+            models.Index(fields=['assigned_to', '-created_at', '-id'], name='issue_assignee_keyset_idx'),
+            # IssueFilter: one index per equality filter and ordering it accepts
+            # (IssueFilter.INDEXED_FILTERS), so each filtered page is a seek
+            models.Index(fields=['status', '-created_at', '-id'], name='issue_status_keyset_idx'),
+            models.Index(fields=['priority', '-created_at', '-id'], name='issue_priority_keyset_idx'),
+            models.Index(fields=['college', '-created_at', '-id'], name='issue_college_keyset_idx'),
+            models.Index(fields=['course_unit', '-created_at', '-id'], name='issue_unit_keyset_idx'),
+            # assigned=true; assigned=false is the assignee index's NULL range
+            models.Index(
+                fields=['-created_at', '-id'], condition=Q(assigned_to__isnull=False), name='issue_assigned_keyset_idx',
+            ),
+            # ordering=updated_at, alone, with status, and in the per-user scopes
+            models.Index(fields=['-updated_at', '-id'], name='issue_updated_keyset_idx'),
+            models.Index(fields=['status', '-updated_at', '-id'], name='issue_status_upd_keyset_idx'),
+            models.Index(fields=['created_by', '-updated_at', '-id'], name='issue_creator_upd_keyset_idx'),
+            models.Index(fields=['assigned_to', '-updated_at', '-id'], name='issue_assignee_upd_keyset_idx'),
+        ]
+    
     def __str__(self):
         return self.title
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what the statistics counters were last told about this row
+        instance._counted_state = instance.counter_state()
+        return instance
+    
+    def counter_state(self):
+        """(status, created_by_id, assigned_to_id) as held in memory, or None if any is deferred"""
+        try:
+            return tuple(self.__dict__[field] for field in ('status', 'created_by_id', 'assigned_to_id'))
+        except KeyError:
+            return None
+    
+    def save(self, *args, **kwargs):
+        from . import counters
+        
+        # Counters are adjusted in the same transaction as the row itself
+        with transaction.atomic(using=kwargs.get('using')):
+            if self._state.adding:
+                old_state = None
+            else:
+                # The stored row, read in the write transaction: the snapshot taken
+                # when this instance was loaded may predate a concurrent save
+                old_state = counters.load_state(self.pk, for_update=True)
+                # pre_save receivers see the stored state too
+                self._counted_state = old_state
+            super().save(*args, **kwargs)
+            new_state = self.counter_state()
+            counters.record_change(old_state, new_state, self.created_by.college)
+            self._counted_state = new_state
+    
     def get_status_display(self):
         return dict(self.STATUS_CHOICES).get(self.status, self.status) 
 
+class IssueCounter(models.Model):
+    """
+    Number of issues in one status within one scope, kept in step with the
+    Issue table by ``issues.counters`` so stats never have to scan issues.
+    """
+    GLOBAL = 'global'
+    COLLEGE = 'college'
+    ASSIGNEE = 'assignee'
+    CREATOR = 'creator'
+    SELF_ASSIGNED = 'self_assigned'
+
+    SCOPE_CHOICES = [
+        (GLOBAL, 'Global'),
+        (COLLEGE, 'Creator college'),
+        (ASSIGNEE, 'Assignee'),
+        (CREATOR, 'Creator'),
+        (SELF_ASSIGNED, 'Created by and assigned to the same user'),
+    ]
+
+    scope = models.CharField(max_length=20, choices=SCOPE_CHOICES)
+    key = models.CharField(max_length=100, blank=True, default='')
+    status = models.CharField(max_length=20, choices=Issue.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key', 'status'], name='issue_counter_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}:{self.key}:{self.status}={self.count}"
+
 class Comment(models.Model): 
-    issue = models.ForeignKey(Issue, on_delete=models.CASCADE, related_name='comments')
+    issue = models.ForeignKey(Issue, on_delete=models.CASCADE, related_name='comments', db_index=False)
     content = models.TextField()
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
     created_at = models.DateTimeField(auto_now_add=True) 
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['issue', '-created_at', '-id'], name='comment_issue_keyset_idx'),
+        ]
     
     def __str__(self):
         return f"Comment on {self.issue.title} by {self.created_by.get_full_name()}"
@@ -95,7 +280,7 @@ class Notification(models.Model):
         (ASSIGNED, 'Assigned'), 
     ]
     
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications', db_index=False)
     notification_type = models.CharField(max_length=20, choices=NOTIFICATION_TYPES)
     issue = models.ForeignKey(Issue, on_delete=models.CASCADE, null=True, blank=True)
     message = models.CharField(max_length=255)
@@ -104,6 +289,73 @@ class Notification(models.Model):
     
     class Meta:
         ordering = ['-created_at'] 
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='notif_user_keyset_idx'),
+            # Unread counts and mark_all_read
+            models.Index(fields=['user', 'is_read'], name='notif_user_unread_idx'),
+        ]
      
     def __str__(self):
-        return f"{self.notification_type} for {self.user.username}"  
+        return f"{self.notification_type} for {self.user.username}"
+
+
+class Job(models.Model):
+    """A unit of deferred work, run by ``manage.py runworker`` (see issues.jobs)"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after', 'id'], name='job_claim_idx'),
+            models.Index(fields=['status', 'locked_until'], name='job_visibility_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+class College(models.Model):
+    """A college users and issues can belong to; served by /api/colleges/ (see issues.reference)"""
+    name = models.CharField(max_length=100, unique=True)
+    position = models.PositiveIntegerField(default=0, help_text="Display order, lowest first")
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ['position', 'name']
+
+    def __str__(self):
+        return self.name
+
+
+class CourseUnit(models.Model):
+    """A course unit issues can be raised against; served by /api/course-units/"""
+    name = models.CharField(max_length=100, unique=True)
+    position = models.PositiveIntegerField(default=0, help_text="Display order, lowest first")
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ['position', 'name']
+
+    def __str__(self):
+        return self.name
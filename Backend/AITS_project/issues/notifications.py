@@ -0,0 +1,117 @@
+"""
+Notification fan-out.
+
+Views and serializers describe who should hear about an event with a
+``NotificationBatch`` and call ``send()`` once. Rows are written with
+``bulk_create`` in ``BATCH_SIZE`` chunks: inline, on a small local thread
+pool once the triggering transaction has committed (``thread``), or as a
+durable job for ``manage.py runworker`` (``queue``).
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from . import jobs, response_cache
+from .models import Notification, User
+
+logger = logging.getLogger(__name__)
+
+INLINE = 'inline'
+THREAD = 'thread'
+QUEUE = 'queue'
+
+_executor = None
+_executor_lock = Lock()
+
+
+def fanout_settings():
+    options = {'MODE': INLINE, 'BATCH_SIZE': 500, 'WORKERS': 2}
+    options.update(getattr(settings, 'NOTIFICATION_FANOUT', {}))
+    return options
+
+
+class NotificationBatch:
+    """Notifications produced by one operation, written together by ``send()``"""
+
+    def __init__(self):
+        self.direct = []
+        self.by_role = []
+
+    def add(self, user, notification_type, issue, message):
+        user_id = getattr(user, 'pk', user)
+        self.direct.append((user_id, notification_type, getattr(issue, 'pk', issue), message))
+
+    def add_role(self, role, notification_type, issue, message):
+        """Notify every user with ``role``; recipients are resolved when the batch is written"""
+        self.by_role.append((role, notification_type, getattr(issue, 'pk', issue), message))
+
+    def __bool__(self):
+        return bool(self.direct or self.by_role)
+
+    def send(self):
+        if not self:
+            return
+        options = fanout_settings()
+        if options['MODE'] == QUEUE:
+            # Committed or rolled back together with the triggering write
+            jobs.enqueue('issues.write_notifications', {
+                'direct': self.direct, 'by_role': self.by_role, 'batch_size': options['BATCH_SIZE'],
+            })
+        elif options['MODE'] == THREAD:
+            direct, by_role = list(self.direct), list(self.by_role)
+            transaction.on_commit(lambda: _submit(direct, by_role, options))
+        else:
+            write_notifications(self.direct, self.by_role, options['BATCH_SIZE'])
+
+
+@jobs.task('issues.write_notifications')
+def write_notifications(direct, by_role, batch_size):
+    """Insert the notifications in ``batch_size`` chunks; returns how many rows were written"""
+    pending = []
+    written = 0
+
+    def rows():
+        yield from direct
+        for role, notification_type, issue_id, message in by_role:
+            recipients = User.objects.filter(role=role).values_list('pk', flat=True)
+            for user_id in recipients.iterator(chunk_size=batch_size):
+                yield user_id, notification_type, issue_id, message
+
+    for user_id, notification_type, issue_id, message in rows():
+        pending.append(Notification(
+            user_id=user_id, notification_type=notification_type, issue_id=issue_id, message=message
+        ))
+        if len(pending) >= batch_size:
+            Notification.objects.bulk_create(pending)
+            written += len(pending)
+            pending = []
+    if pending:
+        Notification.objects.bulk_create(pending)
+        written += len(pending)
+    # bulk_create sends no post_save
+    response_cache.bump(
+        *{f'notifications:user:{user_id}' for user_id, *_ in direct},
+        *{f'notifications:role:{role}' for role, *_ in by_role},
+    )
+    return written
+
+
+def _submit(direct, by_role, options):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=options['WORKERS'], thread_name_prefix='notifications')
+    _executor.submit(_run, direct, by_role, options['BATCH_SIZE'])
+
+
+def _run(direct, by_role, batch_size):
+    close_old_connections()
+    try:
+        write_notifications(direct, by_role, batch_size)
+    except Exception:
+        logger.exception("Notification fan-out failed")
+    finally:
+        close_old_connections()
@@ -0,0 +1,159 @@
+import base64
+import json
+from collections import OrderedDict
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opaque-cursor pagination over ``(<keyset_field>, id)``, newest first by default.
+
+    Each page is fetched with a range condition on the last row seen instead
+    of an OFFSET, so page N costs the same as page 1 and rows inserted while
+    a client is paging never shift or duplicate the rows on later pages.
+    Views pick the timestamp column with a ``keyset_field`` attribute, or
+    both column and direction per request with ``get_keyset()``.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = api_settings.PAGE_SIZE or 50
+    max_page_size = 200
+    keyset_field = 'created_at'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.take(list(self.seek(queryset, request, view)))
+
+    def seek(self, queryset, request, view=None, keyset=None):
+        """
+        The query for the requested page plus one row. Async callers iterate
+        it themselves and pass the rows to ``take()``.
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.field, self.descending = keyset or self.get_keyset(view)
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        if cursor is None:
+            reverse, position = False, None
+        else:
+            reverse, position = cursor
+        # Walking backwards from a cursor is the same seek in the opposite order
+        descending = self.descending != reverse
+        prefix = '-' if descending else ''
+        queryset = queryset.order_by(f'{prefix}{self.field}', f'{prefix}pk')
+        if position is not None:
+            value, pk = position
+            lookup = 'lt' if descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{lookup}': value}) | Q(**{self.field: value, f'pk__{lookup}': pk})
+            )
+
+        self.reverse, self.position = reverse, position
+        # One extra row tells us whether another page exists in this direction
+        return self.limit(queryset, self.page_size + 1)
+
+    def take(self, results):
+        """The page from ``seek()``'s rows, recording which links to offer"""
+        reverse, position = self.reverse, self.position
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        if reverse:
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = results
+        return results
+
+    def limit(self, queryset, count):
+        """First ``count`` rows; querysets that can plan this better provide ``limited()``"""
+        if hasattr(queryset, 'limited'):
+            return queryset.limited(count)
+        return queryset[:count]
+
+    def get_keyset(self, view):
+        """(field, descending); views may choose per request with get_keyset()"""
+        if hasattr(view, 'get_keyset'):
+            return view.get_keyset()
+        return getattr(view, 'keyset_field', self.keyset_field), True
+
+    def get_page_size(self, request):
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if requested <= 0:
+            return self.page_size
+        return min(requested, self.max_page_size)
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        return OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ])
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, obj, reverse):
+        value = getattr(obj, self.field)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        payload = json.dumps(
+            {'f': self.field, 'd': int(self.descending), 'v': value, 'id': obj.pk, 'r': int(reverse)},
+            separators=(',', ':'),
+        )
+        token = base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            value = parse_datetime(payload['v'])
+            pk = int(payload['id'])
+            reverse = bool(payload.get('r'))
+            # A cursor only makes sense for the ordering it was issued under
+            same_ordering = payload['f'] == self.field and bool(payload['d']) == self.descending
+        except (TypeError, ValueError, KeyError, json.JSONDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if value is None or not same_ordering:
+            raise NotFound(self.invalid_cursor_message)
+        return reverse, (value, pk)
@@ -1,27 +1,37 @@
 from rest_framework import permissions  
+from .authentication import token_claim
 from .models import User
 
+
+def request_role(request):
+    """
+    The caller's current role. The user row comes from the auth cache, which
+    a role change invalidates; the token's claim, which keeps the role it was
+    issued with until it expires, is only used without a loaded user.
+    """
+    return getattr(request.user, 'role', None) or token_claim(request, 'role')
+
 class IsAdminUser(permissions.BasePermission): 
     def has_permission(self, request, view): 
-        return request.user and request.user.role == User.ADMIN 
+        return request_role(request) == User.ADMIN 
 
 class IsAcademicRegistrar(permissions.BasePermission):  
     def has_permission(self, request, view):
-        return request.user and request.user.role == User.ACADEMIC_REGISTRAR  
+        return request_role(request) == User.ACADEMIC_REGISTRAR  
  
 class IsLecturer(permissions.BasePermission):  
     def has_permission(self, request, view):
-        return request.user and request.user.role == User.LECTURER 
+        return request_role(request) == User.LECTURER 
        
 class IsStudent(permissions.BasePermission): 
     def has_permission(self, request, view):
-        return request.user and request.user.role == User.STUDENT 
+        return request_role(request) == User.STUDENT 
                     
 class IsOwnerOrReadOnly(permissions.BasePermission): 
     def has_object_permission(self, request, view, obj):  
         if request.method in permissions.SAFE_METHODS: 
             return True
-        return obj.created_by == request.user 
+        return obj.created_by_id == request.user.pk 
 #added lecturer  another role
 class IsLecturerAssignedToIssue(permissions.BasePermission): 
     """
@@ -30,6 +40,6 @@ class IsLecturerAssignedToIssue(permissions.BasePermission):
      
     def has_object_permission(self, request, view, obj): 
         # Check if user is a lecturer and is assigned to this issue
-        return (request.user.role == User.LECTURER and 
-                obj.assigned_to == request.user) 
+        return (request_role(request) == User.LECTURER and 
+                obj.assigned_to_id == request.user.pk) 
  
\ No newline at end of file
@@ -0,0 +1,200 @@
+"""
+Opt-in detection of N+1 and slow queries, for development and test runs.
+
+``QueryDetector`` watches every database connection through
+``connection.execute_wrapper`` while it is active. It groups the SQL it
+sees by template: literals, numbers and ``IN (...)`` lists are replaced
+with placeholders, so the same lookup run for different rows falls under
+one template. Each query also records where it was issued, i.e. the
+innermost stack frame in project code. ``findings()`` reports:
+
+- ``n+1``: a SELECT template run ``REPEAT_THRESHOLD`` times or more. This is
+  the query-per-row loop that ``select_related``, ``prefetch_related`` or an
+  aggregate would replace.
+- ``slow``: any query that took ``SLOW_QUERY_MS`` or longer.
+
+``issues.middleware.QueryDetectorMiddleware`` checks each request when ``QUERY_DETECTOR``
+is enabled. ``QueryDetectorTestMixin`` checks the requests a test makes,
+plus any block under ``assertNoQueryProblems()``. With ``ACTION`` 'log',
+findings go to the ``issues.queries`` logger as a JSON warning. With
+'raise', they raise ``QueryProblems``, which fails the test or turns the
+request into a server error under ``runserver``.
+"""
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from dataclasses import asdict, dataclass
+
+from django.conf import settings
+from django.db import connections
+from django.test import override_settings
+
+from . import metrics
+
+logger = logging.getLogger('issues.queries')
+
+_PATTERNS = [
+    (re.compile(r"'(?:[^']|'')*'"), "'?'"),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\bIN \(\?(?:, ?\?)*\)', re.IGNORECASE), 'IN (...)'),
+    (re.compile(r'\s+'), ' '),
+]
+# Frames of execute wrappers sit between the ORM and the code that ran the query
+_WRAPPER_FILES = {__file__, metrics.__file__}
+
+
+def detector_settings():
+    options = {
+        'ENABLED': False,
+        'ACTION': 'log',
+        'REPEAT_THRESHOLD': 5,
+        'SLOW_QUERY_MS': 100,
+        # Templates matching any of these regexes are never reported
+        'IGNORE': [],
+    }
+    options.update(getattr(settings, 'QUERY_DETECTOR', {}))
+    return options
+
+
+def normalize(sql):
+    """The template of ``sql``: the same for every run of one lookup, whatever its values"""
+    for pattern, replacement in _PATTERNS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def caller():
+    """``path:line in function`` of the innermost frame in project code, execute wrappers aside"""
+    base = str(settings.BASE_DIR)
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(base) and filename not in _WRAPPER_FILES and 'site-packages' not in filename:
+            return f'{os.path.relpath(filename, base)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return 'unknown'
+
+
+class QueryProblems(AssertionError):
+    def __init__(self, findings, where=''):
+        self.findings = findings
+        super().__init__(format_findings(findings, where))
+
+
+@dataclass
+class Finding:
+    kind: str
+    template: str
+    count: int
+    total_ms: float
+    # Stack locations that issued it, most frequent first
+    locations: list
+
+
+class QueryDetector:
+    """Record every query run while active; ``findings()`` afterwards"""
+
+    def __init__(self, repeat_threshold=None, slow_query_ms=None, ignore=None):
+        options = detector_settings()
+        self.repeat_threshold = repeat_threshold or options['REPEAT_THRESHOLD']
+        self.slow_query_ms = slow_query_ms if slow_query_ms is not None else options['SLOW_QUERY_MS']
+        self.ignore = [re.compile(pattern) for pattern in (options['IGNORE'] if ignore is None else ignore)]
+        # template -> [count, total seconds, {location: count}]
+        self.templates = defaultdict(lambda: [0, 0.0, defaultdict(int)])
+        self.slow = []
+
+    def __enter__(self):
+        self.stack = ExitStack()
+        for connection in connections.all():
+            self.stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stack.close()
+
+    def __call__(self, execute, sql, params, many, context):
+        began = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - began
+            template = normalize(sql)
+            location = caller()
+            entry = self.templates[template]
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2][location] += 1
+            if elapsed * 1000 >= self.slow_query_ms:
+                self.slow.append((template, elapsed, location))
+
+    def findings(self):
+        found = []
+        for template, (count, seconds, locations) in self.templates.items():
+            if count >= self.repeat_threshold and template.upper().startswith('SELECT') and not self.ignored(template):
+                ordered = sorted(locations, key=locations.get, reverse=True)
+                found.append(Finding('n+1', template, count, round(seconds * 1000, 3), ordered))
+        for template, seconds, location in self.slow:
+            if not self.ignored(template):
+                found.append(Finding('slow', template, 1, round(seconds * 1000, 3), [location]))
+        return found
+
+    def ignored(self, template):
+        return any(pattern.search(template) for pattern in self.ignore)
+
+
+def format_findings(findings, where=''):
+    lines = [f"{len(findings)} query problem(s){f' in {where}' if where else ''}:"]
+    for finding in findings:
+        lines.append(
+            f"  [{finding.kind}] {finding.count}x, {finding.total_ms}ms, from {', '.join(finding.locations[:3])}\n"
+            f"    {finding.template}"
+        )
+    return '\n'.join(lines)
+
+
+def report(findings, where, action=None):
+    """Log ``findings`` as structured warnings, or raise them, as ``ACTION`` says"""
+    if not findings:
+        return
+    action = action or detector_settings()['ACTION']
+    if action == 'raise':
+        raise QueryProblems(findings, where)
+    for finding in findings:
+        logger.warning(
+            json.dumps({'event': 'query_problem', 'where': where, **asdict(finding)}),
+            extra={'query_problem': asdict(finding), 'where': where},
+        )
+
+
+class QueryDetectorTestMixin:
+    """
+    TestCase mixin. With ``detect_queries`` set, or QUERY_DETECTOR enabled, the
+    test client's requests are checked. Findings fail the test, unless
+    QUERY_DETECTOR is enabled with ACTION 'log'. ``assertNoQueryProblems()``
+    checks a block of code directly and always fails the test.
+    """
+    detect_queries = False
+
+    def setUp(self):
+        super().setUp()
+        options = detector_settings()
+        if self.detect_queries or options['ENABLED']:
+            override = override_settings(QUERY_DETECTOR={
+                **options, 'ENABLED': True, 'ACTION': options['ACTION'] if options['ENABLED'] else 'raise',
+            })
+            override.enable()
+            self.addCleanup(override.disable)
+
+    @contextmanager
+    def assertNoQueryProblems(self, **options):
+        with QueryDetector(**options) as detector:
+            yield detector
+        findings = detector.findings()
+        if findings:
+            self.fail(format_findings(findings, self.id()))
@@ -0,0 +1,116 @@
+"""
+Reference data for the registration and issue forms: colleges, course units
+and the fields each role must fill in.
+
+Colleges and course units are rows in the College and CourseUnit tables,
+managed in the admin. ``post_migrate`` seeds both tables with the lists the
+API used to hard-code. ``current()`` keeps one snapshot per process: the
+names, sets of them for O(1) validation, and the pre-rendered JSON bodies
+with their content-hash ETags. The snapshot is rebuilt after a change to
+either table, or after ``REFERENCE_DATA['TTL']`` seconds to pick up changes
+made in other processes.
+"""
+import hashlib
+import json
+import time
+from threading import Lock
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import College, CourseUnit, User
+
+DEFAULT_COLLEGES = [
+    "College of Computing and Information Sciences",
+    "College of Engineering",
+    "College of Business and Management Sciences",
+    "College of Education and External Studies",
+]
+
+DEFAULT_COURSE_UNITS = [
+    "Introduction to Programming",
+    "Data Structures and Algorithms",
+    "Database Systems",
+    "Software Engineering",
+    "Computer Networks",
+]
+
+ROLE_FIELDS = {
+    User.STUDENT: {"required_fields": ["student_number", "college", "phone_number"], "optional_fields": []},
+    User.LECTURER: {"required_fields": ["college", "phone_number"], "optional_fields": []},
+    User.ACADEMIC_REGISTRAR: {"required_fields": ["college", "phone_number"], "optional_fields": []},
+}
+
+
+def reference_settings():
+    options = {'TTL': 300, 'MAX_AGE': 86400}
+    options.update(getattr(settings, 'REFERENCE_DATA', {}))
+    return options
+
+
+class Document:
+    """A JSON response body rendered once, with its ETag"""
+
+    def __init__(self, data):
+        self.body = json.dumps(data, separators=(',', ':')).encode()
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+
+
+class Snapshot:
+    def __init__(self, colleges, course_units):
+        self.colleges = tuple(colleges)
+        self.course_units = tuple(course_units)
+        self.college_names = frozenset(self.colleges)
+        self.course_unit_names = frozenset(self.course_units)
+        self.documents = {
+            'colleges': Document(list(self.colleges)),
+            'course_units': Document(list(self.course_units)),
+        }
+
+
+# Role fields never change at runtime
+ROLE_FIELD_DOCUMENTS = {role: Document(fields) for role, fields in ROLE_FIELDS.items()}
+
+_snapshot = None
+_expires = 0.0
+_lock = Lock()
+
+
+def current():
+    global _snapshot, _expires
+    snapshot = _snapshot
+    if snapshot is not None and time.monotonic() < _expires:
+        return snapshot
+    with _lock:
+        if _snapshot is None or time.monotonic() >= _expires:
+            _snapshot = Snapshot(
+                College.objects.filter(is_active=True).values_list('name', flat=True),
+                CourseUnit.objects.filter(is_active=True).values_list('name', flat=True),
+            )
+            _expires = time.monotonic() + reference_settings()['TTL']
+        return _snapshot
+
+
+def invalidate():
+    global _snapshot
+    with _lock:
+        _snapshot = None
+
+
+@receiver(post_save, sender=College)
+@receiver(post_delete, sender=College)
+@receiver(post_save, sender=CourseUnit)
+@receiver(post_delete, sender=CourseUnit)
+def reference_changed(sender, **kwargs):
+    invalidate()
+
+
+def seed(using='default', **kwargs):
+    """post_migrate receiver: fill empty reference tables with the defaults"""
+    for model, names in ((College, DEFAULT_COLLEGES), (CourseUnit, DEFAULT_COURSE_UNITS)):
+        if not model.objects.using(using).exists():
+            model.objects.using(using).bulk_create(
+                model(name=name, position=position) for position, name in enumerate(names)
+            )
+    invalidate()
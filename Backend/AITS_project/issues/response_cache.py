@@ -0,0 +1,245 @@
+"""
+Per-user cache of read-endpoint responses on Django's cache framework.
+
+A cached view names the *scopes* its response depends on: ``issues:all``,
+``issues:user:<id>`` (issues a user created or is assigned),
+``notifications:user:<id>``, ``notifications:role:<role>``,
+``comments:issue:<id>`` and ``users``. Each scope has a version number in
+the cache, and an entry's key is built from the user, the full URL, the
+versions of its scopes and, for requests read from a replica, that replica's
+sync generation (see ``routers``). A write bumps the versions it affects, so
+stale entries are never read again and age out on their own.
+
+Issue, Comment, Notification and User post_save/post_delete bump versions
+through signals. Writes that skip signals (bulk updates, ``bulk_create``,
+queryset ``update()``) call ``bump()`` themselves. Every bump is repeated
+once the transaction commits, so a response cached from the old rows in
+between is not kept.
+
+On a miss, one request computes the entry under a short ``cache.add`` lock
+while others asking for the same key wait for it, up to ``LOCK_WAIT``
+seconds. Hits and misses are counted per endpoint (``stats()``,
+``manage.py response_cache_stats``) and responses carry ``X-Cache``.
+
+With locmem each process has its own entries and versions, so a write
+handled by one worker leaves the others serving stale entries; the file
+backend or a cache server shares both between processes. The settings
+therefore enable the cache by default only with a shared backend.
+"""
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.http import HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from rest_framework.response import Response
+
+from . import routers
+from .models import Comment, Issue, Notification, User
+
+PREFIX = 'respcache'
+ENDPOINTS = set()
+
+
+def cache_settings():
+    options = {'ENABLED': True, 'TIMEOUT': 300, 'LOCK_TIMEOUT': 10, 'LOCK_WAIT': 2.0}
+    options.update(getattr(settings, 'RESPONSE_CACHE', {}))
+    return options
+
+
+def enabled():
+    return cache_settings()['ENABLED']
+
+
+# --- Scopes -----------------------------------------------------------------
+
+def issue_scopes(user):
+    """The scope of the issues ``user`` can see, following IssueQuerySet.visible_to"""
+    if user.role in (User.ADMIN, User.ACADEMIC_REGISTRAR):
+        return ['issues:all']
+    return [f'issues:user:{user.pk}']
+
+
+def notification_scopes(user):
+    return [f'notifications:user:{user.pk}', f'notifications:role:{user.role}']
+
+
+def _version_key(scope):
+    return f'{PREFIX}:v:{scope}'
+
+
+def versions(scopes):
+    keys = [_version_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # Start from the clock, so a version lost to eviction never repeats an old one
+            cache.add(key, time.time_ns(), timeout=None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def bump(*scopes):
+    """Invalidate every cached response depending on ``scopes``, now and again on commit"""
+    scopes = {scope for scope in scopes if scope}
+    if not scopes or not enabled():
+        return
+    _bump(scopes)
+    transaction.on_commit(lambda: _bump(scopes))
+
+
+def _bump(scopes):
+    for scope in scopes:
+        key = _version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=None)
+
+
+def issue_change_scopes(*user_ids):
+    return ['issues:all'] + [f'issues:user:{user_id}' for user_id in user_ids if user_id]
+
+
+# --- Signals ----------------------------------------------------------------
+
+@receiver(pre_save, sender=Issue)
+def remember_issue_users(sender, instance, **kwargs):
+    # The previous assignee's views change too; _counted_state is still the old row here
+    state = getattr(instance, '_counted_state', None)
+    instance._cached_users = state[1:] if state else ()
+
+
+@receiver(post_save, sender=Issue)
+@receiver(post_delete, sender=Issue)
+def issue_changed(sender, instance, **kwargs):
+    bump(*issue_change_scopes(
+        instance.created_by_id, instance.assigned_to_id, *getattr(instance, '_cached_users', ())
+    ))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    bump(f'comments:issue:{instance.issue_id}')
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def notification_changed(sender, instance, **kwargs):
+    bump(f'notifications:user:{instance.user_id}')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    # Names and colleges appear in other users' issue and comment lists
+    bump('users')
+
+
+# --- Views ------------------------------------------------------------------
+
+def cached_response(name, scopes):
+    """
+    Cache a DRF view method's 200 responses per user, URL and scope versions.
+    ``scopes(view, request)`` returns the scopes the response depends on.
+    """
+    ENDPOINTS.add(name)
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            if not enabled() or not request.user.is_authenticated:
+                return method(view, request, *args, **kwargs)
+            scope_list = scopes(view, request)
+            digest = hashlib.sha256(
+                repr((request.get_full_path(), scope_list, versions(scope_list), routers.read_generation())).encode()
+            ).hexdigest()[:32]
+            key = f'{PREFIX}:r:{name}:{request.user.pk}:{digest}'
+
+            entry = cache.get(key)
+            if entry is None:
+                entry = _wait_for(key)
+            if entry is not None:
+                _count(name, 'hit')
+                return _replay(request, entry, 'HIT')
+
+            _count(name, 'miss')
+            options = cache_settings()
+            lock = f'{key}:lock'
+            locked = cache.add(lock, 1, timeout=options['LOCK_TIMEOUT'])
+            try:
+                response = method(view, request, *args, **kwargs)
+                if response.status_code == 200 and isinstance(response, Response):
+                    entry = {
+                        'data': response.data,
+                        'headers': {
+                            header: response[header] for header in ('ETag', 'Last-Modified') if response.has_header(header)
+                        },
+                    }
+                    cache.set(key, entry, timeout=options['TIMEOUT'])
+            finally:
+                if locked:
+                    cache.delete(lock)
+            response['X-Cache'] = 'MISS'
+            patch_vary_headers(response, ('Authorization',))
+            return response
+        return wrapper
+    return decorator
+
+
+def _wait_for(key):
+    """If another request is building ``key``, wait up to LOCK_WAIT seconds for it"""
+    lock = f'{key}:lock'
+    deadline = time.monotonic() + cache_settings()['LOCK_WAIT']
+    while cache.get(lock) is not None and time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def _replay(request, entry, status):
+    etag = entry['headers'].get('ETag')
+    if etag and etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        response = Response(entry['data'])
+    for header, value in entry['headers'].items():
+        response[header] = value
+    response['X-Cache'] = status
+    if 'ETag' in entry['headers']:
+        response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+# --- Statistics -------------------------------------------------------------
+
+def _count(name, outcome):
+    key = f'{PREFIX}:stats:{name}:{outcome}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def stats():
+    """``{endpoint: {'hits', 'misses', 'hit_ratio'}}`` across every process sharing the cache"""
+    names = sorted(ENDPOINTS)
+    keys = [f'{PREFIX}:stats:{name}:{outcome}' for name in names for outcome in ('hit', 'miss')]
+    counts = cache.get_many(keys)
+    result = {}
+    for name in names:
+        hits = counts.get(f'{PREFIX}:stats:{name}:hit', 0)
+        misses = counts.get(f'{PREFIX}:stats:{name}:miss', 0)
+        total = hits + misses
+        result[name] = {'hits': hits, 'misses': misses, 'hit_ratio': hits / total if total else None}
+    return result
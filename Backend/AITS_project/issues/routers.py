@@ -0,0 +1,157 @@
+"""
+Read/write database routing with read replicas.
+
+``ReadReplicaRouter`` keeps every write, and every read outside a request,
+on ``default``. ``issues.middleware.ReadReplicaMiddleware`` makes the
+current request visible to the router through ``current_request``. A safe-method request to one of
+``DATABASE_ROUTING['READ_VIEWS']`` then reads from one of the ``REPLICAS``
+aliases, chosen once per request. Entries in READ_VIEWS are view paths as
+``ResolverMatch._func_path`` reports them (``issues.views.IssueViewSet``) or
+a module prefix (``issues.async_views``). View code does not change.
+
+A replica trails the primary. So that a user sees their own changes, a
+successful unsafe request marks its user in the cache for
+``STICKY_SECONDS``, and that user's reads stay on ``default`` meanwhile.
+The user comes from the request's access token, because routing is decided
+before DRF authenticates. With more than one worker process the mark needs
+a shared cache backend, as the response cache does, so settings leave
+REPLICAS empty with a per-process one unless ``REPLICA_ROUTING=1``.
+
+A replica can be any database alias. ``DATABASE_REPLICAS`` in the
+environment adds SQLite copies of the primary, which ``manage.py
+sync_replica`` refreshes with SQLite's online backup. Each sync bumps the
+replica's generation, which the response cache folds into its keys, so a
+response built from a stale copy stops being served once the copy is
+refreshed.
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+PREFIX = 'dbrouter'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+current_request = ContextVar('current_request', default=None)
+_UNDECIDED = object()
+
+
+def routing_settings():
+    options = {'REPLICAS': [], 'READ_VIEWS': [], 'STICKY_SECONDS': 5}
+    options.update(getattr(settings, 'DATABASE_ROUTING', {}))
+    return options
+
+
+def _sticky_key(user_id):
+    return f'{PREFIX}:wrote:{user_id}'
+
+
+def _generation_key(alias):
+    return f'{PREFIX}:generation:{alias}'
+
+
+def token_user_id(request):
+    """The user id in the request's Bearer token, or None"""
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    try:
+        raw_token = header and authentication.get_raw_token(header)
+        if not raw_token:
+            return None
+        return authentication.get_validated_token(raw_token).get(api_settings.USER_ID_CLAIM)
+    except AuthenticationFailed:
+        # The view's own authentication reports it
+        return None
+
+
+def mark_write(user_id):
+    """Keep ``user_id``'s reads on the primary for STICKY_SECONDS"""
+    if user_id is not None:
+        cache.set(_sticky_key(user_id), time.time(), timeout=routing_settings()['STICKY_SECONDS'])
+
+
+def is_sticky(user_id):
+    return user_id is not None and cache.get(_sticky_key(user_id)) is not None
+
+
+def replica_synced(alias):
+    """Record that ``alias`` now holds a fresh copy of the primary"""
+    try:
+        cache.incr(_generation_key(alias))
+    except ValueError:
+        cache.add(_generation_key(alias), time.time_ns(), timeout=None)
+
+
+def read_view(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return False
+    path = match._func_path
+    return any(path == view or path.startswith(f'{view}.') for view in routing_settings()['READ_VIEWS'])
+
+
+def _choose(request):
+    """The alias this request reads from, or None for the router's default"""
+    options = routing_settings()
+    if not options['REPLICAS'] or request.method not in SAFE_METHODS or not read_view(request):
+        return None
+    if is_sticky(token_user_id(request)):
+        return None
+    return random.choice(options['REPLICAS'])
+
+
+def read_alias():
+    """The replica the current request reads from, or None"""
+    request = current_request.get()
+    if request is None:
+        return None
+    alias = getattr(request, '_read_alias', _UNDECIDED)
+    if alias is _UNDECIDED:
+        if getattr(request, 'resolver_match', None) is None:
+            # Not resolved yet (earlier middleware); decide once the view is known
+            return None
+        alias = request._read_alias = _choose(request)
+    return alias
+
+
+def read_generation():
+    """Identifies the data the current request reads: None on the primary"""
+    alias = read_alias()
+    if alias is None:
+        return None
+    return alias, cache.get(_generation_key(alias))
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {'default', *routing_settings()['REPLICAS']}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of the primary, schema included
+        if db in routing_settings()['REPLICAS']:
+            return False
+        return None
+
+
+def finish(request, response):
+    """Mark the user of a successful unsafe request as having written"""
+    if (
+        routing_settings()['REPLICAS']
+        and request.method not in SAFE_METHODS
+        and response.status_code < 400
+    ):
+        mark_write(token_user_id(request))
@@ -0,0 +1,184 @@
+"""
+Full-text issue search backed by SQLite FTS5.
+
+Two external FTS5 tables mirror the searchable text: one row per issue
+(title, description, course unit, keyed by the issue id) and one row per
+comment (keyed by the comment id, carrying its issue id). Signal receivers
+keep them in step on every write, ``post_migrate`` creates them, and
+``manage.py rebuild_search_index`` repopulates them from the source tables.
+
+On other database backends search falls back to case-insensitive substring
+matching over the same fields.
+"""
+import re
+
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Comment, Issue
+
+ISSUE_TABLE = 'issues_issue_fts'
+COMMENT_TABLE = 'issues_comment_fts'
+ISSUE_FIELDS = ('title', 'description', 'course_unit')
+
+# bm25() weights for title, description and course unit; comment matches
+# count for half as much as a match in the issue itself
+ISSUE_WEIGHTS = (10.0, 4.0, 6.0)
+COMMENT_WEIGHT = 0.5
+
+
+def _connection():
+    return connections[router.db_for_write(Issue)]
+
+
+def enabled(connection=None):
+    return (connection or _connection()).vendor == 'sqlite'
+
+
+def create_index_tables(using='default', **kwargs):
+    """post_migrate receiver: create the FTS tables, filling them if they are new"""
+    connection = connections[using]
+    if not enabled(connection):
+        return
+    with connection.cursor() as cursor:
+        existing = set(connection.introspection.table_names(cursor))
+        if ISSUE_TABLE in existing and COMMENT_TABLE in existing:
+            return
+    rebuild(connection)
+
+
+def rebuild(connection=None):
+    """Drop and repopulate both FTS tables from the issue and comment tables"""
+    connection = connection or _connection()
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {ISSUE_TABLE}')
+        cursor.execute(f'DROP TABLE IF EXISTS {COMMENT_TABLE}')
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE {ISSUE_TABLE} USING fts5("
+            f"title, description, course_unit, tokenize='porter unicode61')"
+        )
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE {COMMENT_TABLE} USING fts5("
+            f"content, issue_id UNINDEXED, tokenize='porter unicode61')"
+        )
+        cursor.execute(
+            f"INSERT INTO {ISSUE_TABLE} (rowid, title, description, course_unit) "
+            f"SELECT id, title, description, COALESCE(course_unit, '') FROM {Issue._meta.db_table}"
+        )
+        cursor.execute(
+            f"INSERT INTO {COMMENT_TABLE} (rowid, content, issue_id) "
+            f"SELECT id, content, issue_id FROM {Comment._meta.db_table}"
+        )
+        cursor.execute(f'SELECT COUNT(*) FROM {ISSUE_TABLE}')
+        return cursor.fetchone()[0]
+
+
+@receiver(post_save, sender=Issue)
+def index_issue(sender, instance, created, update_fields=None, **kwargs):
+    if not enabled():
+        return
+    if update_fields is not None and not set(update_fields) & set(ISSUE_FIELDS):
+        return
+    with _connection().cursor() as cursor:
+        if not created:
+            cursor.execute(f'DELETE FROM {ISSUE_TABLE} WHERE rowid = %s', [instance.pk])
+        cursor.execute(
+            f'INSERT INTO {ISSUE_TABLE} (rowid, title, description, course_unit) VALUES (%s, %s, %s, %s)',
+            [instance.pk, instance.title, instance.description, instance.course_unit or ''],
+        )
+
+
+def index_issues(issues):
+    """Index newly inserted issues that bypassed post_save, e.g. via bulk_create"""
+    if not enabled() or not issues:
+        return
+    with _connection().cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {ISSUE_TABLE} (rowid, title, description, course_unit) VALUES (%s, %s, %s, %s)',
+            [(issue.pk, issue.title, issue.description, issue.course_unit or '') for issue in issues],
+        )
+
+
+@receiver(post_delete, sender=Issue)
+def unindex_issue(sender, instance, **kwargs):
+    if enabled():
+        with _connection().cursor() as cursor:
+            cursor.execute(f'DELETE FROM {ISSUE_TABLE} WHERE rowid = %s', [instance.pk])
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, created, **kwargs):
+    if not enabled():
+        return
+    with _connection().cursor() as cursor:
+        if not created:
+            cursor.execute(f'DELETE FROM {COMMENT_TABLE} WHERE rowid = %s', [instance.pk])
+        cursor.execute(
+            f'INSERT INTO {COMMENT_TABLE} (rowid, content, issue_id) VALUES (%s, %s, %s)',
+            [instance.pk, instance.content, instance.issue_id],
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, **kwargs):
+    if enabled():
+        with _connection().cursor() as cursor:
+            cursor.execute(f'DELETE FROM {COMMENT_TABLE} WHERE rowid = %s', [instance.pk])
+
+
+def match_expression(text):
+    """
+    Turn free text into an FTS5 query: every word must match, the last one
+    as a prefix so partially typed words still find results.
+    """
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search(scope, text, limit, offset=0):
+    """
+    Issues from ``scope`` (a role-scoped Issue queryset) matching ``text``,
+    best match first.
+    """
+    expression = match_expression(text)
+    if expression is None:
+        return []
+    if not enabled():
+        lookup = Q()
+        for word in re.findall(r'\w+', text):
+            lookup &= (
+                Q(title__icontains=word) | Q(description__icontains=word)
+                | Q(course_unit__icontains=word) | Q(comments__content__icontains=word)
+            )
+        return list(scope.filter(lookup).distinct().order_by('-created_at', '-id')[offset:offset + limit])
+
+    params = [expression, expression]
+    scope_clause = ''
+    if scope.query.where:
+        # Only restrict when the scope actually filters; registrars see everything
+        scope_sql, scope_params = scope.order_by().values('pk').query.sql_with_params()
+        scope_clause = f'WHERE issue_id IN ({scope_sql})'
+        params.extend(scope_params)
+    weights = ', '.join(str(weight) for weight in ISSUE_WEIGHTS)
+    sql = (
+        f'SELECT issue_id, MIN(rank) AS rank FROM ('
+        f'SELECT rowid AS issue_id, bm25({ISSUE_TABLE}, {weights}) AS rank '
+        f'FROM {ISSUE_TABLE} WHERE {ISSUE_TABLE} MATCH %s '
+        f'UNION ALL '
+        f'SELECT issue_id, bm25({COMMENT_TABLE}) * {COMMENT_WEIGHT} '
+        f'FROM {COMMENT_TABLE} WHERE {COMMENT_TABLE} MATCH %s'
+        f') AS matches {scope_clause} '
+        f'GROUP BY issue_id ORDER BY rank, issue_id LIMIT %s OFFSET %s'
+    )
+    params.extend([limit, offset])
+    with _connection().cursor() as cursor:
+        cursor.execute(sql, params)
+        ranked = [row[0] for row in cursor.fetchall()]
+    issues = scope.in_bulk(ranked)
+    return [issues[pk] for pk in ranked if pk in issues]
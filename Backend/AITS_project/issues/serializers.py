@@ -1,10 +1,14 @@
 from rest_framework import serializers 
 from django.contrib.auth import get_user_model
+from django.contrib.auth.validators import UnicodeUsernameValidator
 from .models import Issue, Comment, Notification 
+from .metrics import TimedSerializerMixin
+from .notifications import NotificationBatch
+from . import bulk, reference
 
 User = get_user_model()
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
     
     class Meta:
@@ -27,14 +31,39 @@ class UserSerializer(serializers.ModelSerializer):
         )
         return user
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserImportSerializer(serializers.ModelSerializer):
+    """
+    One row of a user import. Uniqueness is checked per chunk by
+    issues.imports instead of with a query per row, and a missing password
+    leaves the account with an unusable one.
+    """
+    password = serializers.CharField(write_only=True, required=False)
+    
+    class Meta:
+        model = User
+        fields = ('username', 'email', 'password', 'first_name', 'last_name', 
+                  'role', 'phone_number', 'student_number', 'college')
+        extra_kwargs = {
+            'username': {'validators': [UnicodeUsernameValidator()]},
+            'student_number': {'validators': []},
+        }
+    
+    def validate(self, attrs):
+        errors = User.role_field_errors(attrs.get('role', User.STUDENT), attrs.get('student_number'), attrs.get('college'))
+        if errors:
+            raise serializers.ValidationError(errors)
+        if attrs.get('role', User.STUDENT) != User.STUDENT:
+            attrs['student_number'] = None
+        return attrs
+
+class UserProfileSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 
                   'role', 'phone_number', 'student_number', 'college')
         read_only_fields = ('id', 'username', 'role')
    
-class UserListSerializer(serializers.ModelSerializer):
+class UserListSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     full_name = serializers.SerializerMethodField()
     
     class Meta:
@@ -44,7 +73,20 @@ class UserListSerializer(serializers.ModelSerializer):
     def get_full_name(self, obj):
         return f"{obj.first_name} {obj.last_name}".strip()
 
-class IssueSerializer(serializers.ModelSerializer):
+class ReferenceFieldsMixin:
+    """Check college and course unit against the cached reference data, without a query"""
+    
+    def validate_college(self, value):
+        if value and value not in reference.current().college_names:
+            raise serializers.ValidationError("Unknown college.")
+        return value
+    
+    def validate_course_unit(self, value):
+        if value and value not in reference.current().course_unit_names:
+            raise serializers.ValidationError("Unknown course unit.")
+        return value
+
+class IssueSerializer(TimedSerializerMixin, ReferenceFieldsMixin, serializers.ModelSerializer):
     created_by_name = serializers.SerializerMethodField()
     assigned_to_name = serializers.SerializerMethodField()
     
@@ -73,25 +115,22 @@ class IssueSerializer(serializers.ModelSerializer):
             validated_data['college'] = self.context['request'].user.college
         
         issue = Issue.objects.create(**validated_data)
+        notifications = NotificationBatch()
         
         # Create notification for the assigned user if any
         if issue.assigned_to: 
-            Notification.objects.create(
-                user=issue.assigned_to, 
-                notification_type=Notification.ISSUE_CREATED, 
-                issue=issue,
-                message=f"New issue '{issue.title}' has been assigned to you"
+            notifications.add(
+                issue.assigned_to, Notification.ISSUE_CREATED, issue,
+                f"New issue '{issue.title}' has been assigned to you"
             ) 
         
         # Create notification for academic registrars
-        for registrar in User.objects.filter(role=User.ACADEMIC_REGISTRAR): 
-            Notification.objects.create(
-                user=registrar,
-                notification_type=Notification.ISSUE_CREATED,
-                issue=issue,
-                message=f"New issue '{issue.title}' has been created by {issue.created_by.get_full_name()}"
-            )
+        notifications.add_role(
+            User.ACADEMIC_REGISTRAR, Notification.ISSUE_CREATED, issue,
+            f"New issue '{issue.title}' has been created by {issue.created_by.get_full_name()}"
+        )
         
+        notifications.send()
         return issue
     
     def update(self, instance, validated_data): 
@@ -103,48 +142,71 @@ class IssueSerializer(serializers.ModelSerializer):
             setattr(instance, attr, value) 
         
         instance.save()
+        notifications = NotificationBatch()
         
         # Create notifications for status changes and display
         if 'status' in validated_data and old_status != instance.status: 
             # Notify the creator
-            Notification.objects.create(
-                user=instance.created_by,
-                notification_type=Notification.STATUS_CHANGED, 
-                issue=instance,
-                message=f"Status of your issue '{instance.title}' has been changed to {instance.get_status_display()}"
+            notifications.add(
+                instance.created_by, Notification.STATUS_CHANGED, instance,
+                f"Status of your issue '{instance.title}' has been changed to {instance.get_status_display()}"
             )
             
             # Notify the assigned user if any
             if instance.assigned_to and instance.assigned_to != instance.created_by: 
-                Notification.objects.create(
-                    user=instance.assigned_to,
-                    notification_type=Notification.STATUS_CHANGED,
-                    issue=instance,
-                    message=f"Status of issue '{instance.title}' has been changed to {instance.get_status_display()}"
+                notifications.add(
+                    instance.assigned_to, Notification.STATUS_CHANGED, instance,
+                    f"Status of issue '{instance.title}' has been changed to {instance.get_status_display()}"
                 )
         
         # Create notifications for assignment changes
         if 'assigned_to' in validated_data and old_assigned_to != instance.assigned_to:
             if instance.assigned_to:
-                Notification.objects.create(
-                    user=instance.assigned_to,
-                    notification_type=Notification.ASSIGNED,
-                    issue=instance,
-                    message=f"Issue '{instance.title}' has been assigned to you"
+                notifications.add(
+                    instance.assigned_to, Notification.ASSIGNED, instance,
+                    f"Issue '{instance.title}' has been assigned to you"
                 )
             
             # Notify the creator if they're not the one making the change
             if instance.created_by != self.context['request'].user:
-                Notification.objects.create(
-                    user=instance.created_by,
-                    notification_type=Notification.ISSUE_UPDATED,
-                    issue=instance,
-                    message=f"Your issue '{instance.title}' has been assigned to {instance.assigned_to.get_full_name() if instance.assigned_to else 'no one'}"
+                notifications.add(
+                    instance.created_by, Notification.ISSUE_UPDATED, instance,
+                    f"Your issue '{instance.title}' has been assigned to {instance.assigned_to.get_full_name() if instance.assigned_to else 'no one'}"
                 )
         
+        notifications.send()
         return instance
 
-class CommentSerializer(serializers.ModelSerializer):
+class IssueImportSerializer(ReferenceFieldsMixin, serializers.ModelSerializer):
+    """One row of an issue import; users are named by username and resolved per chunk"""
+    created_by = serializers.CharField(max_length=150)
+    assigned_to = serializers.CharField(max_length=150, required=False)
+    
+    class Meta:
+        model = Issue
+        fields = ('title', 'description', 'status', 'priority', 'created_by', 'assigned_to', 
+                  'course_unit', 'college')
+
+class BulkIssueUpdateSerializer(serializers.Serializer):
+    """Input for IssueViewSet.bulk: the issue ids and the changes to apply to all of them"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=bulk.MAX_IDS
+    )
+    assigned_to = serializers.PrimaryKeyRelatedField(
+        queryset=User.objects.filter(role__in=[User.LECTURER, User.ACADEMIC_REGISTRAR, User.ADMIN]),
+        required=False, allow_null=True,
+    )
+    status = serializers.ChoiceField(choices=Issue.STATUS_CHOICES, required=False)
+    priority = serializers.ChoiceField(choices=Issue.PRIORITY_CHOICES, required=False)
+    
+    def validate(self, attrs):
+        if not any(field in attrs for field in bulk.FIELDS):
+            raise serializers.ValidationError(
+                f"Provide at least one of: {', '.join(bulk.FIELDS)}."
+            )
+        return attrs
+
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     created_by_name = serializers.SerializerMethodField()
     
     class Meta:
@@ -161,28 +223,27 @@ class CommentSerializer(serializers.ModelSerializer):
         validated_data['created_by'] = self.context['request'].user
         comment = Comment.objects.create(**validated_data)
         
+        notifications = NotificationBatch()
+        
         # Create notification for the issue creator
         issue = comment.issue
         if issue.created_by != self.context['request'].user:
-            Notification.objects.create(
-                user=issue.created_by,
-                notification_type=Notification.COMMENT_ADDED,
-                issue=issue,
-                message=f"New comment on your issue '{issue.title}'"
+            notifications.add(
+                issue.created_by, Notification.COMMENT_ADDED, issue,
+                f"New comment on your issue '{issue.title}'"
             )
         
         # Create notification for the assigned user
         if issue.assigned_to and issue.assigned_to != self.context['request'].user and issue.assigned_to != issue.created_by:
-            Notification.objects.create(
-                user=issue.assigned_to,
-                notification_type=Notification.COMMENT_ADDED,
-                issue=issue,
-                message=f"New comment on issue '{issue.title}' assigned to you"
+            notifications.add(
+                issue.assigned_to, Notification.COMMENT_ADDED, issue,
+                f"New comment on issue '{issue.title}' assigned to you"
             )
         
+        notifications.send()
         return comment
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Notification
         fields = ('id', 'user', 'notification_type', 'issue', 'message', 'is_read', 'created_at')
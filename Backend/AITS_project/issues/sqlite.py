@@ -0,0 +1,119 @@
+"""
+Writing to SQLite from several worker processes.
+
+``settings.SQLITE_PROFILES['concurrent']`` sets up each connection: WAL
+journaling, tuned pragmas, a busy timeout and ``BEGIN IMMEDIATE`` for
+transactions. With these, a writer waits for the database lock inside
+SQLite instead of failing at once. ``run_with_retry`` covers what is left
+when the timeout runs out under a burst. It runs a whole unit of work in one
+transaction and, if SQLite still reports the database locked, rolls back
+and starts again a bounded number of times.
+
+``WriteRetryMixin`` applies it to a DRF view's ``perform_create``,
+``perform_update`` and ``perform_destroy``, and ``retry_writes`` to a view
+method such as a write ``@action``. Only the write itself is retried:
+authentication, permissions, parsing and validation have already run once,
+and a retry reuses the ``request.data`` DRF parsed from the stream. Neither
+reads ``request.body``, so they are safe on streaming upload views. A retried
+update reloads the instance first, since the failed attempt changed it in
+memory; actions load their objects inside the retried method.
+
+``backup_to`` copies a live database into another file with SQLite's online
+backup, which is how ``manage.py sync_replica`` refreshes read replicas.
+"""
+import functools
+import random
+import sqlite3
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connections, transaction
+
+LOCKED_MESSAGES = ('database is locked', 'database table is locked')
+
+
+def retry_settings():
+    options = {'RETRIES': 3, 'BACKOFF': 0.05}
+    options.update(getattr(settings, 'SQLITE_WRITE_RETRY', {}))
+    return options
+
+
+def is_locked(exc):
+    return isinstance(exc, OperationalError) and any(message in str(exc) for message in LOCKED_MESSAGES)
+
+
+def run_with_retry(func, *args, using='default', **kwargs):
+    """
+    ``func(*args, **kwargs)`` in one transaction, retried while SQLite reports
+    the database locked. Inside an enclosing transaction nothing can be
+    retried, so it simply runs.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        with transaction.atomic(using=using):
+            return func(*args, **kwargs)
+    options = retry_settings()
+    for attempt in range(options['RETRIES'] + 1):
+        try:
+            with transaction.atomic(using=using):
+                return func(*args, **kwargs)
+        except OperationalError as exc:
+            if not is_locked(exc) or attempt == options['RETRIES']:
+                raise
+        time.sleep(options['BACKOFF'] * 2 ** attempt * (0.5 + random.random()))
+
+
+def retry_writes(method):
+    """Run a view method, such as a write ``@action``, through ``run_with_retry``"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return run_with_retry(method, self, *args, **kwargs)
+    return wrapper
+
+
+class WriteRetryMixin:
+    """Run a DRF view's saves and deletes through ``run_with_retry``"""
+
+    def perform_create(self, serializer):
+        def create():
+            # A failed attempt leaves its rolled back instance behind
+            serializer.instance = None
+            super(WriteRetryMixin, self).perform_create(serializer)
+        run_with_retry(create)
+
+    def perform_update(self, serializer):
+        attempts = []
+
+        def update():
+            if attempts:
+                # The failed attempt changed the instance in memory; start again
+                # from the stored row, so the old values read by the serializer
+                # and the model's change tracking are the real ones
+                serializer.instance.refresh_from_db()
+                serializer.instance.__dict__.pop('_counted_state', None)
+            attempts.append(None)
+            super(WriteRetryMixin, self).perform_update(serializer)
+        run_with_retry(update)
+
+    def perform_destroy(self, instance):
+        run_with_retry(super().perform_destroy, instance)
+
+
+def backup_to(path, using='default', timeout=20):
+    """
+    Copy database ``using`` into the SQLite file at ``path`` in one step.
+    Connections open on ``path`` see the whole new copy on their next read;
+    the copy waits up to ``timeout`` seconds for their reads to finish.
+    """
+    source = connections[using]
+    if source.vendor != 'sqlite':
+        raise ValueError(f"Database {using!r} is not SQLite")
+    if source.in_atomic_block:
+        # The backup would wait forever for the open transaction to end
+        raise transaction.TransactionManagementError("backup_to() cannot run inside a transaction")
+    source.ensure_connection()
+    target = sqlite3.connect(path, timeout=timeout)
+    try:
+        source.connection.backup(target)
+    finally:
+        target.close()
@@ -0,0 +1,191 @@
+"""
+Server-Sent Events stream of a user's new notifications.
+
+Served as a native async view, so it must run under the ASGI entry point
+(``AITS_project.asgi``); each idle connection is one parked coroutine and a
+small queue. A single ``NotificationBroker`` per process polls for rows
+newer than the last one it saw, with one indexed query per interval no
+matter how many clients are connected, and hands them to the connected
+recipients. Clients resume after a reconnect with the standard
+``Last-Event-ID`` header (or ``?last_event_id=``) and receive what they missed.
+
+A stream starts from the client's ``Last-Event-ID``, or from the newest
+notification when it connects. Whatever the broker has not delivered to it
+since then is read from the table in pages of ``BACKLOG_LIMIT``, on connect
+and again whenever its queue overflowed, so no event is skipped.
+"""
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from .authentication import CachedJWTAuthentication
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 1.0  # seconds between broker polls
+KEEPALIVE_INTERVAL = 15.0  # seconds between comment lines on an idle stream
+POLL_BATCH = 1000
+BACKLOG_LIMIT = 500
+QUEUE_SIZE = 100
+RETRY_MS = 3000
+
+FIELDS = ('id', 'user_id', 'notification_type', 'issue_id', 'message', 'is_read', 'created_at')
+_datetime_field = serializers.DateTimeField()
+
+
+def notification_event(row):
+    """Format a ``values(*FIELDS)`` row as an SSE event matching NotificationSerializer"""
+    data = {
+        'id': row['id'],
+        'user': row['user_id'],
+        'notification_type': row['notification_type'],
+        'issue': row['issue_id'],
+        'message': row['message'],
+        'is_read': row['is_read'],
+        'created_at': _datetime_field.to_representation(row['created_at']),
+    }
+    return f"id: {row['id']}\nevent: notification\ndata: {json.dumps(data)}\n\n"
+
+
+class NotificationBroker:
+    """Polls for new notifications once per process and fans them out to subscribers"""
+
+    def __init__(self):
+        self.subscribers = {}
+        self.last_id = None
+        self.task = None
+
+    def subscribe(self, user_id, since):
+        """
+        A queue of ``user_id``'s rows newer than the broker's position. An idle
+        broker starts from ``since``, the subscriber's own starting point
+        """
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        queue.overflowed = False
+        self.subscribers.setdefault(user_id, set()).add(queue)
+        if self.task is None or self.task.done() or self.task.get_loop() is not asyncio.get_running_loop():
+            if self.last_id is None:
+                self.last_id = since
+            self.task = asyncio.create_task(self.run())
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        queues = self.subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[user_id]
+
+    async def run(self):
+        while self.subscribers:
+            try:
+                await self.poll_once()
+            except Exception:
+                logger.exception("Notification broker poll failed")
+            await asyncio.sleep(POLL_INTERVAL)
+        # Start from the newest row again when the next client connects
+        self.last_id = None
+
+    async def poll_once(self):
+        rows = Notification.objects.filter(pk__gt=self.last_id).order_by('pk').values(*FIELDS)[:POLL_BATCH]
+        async for row in rows:
+            self.last_id = row['id']
+            for queue in self.subscribers.get(row['user_id'], ()):
+                try:
+                    queue.put_nowait(row)
+                except asyncio.QueueFull:
+                    # A stalled client falls behind; its stream reads the rows it missed
+                    queue.overflowed = True
+
+
+broker = NotificationBroker()
+
+
+def _parse_event_id(value):
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _authenticate(request):
+    """Return the user for a Bearer header or ``?token=`` (EventSource cannot set headers)"""
+    authenticator = CachedJWTAuthentication()
+    result = authenticator.authenticate(request)
+    if result is not None:
+        return result[0]
+    raw_token = request.GET.get('token')
+    if not raw_token:
+        return None
+    return authenticator.get_user(authenticator.get_validated_token(raw_token))
+
+
+async def notification_stream(request):
+    try:
+        user = await sync_to_async(_authenticate)(request)
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        user = None
+    if user is None or not user.is_active:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+    last_event_id = _parse_event_id(
+        request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    )
+    response = StreamingHttpResponse(_events(user.pk, last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def _backlog(user_id, after):
+    """``user_id``'s rows newer than ``after``, read in pages of ``BACKLOG_LIMIT``"""
+    while True:
+        page = [
+            row async for row in Notification.objects.filter(user_id=user_id, pk__gt=after)
+            .order_by('pk').values(*FIELDS)[:BACKLOG_LIMIT]
+        ]
+        for row in page:
+            yield row
+        if len(page) < BACKLOG_LIMIT:
+            return
+        after = page[-1]['id']
+
+
+async def _events(user_id, last_event_id):
+    if last_event_id is None:
+        # The connect point: everything after it is sent
+        last_event_id = await Notification.objects.order_by('-pk').values_list('pk', flat=True).afirst() or 0
+    # Subscribe before reading the backlog so nothing created in between is lost;
+    # the backlog covers rows the broker had already passed
+    queue = broker.subscribe(user_id, last_event_id)
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        sent_up_to = last_event_id
+        catch_up = True
+        while True:
+            if catch_up:
+                async for row in _backlog(user_id, sent_up_to):
+                    sent_up_to = row['id']
+                    yield notification_event(row)
+                catch_up = False
+            try:
+                row = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if queue.overflowed:
+                # Rows were dropped; read them back after this one
+                queue.overflowed = False
+                catch_up = True
+            if row['id'] > sent_up_to:
+                sent_up_to = row['id']
+                yield notification_event(row)
+    finally:
+        broker.unsubscribe(user_id, queue)
@@ -1,3 +1,1512 @@
-from django.test import TestCase
+from contextlib import contextmanager
+from datetime import timedelta
+import csv
+import json
+from io import StringIO
+import os
+import re
+import runpy
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+from threading import Timer
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
 
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection, transaction
+from django.db.models import Count
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
+from issues import counters, fast_serializers, imports, jobs, metrics, reference, response_cache, routers, search, sqlite, streams
+from issues.authentication import user_cache
+from issues.filters import IssueFilter
+from issues.management.commands import bench_api
+from issues.query_detector import QueryDetector, QueryDetectorTestMixin, QueryProblems, normalize
+from issues.models import Issue, IssueCounter, Comment, College, CourseUnit, Job, Notification, User
+from issues.serializers import CommentSerializer, IssueSerializer, NotificationSerializer
+from issues.views import IssueViewSet
+
+
+# Maximum number of SQL queries each read endpoint may issue, independent of
+# how many rows it returns. Authentication is forced in these tests, so the
+# budgets cover only the view's own work.
+QUERY_BUDGETS = {
+    'issue-list': 1,
+    'issue-detail': 1,
+    'issue-assign': 5,
+    'issue-request-info': 7,
+    'issue-bulk': 5,
+    'comment-list': 1,
+    'dashboard-student': 3,
+    'dashboard-lecturer': 3,
+    'dashboard-registrar': 4,
+}
+
+
+# The cache outlives each test's rolled-back rows, so only ResponseCacheTests use it
+@override_settings(RESPONSE_CACHE={'ENABLED': False})
+class APITestBase(QueryDetectorTestMixin, TestCase):
+    """Shared fixtures: one user per role and a client authenticated as any of them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(
+            username='student', password='pass', first_name='Sam', last_name='Student',
+            role=User.STUDENT, student_number='S001', college='College of Engineering',
+        )
+        cls.lecturer = User.objects.create_user(
+            username='lecturer', password='pass', first_name='Lee', last_name='Lecturer',
+            role=User.LECTURER, college='College of Engineering',
+        )
+        cls.registrar = User.objects.create_user(
+            username='registrar', password='pass', first_name='Rae', last_name='Registrar',
+            role=User.ACADEMIC_REGISTRAR, college='College of Computing and Information Sciences',
+        )
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client
+
+    def make_issues(self, count, **kwargs):
+        kwargs.setdefault('created_by', self.student)
+        return [
+            Issue.objects.create(title=f'Issue {i}', description='Missing marks', **kwargs)
+            for i in range(count)
+        ]
+
+    @contextmanager
+    def assertQueryBudget(self, name):
+        with CaptureQueriesContext(connection) as ctx:
+            yield ctx
+        # Savepoints only appear because each test runs inside a transaction
+        queries = [q['sql'] for q in ctx.captured_queries if 'SAVEPOINT' not in q['sql']]
+        budget = QUERY_BUDGETS[name]
+        self.assertLessEqual(
+            len(queries), budget,
+            f"{name} ran {len(queries)} queries (budget {budget}):\n" + "\n".join(queries),
+        )
+
+
+class IssueQueryBudgetTests(APITestBase):
+
+    def setUp(self):
+        self.make_issues(3, assigned_to=self.lecturer)
+
+    def test_list_is_constant_in_result_size(self):
+        client = self.client_for(self.registrar)
+        with self.assertQueryBudget('issue-list'):
+            response = client.get('/api/issues/')
+        self.make_issues(20, assigned_to=self.lecturer)
+        with self.assertQueryBudget('issue-list'):
+            bigger = client.get('/api/issues/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(bigger.data['results']) - len(response.data['results']), 20)
+        self.assertEqual(bigger.data['results'][0]['created_by_name'], 'Sam Student')
+        self.assertEqual(bigger.data['results'][0]['assigned_to_name'], 'Lee Lecturer')
+
+    def test_lecturer_list_and_detail(self):
+        client = self.client_for(self.lecturer)
+        with self.assertQueryBudget('issue-list'):
+            client.get('/api/issues/')
+        issue = Issue.objects.first()
+        with self.assertQueryBudget('issue-detail'):
+            response = client.get(f'/api/issues/{issue.pk}/')
+        self.assertEqual(response.data['assigned_to_name'], 'Lee Lecturer')
+
+    def test_assign_and_request_info(self):
+        issue = Issue.objects.first()
+        with self.assertQueryBudget('issue-assign'):
+            response = self.client_for(self.registrar).post(
+                f'/api/issues/{issue.pk}/assign/', {'user_id': self.lecturer.pk}
+            )
+        self.assertEqual(response.status_code, 200)
+        with self.assertQueryBudget('issue-request-info'):
+            response = self.client_for(self.lecturer).post(
+                f'/api/issues/{issue.pk}/request_info/', {'message': 'Which exam?'}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['issue']['status'], Issue.IN_PROGRESS)
+
+    def test_comment_list(self):
+        issue = Issue.objects.first()
+        Comment.objects.bulk_create(
+            Comment(issue=issue, content=f'c{i}', created_by=self.lecturer) for i in range(5)
+        )
+        with self.assertQueryBudget('comment-list'):
+            response = self.client_for(self.student).get(f'/api/issues/{issue.pk}/comments/')
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_dashboards(self):
+        self.make_issues(10)
+        for user, name in (
+            (self.student, 'dashboard-student'),
+            (self.lecturer, 'dashboard-lecturer'),
+            (self.registrar, 'dashboard-registrar'),
+        ):
+            with self.subTest(role=user.role), self.assertQueryBudget(name):
+                response = self.client_for(user).get('/api/dashboard/')
+                self.assertEqual(response.status_code, 200)
+
+    def test_registrar_dashboard_is_constant_in_college_count(self):
+        for i in range(5):
+            user = User.objects.create_user(username=f'extra{i}', college=f'College {i}')
+            self.make_issues(i, created_by=user)
+        with self.assertQueryBudget('dashboard-registrar'):
+            response = self.client_for(self.registrar).get('/api/dashboard/')
+        stats = {row['college']: row['count'] for row in response.data['college_stats']}
+        self.assertEqual(stats['College 0'], 0)
+        self.assertEqual(stats['College 4'], 4)
+        self.assertEqual(stats['College of Engineering'], 3)
+        self.assertEqual(response.data['all_issues']['total'], 13)
+        self.assertEqual(response.data['all_issues']['pending'], 13)
+
+
+class KeysetPaginationTests(APITestBase):
+
+    def setUp(self):
+        self.issues = self.make_issues(7)
+        self.client = self.client_for(self.student)
+
+    def walk(self, url):
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        return seen
+
+    def test_pages_cover_every_row_newest_first(self):
+        Issue.objects.update(created_at=self.issues[0].created_at)  # let the id tiebreaker do the work
+        ids = self.walk('/api/issues/?page_size=3')
+        self.assertEqual(ids, sorted((issue.pk for issue in self.issues), reverse=True))
+
+    def test_rows_inserted_while_paging_do_not_shift_later_pages(self):
+        first = self.client.get('/api/issues/?page_size=3')
+        self.make_issues(2)
+        rest = self.walk(first.data['next'])
+        ids = [item['id'] for item in first.data['results']] + rest
+        self.assertEqual(ids, sorted((issue.pk for issue in self.issues), reverse=True))
+
+    def test_previous_link_returns_the_prior_page(self):
+        first = self.client.get('/api/issues/?page_size=3')
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(back.data['results'], first.data['results'])
+        self.assertIsNone(first.data['previous'])
+
+    def test_page_size_is_capped(self):
+        self.make_issues(250)
+        response = self.client.get('/api/issues/?page_size=100000')
+        self.assertEqual(len(response.data['results']), 200)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/issues/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+
+class IssueCounterTests(APITestBase):
+
+    def test_counters_follow_create_update_and_delete(self):
+        issue = Issue.objects.create(title='t', description='d', created_by=self.lecturer)
+        issue.assigned_to = self.lecturer
+        issue.status = Issue.RESOLVED
+        issue.save()
+        other = Issue.objects.create(title='t', description='d', created_by=self.student, assigned_to=self.lecturer)
+        self.assertEqual(counters.verify(), [])
+        self.assertEqual(counters.visible_counts(self.lecturer)[Issue.RESOLVED], 1)
+        self.assertEqual(sum(counters.visible_counts(self.lecturer).values()), 2)
+
+        other.delete()
+        self.lecturer.delete()
+        self.assertEqual(counters.verify(), [])
+        self.assertEqual(sum(counters.visible_counts(self.registrar).values()), 0)
+
+    def test_stats_endpoint_reads_counters(self):
+        self.make_issues(3)
+        self.make_issues(2, status=Issue.CLOSED, created_by=self.lecturer)
+        with self.assertNumQueries(2):
+            response = self.client_for(self.registrar).get('/api/issues/stats/')
+        self.assertEqual(response.data['total'], 5)
+        self.assertEqual(response.data['by_status'], {Issue.PENDING: 3, Issue.CLOSED: 2})
+        self.assertEqual(response.data['by_college'], {'College of Engineering': 5})
+
+        response = self.client_for(self.student).get('/api/issues/stats/')
+        self.assertEqual(response.data, {'total': 3, 'by_status': {Issue.PENDING: 3}})
+
+    def test_concurrent_saves_count_from_the_stored_row(self):
+        issue = Issue.objects.create(title='t', description='d', created_by=self.student)
+        # Two requests load the issue while it is pending, then each changes its status
+        first, second = Issue.objects.get(pk=issue.pk), Issue.objects.get(pk=issue.pk)
+        first.status = Issue.IN_PROGRESS
+        first.save()
+        second.status = Issue.RESOLVED
+        second.save()
+        self.assertEqual(counters.verify(), [])
+        self.assertEqual(
+            counters.counts_by_status((IssueCounter.GLOBAL, '', 1)),
+            {Issue.PENDING: 0, Issue.IN_PROGRESS: 0, Issue.RESOLVED: 1, Issue.CLOSED: 0},
+        )
+
+    def test_college_change_moves_college_counts(self):
+        issue, _ = self.make_issues(2)
+        response = self.client_for(self.student).patch('/api/profile/', {'college': 'College of Law'})
+        self.assertEqual(response.status_code, 200)
+        issue.refresh_from_db()
+        issue.status = Issue.RESOLVED
+        issue.save()
+        self.assertEqual(counters.verify(), [])
+        self.assertEqual(counters.college_totals(), {'College of Engineering': 0, 'College of Law': 2})
+
+    def test_rebuild_command_repairs_drift(self):
+        self.make_issues(2)
+        IssueCounter.objects.filter(scope=IssueCounter.GLOBAL).update(count=99)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_issue_counters', '--verify', stdout=StringIO(), stderr=StringIO())
+        call_command('rebuild_issue_counters', stdout=StringIO())
+        self.assertEqual(counters.verify(), [])
+
+
+class NotificationFanoutTests(APITestBase):
+
+    def create_issue(self):
+        return self.client_for(self.student).post(
+            '/api/issues/', {'title': 'Missing marks', 'description': 'CS101 test 1'}
+        )
+
+    def test_issue_creation_is_constant_in_registrar_count(self):
+        with CaptureQueriesContext(connection) as few:
+            self.create_issue()
+        User.objects.bulk_create(
+            User(username=f'registrar{i}', role=User.ACADEMIC_REGISTRAR) for i in range(30)
+        )
+        with CaptureQueriesContext(connection) as many:
+            response = self.create_issue()
+        self.assertEqual(len(many.captured_queries), len(few.captured_queries))
+        self.assertEqual(
+            Notification.objects.filter(issue_id=response.data['id'], notification_type=Notification.ISSUE_CREATED).count(),
+            31,
+        )
+
+    @override_settings(NOTIFICATION_FANOUT={'MODE': 'thread', 'BATCH_SIZE': 10, 'WORKERS': 1})
+    def test_thread_mode_waits_for_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.create_issue()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(Notification.objects.exists())
+
+
+@jobs.task('tests.flaky')
+def flaky(fail_times):
+    if Job.objects.filter(name='tests.flaky', attempts__lte=fail_times).exists():
+        raise RuntimeError('boom')
+
+
+class JobQueueTests(APITestBase):
+
+    def test_claims_do_not_overlap(self):
+        for _ in range(5):
+            jobs.enqueue('tests.flaky', {'fail_times': 0})
+        _, first = jobs.claim('a', 3, visibility_timeout=60)
+        _, second = jobs.claim('b', 3, visibility_timeout=60)
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 2)
+        self.assertFalse({job.pk for job in first} & {job.pk for job in second})
+
+    def test_failures_back_off_then_give_up(self):
+        job = jobs.enqueue('tests.flaky', {'fail_times': 10}, max_attempts=2)
+        token, claimed = jobs.claim('a', 1, visibility_timeout=60)
+        self.assertEqual(jobs.run(job.pk, token), Job.QUEUED)
+        job.refresh_from_db()
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn('boom', job.last_error)
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        token, _ = jobs.claim('a', 1, visibility_timeout=60)
+        self.assertEqual(jobs.run(job.pk, token), Job.FAILED)
+
+    def test_expired_claim_is_retried_and_stale_result_discarded(self):
+        job = jobs.enqueue('tests.flaky', {'fail_times': 0})
+        stale_token, _ = jobs.claim('dead', 1, visibility_timeout=60)
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        token, claimed = jobs.claim('alive', 1, visibility_timeout=60)
+        self.assertEqual([j.pk for j in claimed], [job.pk])
+        self.assertIsNone(jobs.run(job.pk, stale_token))
+        self.assertEqual(jobs.run(job.pk, token), Job.DONE)
+
+    @override_settings(NOTIFICATION_FANOUT={'MODE': 'queue', 'BATCH_SIZE': 10, 'WORKERS': 1})
+    def test_queued_notifications(self):
+        self.client_for(self.student).post('/api/issues/', {'title': 't', 'description': 'd'})
+        self.assertFalse(Notification.objects.exists())
+        token, claimed = jobs.claim('a', 10, visibility_timeout=60)
+        self.assertEqual(jobs.run(claimed[0].pk, token), Job.DONE)
+        self.assertEqual(Notification.objects.get().user, self.registrar)
+
+
+class NotificationStreamTests(APITestBase):
+
+    def notify(self, message):
+        return Notification.objects.create(user=self.student, notification_type=Notification.ASSIGNED, message=message)
+
+    async def test_broker_delivers_new_rows_to_the_recipient_only(self):
+        broker = streams.NotificationBroker()
+        latest = await Notification.objects.order_by('-pk').values_list('pk', flat=True).afirst() or 0
+        mine = broker.subscribe(self.student.pk, latest)
+        other = broker.subscribe(self.lecturer.pk, latest)
+        broker.task.cancel()
+        notification = await Notification.objects.acreate(
+            user=self.student, notification_type=Notification.ASSIGNED, message='hello'
+        )
+        await broker.poll_once()
+        self.assertEqual((await mine.get())['id'], notification.pk)
+        self.assertTrue(other.empty())
+
+    async def test_resume_from_last_event_id(self):
+        first = await sync_to_async(self.notify)('one')
+        second = await sync_to_async(self.notify)('two')
+        token = str(AccessToken.for_user(self.student))
+        response = await self.async_client.get(
+            f'/api/notifications/stream/?token={token}', headers={'Last-Event-ID': str(first.pk)}
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = aiter(response.streaming_content)
+        self.assertTrue((await anext(events)).startswith(b'retry:'))
+        event = (await anext(events)).decode()
+        await events.aclose()
+        self.assertIn(f'id: {second.pk}\n', event)
+        self.assertIn('"message": "two"', event)
+
+    async def test_rows_created_right_after_connecting_are_sent(self):
+        events = streams._events(self.student.pk, None)
+        self.assertTrue((await anext(events)).startswith('retry:'))
+        streams.broker.task.cancel()
+        # Created before the broker's first poll
+        notification = await sync_to_async(self.notify)('hello')
+        event = await anext(events)
+        await events.aclose()
+        self.assertIn(f'id: {notification.pk}\n', event)
+
+    async def test_backlog_and_overflow_are_read_in_pages(self):
+        with mock.patch.object(streams, 'BACKLOG_LIMIT', 2), mock.patch.object(streams, 'QUEUE_SIZE', 1):
+            missed = [await sync_to_async(self.notify)(str(number)) for number in range(5)]
+            events = streams._events(self.student.pk, 0)
+            await anext(events)
+            streams.broker.task.cancel()
+            received = [await anext(events) for _ in missed]
+            # A stalled stream: only the first of these fits in its queue
+            later = [await sync_to_async(self.notify)(f'later {number}') for number in range(3)]
+            await streams.broker.poll_once()
+            received += [await anext(events) for _ in later]
+            await events.aclose()
+        self.assertEqual(
+            [re.search(r'id: (\d+)', event).group(1) for event in received],
+            [str(notification.pk) for notification in missed + later],
+        )
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.get('/api/notifications/stream/')
+        self.assertEqual(response.status_code, 401)
+
+
+class QueryPlanTests(APITestBase):
+    """
+    Every query behind the hot read endpoints must seek its rows through an
+    index. A step on one of TABLES passes if it is a SEARCH using an index or
+    the primary key, or a SCAN through an index that is the whole answer: the
+    query has no WHERE (a keyset walk stopped by LIMIT) or the index is a
+    partial one whose condition is the filter. A TEMP B-TREE fails, except to
+    sort rows that were all fetched by primary key from bounded candidate
+    lists (IssueQuerySet.limited).
+    """
+
+    TABLES = ('issues_issue', 'issues_notification', 'issues_comment', 'issues_issuecounter')
+    PARTIAL_INDEXES = {index.name for index in Issue._meta.indexes if index.condition is not None}
+    # Plan nodes that start a separate query, planned on its own
+    SUBQUERIES = ('LIST SUBQUERY', 'CORRELATED', 'SCALAR SUBQUERY', 'CO-ROUTINE', 'MATERIALIZE', 'SUBQUERY')
+
+    def setUp(self):
+        self.make_issues(3, assigned_to=self.lecturer)
+        self.make_issues(2)
+        Notification.objects.create(user=self.student, notification_type=Notification.ASSIGNED, message='m')
+
+    def plans_for(self, user, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client_for(user).get(url)
+        self.assertEqual(response.status_code, 200, getattr(response, 'data', None))
+        plans = []
+        with connection.cursor() as cursor:
+            for query in ctx.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plans.append((query['sql'], [(row[0], row[1], row[-1]) for row in cursor.fetchall()]))
+        return plans
+
+    def plan_problems(self, sql, plan):
+        # Plan steps name aliased tables (U0, T3) by their alias
+        watched = set(self.TABLES) | {
+            alias for table, alias in re.findall(r'"(\w+)" (\w+)\b', sql) if table in self.TABLES
+        }
+        children = {}
+        for node, parent, detail in plan:
+            children.setdefault(parent, []).append((node, detail))
+
+        def same_query(parent):
+            """Steps of the query that ``parent`` belongs to, skipping nested subqueries"""
+            for node, detail in children.get(parent, []):
+                yield detail
+                if not detail.startswith(self.SUBQUERIES):
+                    yield from same_query(node)
+
+        problems = []
+        for node, parent, detail in plan:
+            words = detail.split()
+            if detail.startswith('SCAN') and words[1] in watched:
+                index = re.search(r'USING (?:COVERING )?INDEX (\w+)', detail)
+                if not index or (' WHERE ' in sql and index.group(1) not in self.PARTIAL_INDEXES):
+                    problems.append(detail)
+            elif 'TEMP B-TREE' in detail:
+                fetched = [step for step in same_query(parent) if step.startswith(('SCAN', 'SEARCH'))]
+                bounded = detail == 'USE TEMP B-TREE FOR ORDER BY' and fetched and all(
+                    'USING INTEGER PRIMARY KEY' in step for step in fetched
+                )
+                if not bounded:
+                    problems.append(detail)
+        return problems
+
+    def assertIndexed(self, user, url):
+        for sql, plan in self.plans_for(user, url):
+            problems = self.plan_problems(sql, plan)
+            if problems:
+                self.fail(
+                    f"{url} as {user.role}: {', '.join(problems)}\n{sql}\n"
+                    + "\n".join(detail for _, _, detail in plan)
+                )
+
+    def test_endpoints_use_indexes(self):
+        issue = Issue.objects.first()
+        for user in (self.student, self.lecturer, self.registrar):
+            for url in (
+                '/api/issues/', f'/api/issues/?page_size=2', '/api/issues/stats/',
+                '/api/dashboard/', '/api/notifications/',
+            ):
+                with self.subTest(role=user.role, url=url):
+                    self.assertIndexed(user, url)
+        with self.subTest(url='comments'):
+            self.assertIndexed(self.student, f'/api/issues/{issue.pk}/comments/')
+        with self.subTest(url='next page'):
+            first = self.client_for(self.student).get('/api/issues/?page_size=2')
+            self.assertIndexed(self.student, first.data['next'])
+
+    def test_filter_combinations_use_indexes(self):
+        queries = [
+            'status=pending', 'status=pending,resolved', 'priority=high', 'priority=high,low',
+            'priority=high&status=closed', 'status=pending,closed&priority=high,medium',
+            'college=College+of+Engineering', 'course_unit=Databases', 'assigned=false', 'assigned=true',
+            'created_after=2024-01-01', 'created_before=2024-02-01',
+            'created_after=2024-01-01&created_before=2024-02-01&status=pending',
+            'updated_after=2024-01-01&ordering=-updated_at', 'updated_before=2024-01-01&ordering=updated_at',
+            'ordering=updated_at', 'ordering=-updated_at&status=pending', 'ordering=updated_at&status=pending,closed',
+            'ordering=created_at&college=X', 'ordering=created_at&course_unit=X&assigned=true',
+        ]
+        # Every accepted parameter appears above
+        used = {name for query in queries for name in parse_qs(query)}
+        self.assertEqual(used, IssueFilter.allowed_params() - set(IssueFilter.PASSTHROUGH))
+        for user in (self.student, self.lecturer, self.registrar):
+            for query in queries:
+                with self.subTest(role=user.role, query=query):
+                    self.assertIndexed(user, f'/api/issues/?{query}')
+                with self.subTest(role=user.role, query=query, page='next'):
+                    first = self.client_for(user).get(f'/api/issues/?{query}&page_size=1')
+                    if first.data['next']:
+                        self.assertIndexed(user, first.data['next'])
+
+
+class SearchTests(APITestBase):
+
+    def setUp(self):
+        self.exam = Issue.objects.create(
+            title='Missing exam marks', description='My exam marks are not on the portal',
+            course_unit='Database Systems', created_by=self.student,
+        )
+        self.fees = Issue.objects.create(
+            title='Tuition fees', description='Receipt not reflected', created_by=self.lecturer,
+            assigned_to=self.lecturer,
+        )
+        Comment.objects.create(issue=self.fees, content='The exam office has the receipt', created_by=self.registrar)
+
+    def search(self, user, q):
+        response = self.client_for(user).get('/api/issues/search/', {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data['results']]
+
+    def test_ranks_issue_text_above_comment_matches(self):
+        self.assertEqual(self.search(self.registrar, 'exam'), [self.exam.pk, self.fees.pk])
+        self.assertEqual(self.search(self.registrar, 'database'), [self.exam.pk])
+        self.assertEqual(self.search(self.registrar, 'recei'), [self.fees.pk])
+
+    def test_results_follow_role_scope(self):
+        self.assertEqual(self.search(self.student, 'exam'), [self.exam.pk])
+        self.assertEqual(self.search(self.lecturer, 'exam'), [self.fees.pk])
+
+    def test_index_follows_writes(self):
+        self.exam.title = 'Transcript request'
+        self.exam.description = 'Need a transcript'
+        self.exam.save()
+        self.assertEqual(self.search(self.registrar, 'transcript'), [self.exam.pk])
+        self.assertEqual(self.search(self.registrar, 'exam'), [self.fees.pk])
+        self.fees.comments.all().delete()
+        self.assertEqual(self.search(self.registrar, 'exam'), [])
+        self.exam.delete()
+        self.assertEqual(self.search(self.registrar, 'transcript'), [])
+
+    def test_rebuild_and_query_syntax(self):
+        search.rebuild()
+        self.assertEqual(self.search(self.registrar, 'exam" (marks'), [self.exam.pk])
+        response = self.client_for(self.registrar).get('/api/issues/search/')
+        self.assertEqual(response.status_code, 400)
+
+
+class IssueFilterTests(APITestBase):
+
+    def setUp(self):
+        self.pending = Issue.objects.create(
+            title='a', description='d', created_by=self.student, priority=Issue.HIGH,
+            college='College of Engineering', course_unit='Databases',
+        )
+        self.resolved = Issue.objects.create(
+            title='b', description='d', created_by=self.student, status=Issue.RESOLVED,
+            assigned_to=self.lecturer,
+        )
+        self.closed = Issue.objects.create(title='c', description='d', created_by=self.student, status=Issue.CLOSED)
+        Issue.objects.filter(pk=self.closed.pk).update(created_at=timezone.now() - timedelta(days=10))
+
+    def ids(self, query):
+        response = self.client_for(self.registrar).get(f'/api/issues/?{query}')
+        self.assertEqual(response.status_code, 200, response.data)
+        return [item['id'] for item in response.data['results']]
+
+    def test_filters(self):
+        self.assertEqual(self.ids('status=pending'), [self.pending.pk])
+        self.assertEqual(set(self.ids('status=pending,closed')), {self.pending.pk, self.closed.pk})
+        self.assertEqual(set(self.ids('status=pending&status=resolved')), {self.pending.pk, self.resolved.pk})
+        self.assertEqual(self.ids('priority=high'), [self.pending.pk])
+        self.assertEqual(self.ids('college=College+of+Engineering&course_unit=Databases'), [self.pending.pk])
+        self.assertEqual(self.ids('assigned=true'), [self.resolved.pk])
+        self.assertEqual(set(self.ids('assigned=false')), {self.pending.pk, self.closed.pk})
+        last_week = (timezone.now() - timedelta(days=7)).date().isoformat()
+        self.assertEqual(self.ids(f'created_before={last_week}'), [self.closed.pk])
+        self.assertNotIn(self.closed.pk, self.ids(f'created_after={last_week}'))
+
+    def test_ordering_pages_in_the_requested_direction(self):
+        self.assertEqual(self.ids('ordering=created_at&page_size=1'), [self.closed.pk])
+        first = self.client_for(self.registrar).get('/api/issues/?ordering=created_at&page_size=2')
+        second = self.client_for(self.registrar).get(first.data['next'])
+        self.assertEqual([item['id'] for item in second.data['results']], [self.resolved.pk])
+        # Cursors cannot be replayed under another ordering
+        cursor = parse_qs(urlsplit(first.data['next']).query)['cursor'][0]
+        response = self.client_for(self.registrar).get(f'/api/issues/?cursor={cursor}')
+        self.assertEqual(response.status_code, 404)
+
+    def test_rejects_values_outside_the_allow_list(self):
+        response = self.client_for(self.registrar).get(
+            '/api/issues/?status=lost&ordering=title&assigned=maybe&created_after=soon&title=x'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            set(response.data), {'status', 'ordering', 'assigned', 'created_after', 'title'}
+        )
+
+    def test_rejects_combinations_no_index_serves(self):
+        response = self.client_for(self.registrar).get(
+            '/api/issues/?ordering=-updated_at&priority=high&status=pending&created_after=2024-01-01'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {'priority', 'created_after'})
+        self.assertEqual(
+            self.ids('ordering=-updated_at&status=resolved,closed&updated_after=2024-01-01'),
+            [self.closed.pk, self.resolved.pk],
+        )
+
+
+class IssueVisibilityTests(APITestBase):
+
+    def setUp(self):
+        other = User.objects.create_user(username='other', password='pass', role=User.STUDENT)
+        self.assigned = Issue.objects.create(
+            title='a', description='d', created_by=self.student, assigned_to=self.lecturer,
+        )
+        self.own = Issue.objects.create(title='b', description='d', created_by=self.lecturer)
+        self.self_assigned = Issue.objects.create(
+            title='c', description='d', created_by=self.lecturer, assigned_to=self.lecturer,
+        )
+        self.unrelated = Issue.objects.create(title='d', description='d', created_by=other)
+
+    def visible(self, user):
+        return set(Issue.objects.visible_to(user).values_list('pk', flat=True))
+
+    def test_scope_per_role(self):
+        self.assertEqual(self.visible(self.student), {self.assigned.pk})
+        self.assertEqual(self.visible(self.lecturer), {self.assigned.pk, self.own.pk, self.self_assigned.pk})
+        self.assertEqual(self.visible(self.registrar), set(Issue.objects.values_list('pk', flat=True)))
+
+    def test_lecturer_pages_merge_both_branches(self):
+        self.make_issues(3, assigned_to=self.lecturer)
+        expected = sorted(self.visible(self.lecturer), reverse=True)
+        client = self.client_for(self.lecturer)
+        seen, url = [], '/api/issues/?page_size=2'
+        while url:
+            response = client.get(url)
+            seen.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, expected)
+        filtered = client.get('/api/issues/?assigned=false')
+        self.assertEqual([item['id'] for item in filtered.data['results']], [self.own.pk])
+
+    def test_limited_keeps_the_queryset_shape(self):
+        issues = Issue.objects.visible_to(self.lecturer).order_by('-id')
+        related = list(issues.select_related('created_by').limited(2))
+        self.assertEqual([issue.pk for issue in related], [self.self_assigned.pk, self.own.pk])
+        with self.assertNumQueries(0):
+            self.assertEqual(related[0].created_by, self.lecturer)
+        self.assertEqual(
+            list(issues.values_list('pk', 'title', named=True).limited(1)),
+            [(self.self_assigned.pk, 'c')],
+        )
+        for _ in range(2):
+            Comment.objects.create(issue=self.self_assigned, created_by=self.lecturer, content='c')
+        commented = issues.filter(comments__content='c').limited(2)
+        self.assertEqual([issue.pk for issue in commented], [self.self_assigned.pk])
+        annotated = issues.annotate(replies=Count('comments')).filter(replies=0).limited(2)
+        self.assertEqual([(issue.pk, issue.replies) for issue in annotated], [(self.own.pk, 0), (self.assigned.pk, 0)])
+
+
+class BulkIssueUpdateTests(APITestBase):
+
+    def bulk(self, user=None, **data):
+        return self.client_for(user or self.registrar).post('/api/issues/bulk/', data, format='json')
+
+    def test_assign_reports_each_id(self):
+        issues = self.make_issues(3)
+        already = self.make_issues(1, assigned_to=self.lecturer)[0]
+        ids = [issue.pk for issue in issues] + [already.pk, 999999, issues[0].pk]
+        response = self.bulk(ids=ids, assigned_to=self.lecturer.pk)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data, {
+            'updated': [issue.pk for issue in issues],
+            'unchanged': [already.pk],
+            'not_found': [999999],
+        })
+        self.assertEqual(Issue.objects.filter(assigned_to=self.lecturer).count(), 4)
+        self.assertEqual(counters.verify(), [])
+        self.assertEqual(
+            Notification.objects.filter(user=self.lecturer, notification_type=Notification.ASSIGNED).count(), 3
+        )
+        self.assertEqual(
+            Notification.objects.filter(user=self.student, notification_type=Notification.ISSUE_UPDATED).count(), 3
+        )
+
+    def test_status_and_priority_in_constant_queries(self):
+        for count in (2, 40):
+            issues = self.make_issues(count, assigned_to=self.lecturer)
+            before = Issue.objects.get(pk=issues[0].pk).updated_at
+            with self.assertQueryBudget('issue-bulk'):
+                response = self.bulk(
+                    ids=[issue.pk for issue in issues], status=Issue.RESOLVED, priority=Issue.HIGH
+                )
+            self.assertEqual(len(response.data['updated']), count)
+        issue = Issue.objects.get(pk=issues[0].pk)
+        self.assertEqual((issue.status, issue.priority), (Issue.RESOLVED, Issue.HIGH))
+        self.assertGreater(issue.updated_at, before)
+        self.assertEqual(counters.verify(), [])
+        # Creator and assignee both hear about each status change
+        self.assertEqual(Notification.objects.filter(notification_type=Notification.STATUS_CHANGED).count(), 84)
+
+    def test_validation_and_permissions(self):
+        issue = self.make_issues(1)[0]
+        self.assertEqual(self.bulk(user=self.lecturer, ids=[issue.pk], status=Issue.CLOSED).status_code, 403)
+        self.assertEqual(set(self.bulk(ids=[issue.pk]).data), {'non_field_errors'})
+        response = self.bulk(ids=[issue.pk], assigned_to=self.student.pk, status='lost')
+        self.assertEqual(set(response.data), {'assigned_to', 'status'})
+        self.assertEqual(Issue.objects.get(pk=issue.pk).status, Issue.PENDING)
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    BULK_IMPORT={'CHUNK_SIZE': 2, 'HASH_WORKERS': 0, 'MAX_ERRORS': 10},
+)
+class BulkImportTests(APITestBase):
+    USERS_CSV = (
+        "username,password,first_name,last_name,role,student_number,college\n"
+        "s1,pw1,Ann,One,student,S100,College of Engineering\n"
+        "s2,,Bob,Two,student,,College of Engineering\n"
+        "s3,pw3,Cy,Three,student,S101,College of Engineering\n"
+        "s3,pw3,Cy,Again,student,S102,College of Engineering\n"
+        "student,pw,Dup,Name,student,S103,College of Engineering\n"
+        "l1,pw4,Lou,Lect,lecturer,,College of Engineering\n"
+    )
+
+    def test_users_csv(self):
+        report = imports.run_import('users', StringIO(self.USERS_CSV), imports.CSV)
+        self.assertEqual((report['created'], report['failed']), (3, 3))
+        self.assertEqual(
+            [(error['line'], set(error['errors'])) for error in report['errors']],
+            [(3, {'student_number'}), (5, {'username'}), (6, {'username'})],
+        )
+        self.assertTrue(User.objects.get(username='s1').check_password('pw1'))
+        self.assertEqual(User.objects.get(username='l1').role, User.LECTURER)
+
+    def test_user_import_invalidates_cached_user_lists(self):
+        with mock.patch.object(response_cache, 'bump') as bump:
+            imports.run_import('users', StringIO(self.USERS_CSV), imports.CSV, workers=0)
+        bump.assert_called_with('users')
+
+    def test_password_hashing_in_a_process_pool(self):
+        rows = ''.join(f'{{"username": "p{i}", "password": "pw{i}", "role": "admin"}}\n' for i in range(4))
+        report = imports.run_import('users', StringIO(rows), imports.NDJSON, workers=2)
+        self.assertEqual(report['created'], 4)
+        self.assertTrue(User.objects.get(username='p3').check_password('pw3'))
+        # Later imports reuse the process's pool
+        pool = imports.hash_pool(2)
+        rows = '{"username": "p4", "password": "pw4", "role": "admin"}\n'
+        self.assertEqual(imports.run_import('users', StringIO(rows), imports.NDJSON, workers=2)['created'], 1)
+        self.assertIs(imports.hash_pool(2), pool)
+
+    def test_issues_ndjson_keep_counters_and_search_in_step(self):
+        rows = "\n".join([
+            '{"title": "Missing exam marks", "description": "d", "created_by": "student", "assigned_to": "lecturer"}',
+            '{"title": "t", "description": "d", "created_by": "nobody"}',
+            'not json',
+            '{"title": "t", "description": "d", "created_by": "lecturer", "assigned_to": "student"}',
+            '{"title": "Closed one", "description": "d", "created_by": "lecturer", "status": "closed"}',
+        ])
+        report = imports.run_import('issues', StringIO(rows), imports.NDJSON)
+        self.assertEqual((report['created'], report['failed']), (2, 3))
+        self.assertEqual([error['line'] for error in report['errors']], [2, 3, 4])
+        issue = Issue.objects.get(title='Missing exam marks')
+        self.assertEqual((issue.assigned_to, issue.college), (self.lecturer, self.student.college))
+        self.assertEqual(counters.verify(), [])
+        self.assertEqual(search.search(Issue.objects.all(), 'exam', 10), [issue])
+
+    def test_upload_endpoint_is_admin_only(self):
+        admin = User.objects.create_user(username='admin', password='pass', role=User.ADMIN)
+        upload = SimpleUploadedFile('users.csv', self.USERS_CSV.encode())
+        response = self.client_for(admin).post('/api/import/users/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['created'], 3)
+        upload = SimpleUploadedFile('users.csv', self.USERS_CSV.encode())
+        response = self.client_for(self.registrar).post('/api/import/users/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 403)
+
+
+class ExportTests(APITestBase):
+
+    def setUp(self):
+        self.issues = self.make_issues(3, assigned_to=self.lecturer)
+        self.other = Issue.objects.create(title='x', description='d', created_by=self.registrar, status=Issue.CLOSED)
+        Comment.objects.create(issue=self.issues[0], content='first, "quoted"\nline', created_by=self.lecturer)
+        Comment.objects.create(issue=self.other, content='hidden', created_by=self.registrar)
+
+    def export(self, user, query=''):
+        response = self.client_for(user).get(f'/api/issues/export/?{query}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson_matches_the_serializers(self):
+        with self.assertNumQueries(1):
+            response, body = self.export(self.registrar, 'output=ndjson&status=pending&ordering=created_at')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        expected = IssueSerializer(Issue.objects.filter(status=Issue.PENDING).order_by('created_at', 'pk'), many=True)
+        self.assertEqual(rows, json.loads(json.dumps(expected.data)))
+
+    def test_csv_follows_role_scope(self):
+        response, body = self.export(self.student)
+        self.assertIn('attachment; filename="issues-', response['Content-Disposition'])
+        rows = list(csv.DictReader(StringIO(body)))
+        self.assertEqual([int(row['id']) for row in rows], sorted((issue.pk for issue in self.issues), reverse=True))
+        self.assertEqual(rows[0]['assigned_to_name'], 'Lee Lecturer')
+
+        _, body = self.export(self.lecturer, 'kind=comments')
+        rows = list(csv.DictReader(StringIO(body)))
+        self.assertEqual(len(rows), 1)
+        comment = CommentSerializer(Comment.objects.get(issue=self.issues[0])).data
+        self.assertEqual(rows[0], {key: str(value) for key, value in comment.items()})
+
+    def test_rejects_unknown_options(self):
+        client = self.client_for(self.registrar)
+        self.assertEqual(client.get('/api/issues/export/?output=xml').status_code, 400)
+        self.assertEqual(client.get('/api/issues/export/?status=lost').status_code, 400)
+
+    async def test_streams_under_asgi(self):
+        token = str(AccessToken.for_user(self.registrar))
+        response = await self.async_client.get(
+            '/api/issues/export/', headers={'Authorization': f'Bearer {token}'}
+        )
+        blocks = [block async for block in response.streaming_content]
+        self.assertTrue(blocks[0].startswith(b'id,title,description'))
+        self.assertEqual(len(list(csv.reader(StringIO(b''.join(blocks).decode())))), 5)
+
+
+class CachedAuthenticationTests(APITestBase):
+
+    def setUp(self):
+        user_cache.clear()
+        self.client = APIClient()
+        response = self.client.post('/api/token/', {'username': 'registrar', 'password': 'pass'})
+        self.tokens = response.data
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}")
+
+    def user_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [q['sql'] for q in ctx.captured_queries if '"issues_user"' in q['sql']]
+
+    def test_access_token_carries_role_and_college(self):
+        token = AccessToken(self.tokens['access'])
+        self.assertEqual((token['role'], token['college']), (self.registrar.role, self.registrar.college))
+
+    def test_user_row_is_read_once_then_cached(self):
+        self.assertEqual(len(self.user_queries('/api/issues/stats/')), 1)
+        self.assertEqual(self.user_queries('/api/issues/stats/'), [])
+        self.assertEqual(user_cache.hits, 1)
+        self.assertIsNot(user_cache.get(self.registrar.pk), user_cache.get(self.registrar.pk))
+
+    def test_changes_to_the_user_invalidate_the_cache(self):
+        self.client.get('/api/issues/stats/')
+        self.registrar.is_active = False
+        self.registrar.save()
+        self.assertEqual(self.client.get('/api/issues/stats/').status_code, 401)
+
+    def test_demotion_applies_before_the_token_expires(self):
+        url = '/api/issues/bulk/'
+        self.assertEqual(self.client.post(url, {'ids': [], 'status': Issue.CLOSED}, format='json').status_code, 400)
+        self.registrar.role = User.STUDENT
+        self.registrar.save()
+        # The access token still says academic_registrar
+        self.assertEqual(self.client.post(url, {'ids': [], 'status': Issue.CLOSED}, format='json').status_code, 403)
+
+    def test_refresh_picks_up_a_new_role(self):
+        User.objects.filter(pk=self.registrar.pk).update(role=User.ADMIN)
+        response = APIClient().post('/api/token/refresh/', {'refresh': self.tokens['refresh']})
+        self.assertEqual(AccessToken(response.data['access'])['role'], User.ADMIN)
+
+
+class ReferenceDataTests(APITestBase):
+
+    def setUp(self):
+        reference.invalidate()
+        # The snapshot outlives each test's rolled-back transaction
+        self.addCleanup(reference.invalidate)
+
+    def test_seeded_and_served_from_the_process_cache(self):
+        response = self.client.get('/api/colleges/')
+        self.assertEqual(response.json(), reference.DEFAULT_COLLEGES)
+        self.assertIn('max-age=86400', response['Cache-Control'])
+        with self.assertNumQueries(0):
+            cached = self.client.get('/api/colleges/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], response['ETag'])
+        self.assertEqual(self.client.get('/api/course-units/').json(), reference.DEFAULT_COURSE_UNITS)
+
+    def test_changes_invalidate_the_cache_and_etag(self):
+        before = self.client.get('/api/course-units/')
+        CourseUnit.objects.create(name='Databases', position=99)
+        after = self.client.get('/api/course-units/', HTTP_IF_NONE_MATCH=before['ETag'])
+        self.assertEqual(after.status_code, 200)
+        self.assertEqual(after.json()[-1], 'Databases')
+        self.assertNotEqual(after['ETag'], before['ETag'])
+
+    def test_role_fields(self):
+        response = self.client.get('/api/role-fields/?role=student')
+        self.assertEqual(response.json()['required_fields'], ['student_number', 'college', 'phone_number'])
+        self.assertEqual(self.client.get('/api/role-fields/?role=admin').status_code, 400)
+
+    def test_issue_fields_are_checked_against_the_reference_data(self):
+        client = self.client_for(self.student)
+        College.objects.filter(name='College of Engineering').update(is_active=False)
+        reference.invalidate()
+        response = client.post('/api/issues/', {
+            'title': 't', 'description': 'd', 'college': 'College of Engineering', 'course_unit': 'Basket Weaving',
+        })
+        self.assertEqual(set(response.data), {'college', 'course_unit'})
+        response = client.post('/api/issues/', {
+            'title': 't', 'description': 'd', 'college': reference.DEFAULT_COLLEGES[0], 'course_unit': 'Database Systems',
+        })
+        self.assertEqual(response.status_code, 201)
+
+
+class ConditionalGetTests(APITestBase):
+
+    def setUp(self):
+        self.issue = self.make_issues(2)[0]
+        self.client = self.client_for(self.student)
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_list_is_not_modified_without_extra_queries(self):
+        first = self.client.get('/api/issues/')
+        self.assertIn('no-cache', first['Cache-Control'])
+        with self.assertQueryBudget('issue-list'):
+            again = self.revalidate('/api/issues/', first)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b'')
+        # Another page or filter is a different resource
+        self.assertEqual(self.revalidate('/api/issues/?page_size=1', first).status_code, 200)
+
+        Issue.objects.get(pk=self.issue.pk).save()
+        self.assertEqual(self.revalidate('/api/issues/', first).status_code, 200)
+        current = self.client.get('/api/issues/')
+        self.issue.delete()
+        self.assertEqual(self.revalidate('/api/issues/', current).status_code, 200)
+
+    def test_detail_follows_updated_at(self):
+        url = f'/api/issues/{self.issue.pk}/'
+        first = self.client.get(url)
+        self.assertEqual(self.revalidate(url, first).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 304)
+        self.client_for(self.registrar).post(f'{url}assign/', {'user_id': self.lecturer.pk})
+        self.assertEqual(self.revalidate(url, first).status_code, 200)
+
+    def test_comments_and_notifications(self):
+        comment = Comment.objects.create(issue=self.issue, content='c', created_by=self.student)
+        url = f'/api/issues/{self.issue.pk}/comments/'
+        first = self.client.get(url)
+        self.assertEqual(self.revalidate(url, first).status_code, 304)
+        comment.content = 'edited'
+        comment.save()
+        self.assertEqual(self.revalidate(url, first).status_code, 200)
+
+        notification = Notification.objects.create(user=self.student, notification_type=Notification.ASSIGNED, message='m')
+        first = self.client.get('/api/notifications/')
+        self.assertEqual(self.revalidate('/api/notifications/', first).status_code, 304)
+        self.client.post(f'/api/notifications/{notification.pk}/mark_read/')
+        self.assertEqual(self.revalidate('/api/notifications/', first).status_code, 200)
+
+    def test_lists_and_notifications_have_no_last_modified(self):
+        # A delete or a notification marked read moves no timestamp, so
+        # If-Modified-Since would keep answering 304
+        notification = Notification.objects.create(user=self.student, notification_type=Notification.ASSIGNED, message='m')
+        later = http_date((timezone.now() + timedelta(minutes=1)).timestamp())
+        for url in ('/api/issues/', '/api/notifications/', f'/api/notifications/{notification.pk}/'):
+            with self.subTest(url=url):
+                self.assertFalse(self.client.get(url).has_header('Last-Modified'))
+                self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=later).status_code, 200)
+
+
+@override_settings(RESPONSE_CACHE={'ENABLED': True, 'TIMEOUT': 300, 'LOCK_TIMEOUT': 10, 'LOCK_WAIT': 0.1})
+class ResponseCacheTests(APITestBase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.issue = self.make_issues(1)[0]
+
+    def assertCached(self, client, url, hit):
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], 'HIT' if hit else 'MISS')
+        return response
+
+    def test_hits_cost_no_queries(self):
+        client = self.client_for(self.student)
+        for url in ('/api/dashboard/', '/api/issues/stats/', '/api/issues/'):
+            first = self.assertCached(client, url, hit=False)
+            with self.assertNumQueries(0):
+                again = self.assertCached(client, url, hit=True)
+            self.assertEqual(again.data, first.data)
+        # Each user has their own entries
+        self.assertCached(self.client_for(self.registrar), '/api/issues/stats/', hit=False)
+
+    def test_writes_invalidate_only_affected_users(self):
+        student, lecturer, registrar = (self.client_for(user) for user in (self.student, self.lecturer, self.registrar))
+        for client in (student, lecturer, registrar):
+            self.assertCached(client, '/api/dashboard/', hit=False)
+
+        registrar.post(f'/api/issues/{self.issue.pk}/assign/', {'user_id': self.lecturer.pk})
+        for client in (student, lecturer, registrar):
+            self.assertCached(client, '/api/dashboard/', hit=False)
+
+        other = User.objects.create_user(username='other', password='pass', role=User.STUDENT, student_number='S002')
+        Issue.objects.create(title='Other', description='d', created_by=other)
+        self.assertCached(registrar, '/api/issues/stats/', hit=False)
+        self.assertCached(registrar, '/api/issues/stats/', hit=True)
+        self.assertCached(student, '/api/issues/stats/', hit=False)
+        self.assertCached(student, '/api/issues/stats/', hit=True)
+        Issue.objects.create(title='Other 2', description='d', created_by=other)
+        self.assertCached(student, '/api/issues/stats/', hit=True)
+        self.assertCached(registrar, '/api/issues/stats/', hit=False)
+
+    def test_writes_without_signals_invalidate(self):
+        lecturer = self.client_for(self.lecturer)
+        self.assertCached(lecturer, '/api/issues/', hit=False)
+        self.client_for(self.registrar).post(
+            '/api/issues/bulk/', {'ids': [self.issue.pk], 'assigned_to': self.lecturer.pk}, format='json'
+        )
+        response = self.assertCached(lecturer, '/api/issues/', hit=False)
+        self.assertEqual([row['id'] for row in response.data['results']], [self.issue.pk])
+
+        # The bulk assignment notified the lecturer
+        self.assertEqual(self.assertCached(lecturer, '/api/dashboard/', hit=False).data['unread_notifications'], 1)
+        lecturer.post('/api/notifications/mark_all_read/')
+        self.assertEqual(self.assertCached(lecturer, '/api/dashboard/', hit=False).data['unread_notifications'], 0)
+
+    def test_reassignment_invalidates_previous_assignee(self):
+        Issue.objects.filter(pk=self.issue.pk).update(assigned_to=self.lecturer)
+        lecturer = self.client_for(self.lecturer)
+        self.assertEqual(len(self.assertCached(lecturer, '/api/issues/', hit=False).data['results']), 1)
+        issue = Issue.objects.get(pk=self.issue.pk)
+        issue.assigned_to = None
+        issue.save()
+        self.assertEqual(len(self.assertCached(lecturer, '/api/issues/', hit=False).data['results']), 0)
+
+    def test_comment_list_and_conditional_hit(self):
+        client = self.client_for(self.student)
+        url = f'/api/issues/{self.issue.pk}/comments/'
+        first = self.assertCached(client, url, hit=False)
+        revalidated = client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual((revalidated.status_code, revalidated['X-Cache']), (304, 'HIT'))
+        Comment.objects.create(issue=self.issue, content='c', created_by=self.lecturer)
+        self.assertEqual(len(self.assertCached(client, url, hit=False).data['results']), 1)
+
+    def test_concurrent_miss_waits_for_the_computing_request(self):
+        cache.add('entry:lock', 1)
+        Timer(0.02, lambda: cache.set('entry', {'data': 1})).start()
+        self.assertEqual(response_cache._wait_for('entry'), {'data': 1})
+        # A request that never finishes only delays the others by LOCK_WAIT
+        cache.add('stuck:lock', 1)
+        self.assertIsNone(response_cache._wait_for('stuck'))
+
+    def test_stats(self):
+        client = self.client_for(self.student)
+        for _ in range(3):
+            client.get('/api/issues/stats/')
+        stats = response_cache.stats()['issue-stats']
+        self.assertEqual((stats['hits'], stats['misses']), (2, 1))
+        self.assertAlmostEqual(stats['hit_ratio'], 2 / 3)
+        output = StringIO()
+        call_command('response_cache_stats', stdout=output)
+        self.assertIn('issue-stats', output.getvalue())
+
+
+class FastSerializerTests(APITestBase):
+
+    def assertSameJSON(self, fast, serializer_class, queryset):
+        expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        actual = JSONRenderer().render(fast.serialize(fast.queryset(queryset)))
+        self.assertEqual(actual, expected)
+
+    def test_output_is_byte_identical(self):
+        nameless = User.objects.create_user(username='nameless', password='pass', role=User.LECTURER)
+        self.student.first_name = 'Zoë'
+        self.student.save()
+        issues = self.make_issues(2, course_unit='Database Systems')
+        Issue.objects.create(
+            title='Ünïcode "quoted"', description='Line\nbreak', created_by=self.student,
+            assigned_to=self.lecturer, status=Issue.IN_PROGRESS,
+        )
+        self.make_issues(1, assigned_to=nameless, college=None)
+        Comment.objects.create(issue=issues[0], content='First', created_by=self.student)
+        Comment.objects.create(issue=issues[0], content='Reply', created_by=nameless)
+        Notification.objects.create(user=self.student, notification_type=Notification.ASSIGNED, issue=issues[0], message='m')
+        Notification.objects.create(user=self.student, notification_type=Notification.STATUS_CHANGED, message='m', is_read=True)
+
+        self.assertSameJSON(fast_serializers.issues, IssueSerializer, Issue.objects.order_by('pk'))
+        self.assertSameJSON(fast_serializers.comments, CommentSerializer, Comment.objects.order_by('pk'))
+        self.assertSameJSON(fast_serializers.notifications, NotificationSerializer, Notification.objects.order_by('pk'))
+        with timezone.override('Africa/Kampala'):
+            self.assertSameJSON(fast_serializers.issues, IssueSerializer, Issue.objects.order_by('pk'))
+
+    def test_rows_carry_pagination_and_validator_fields(self):
+        issue = self.make_issues(1)[0]
+        row = fast_serializers.comments.queryset(Comment.objects.all(), 'updated_at', 'pk')
+        self.assertEqual(row.query.values_select.count('updated_at'), 1)
+        row = fast_serializers.issues.queryset(Issue.objects.all(), 'updated_at').get()
+        self.assertEqual((row.pk, row.created_at, row.updated_at), (issue.pk, issue.created_at, issue.updated_at))
+
+
+class AsyncViewTests(APITestBase):
+    """Each /api/async/ endpoint answers exactly as its DRF counterpart"""
+
+    PATHS = [
+        'dashboard/', 'issues/', 'issues/?status=pending&ordering=updated_at&page_size=1', 'issues/stats/',
+        'notifications/', 'notifications/unread-count/',
+    ]
+
+    def setUp(self):
+        self.issues = self.make_issues(3)
+        Issue.objects.filter(pk=self.issues[0].pk).update(assigned_to=self.lecturer, status=Issue.IN_PROGRESS)
+        Notification.objects.create(user=self.student, notification_type=Notification.ASSIGNED, issue=self.issues[0], message='m')
+        Notification.objects.create(user=self.lecturer, notification_type=Notification.ASSIGNED, message='m', is_read=True)
+
+    def auth(self, user):
+        return {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user)}'}
+
+    def test_same_responses_as_sync_views(self):
+        paths = self.PATHS + [f'issues/{issue.pk}/' for issue in self.issues]
+        for user in (self.student, self.lecturer, self.registrar):
+            for path in paths:
+                with self.subTest(user=user.username, path=path):
+                    expected = self.client.get(f'/api/{path}', **self.auth(user))
+                    actual = self.client.get(f'/api/async/{path}', **self.auth(user))
+                    self.assertEqual(actual.status_code, expected.status_code)
+                    # Page links point back at the endpoint that served them
+                    self.assertEqual(actual.content.replace(b'/api/async/', b'/api/'), expected.content)
+
+    def test_errors_match_drf(self):
+        for path, headers in [
+            ('issues/', {}),
+            ('issues/', {'HTTP_AUTHORIZATION': 'Bearer nonsense'}),
+            ('issues/?colour=red', self.auth(self.student)),
+            ('issues/?cursor=nonsense', self.auth(self.student)),
+            (f'issues/{self.make_issues(1, created_by=self.registrar)[0].pk}/', self.auth(self.student)),
+        ]:
+            with self.subTest(path=path):
+                expected = self.client.get(f'/api/{path}', **headers)
+                actual = self.client.get(f'/api/async/{path}', **headers)
+                self.assertEqual((actual.status_code, actual.json()), (expected.status_code, expected.json()))
+        self.assertEqual(self.client.post('/api/async/issues/', **self.auth(self.student)).status_code, 405)
+
+    async def test_conditional_get_under_asgi(self):
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(self.student)}'}
+        first = await self.async_client.get('/api/async/issues/', headers=headers)
+        self.assertEqual(len(first.json()['results']), 3)
+        again = await self.async_client.get(
+            '/api/async/issues/', headers={**headers, 'If-None-Match': first['ETag']}
+        )
+        self.assertEqual(again.status_code, 304)
+
+
+@override_settings(DATABASE_ROUTING={
+    'REPLICAS': ['replica'],
+    'READ_VIEWS': ['issues.views.IssueViewSet', 'issues.async_views'],
+    'STICKY_SECONDS': 5,
+})
+class ReadReplicaRoutingTests(APITestBase):
+    def setUp(self):
+        cache.clear()
+
+    def read_alias(self, method, path, user=None):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user)}'} if user else {}
+        request = getattr(RequestFactory(), method)(path, **headers)
+        request.resolver_match = resolve(path)
+        token = routers.current_request.set(request)
+        try:
+            return routers.ReadReplicaRouter().db_for_read(Issue)
+        finally:
+            routers.current_request.reset(token)
+
+    def test_safe_reads_of_listed_views_go_to_a_replica(self):
+        self.assertEqual(self.read_alias('get', '/api/issues/'), 'replica')
+        self.assertEqual(self.read_alias('get', '/api/issues/stats/'), 'replica')
+        self.assertEqual(self.read_alias('get', '/api/async/issues/'), 'replica')
+        self.assertIsNone(self.read_alias('post', '/api/issues/'))
+        self.assertIsNone(self.read_alias('get', '/api/colleges/'))
+        # Outside a request everything stays on the primary
+        self.assertIsNone(routers.ReadReplicaRouter().db_for_read(Issue))
+        self.assertEqual(routers.ReadReplicaRouter().db_for_write(Issue), 'default')
+
+    def test_writers_read_their_writes_from_the_primary(self):
+        response = self.client.post(
+            '/api/issues/', {'title': 'Missing marks', 'description': 'CS101'},
+            content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.student)}',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(self.read_alias('get', '/api/issues/', self.student))
+        self.assertEqual(self.read_alias('get', '/api/issues/', self.lecturer), 'replica')
+        cache.delete(routers._sticky_key(self.student.pk))
+        self.assertEqual(self.read_alias('get', '/api/issues/', self.student), 'replica')
+
+    def test_failed_writes_are_not_sticky(self):
+        response = self.client.post(
+            '/api/issues/', {}, content_type='application/json',
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.student)}',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(routers.is_sticky(self.student.pk))
+
+    def test_replicas_need_a_shared_cache(self):
+        def replicas(backend, routing=None):
+            with mock.patch.dict(os.environ, {'DATABASE_REPLICAS': 'copy.sqlite3', 'CACHE_BACKEND': backend}):
+                os.environ.pop('REPLICA_ROUTING', None)
+                if routing is not None:
+                    os.environ['REPLICA_ROUTING'] = routing
+                return runpy.run_module('AITS_project.settings')['DATABASE_ROUTING']['REPLICAS']
+
+        self.assertEqual(replicas('django.core.cache.backends.locmem.LocMemCache'), [])
+        self.assertEqual(replicas('django.core.cache.backends.locmem.LocMemCache', routing='1'), ['replica1'])
+        self.assertEqual(replicas('django.core.cache.backends.filebased.FileBasedCache'), ['replica1'])
+
+class MetricsTests(APITestBase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        override = override_settings(METRICS={'DIRECTORY': self.directory})
+        override.enable()
+        self.addCleanup(override.disable)
+        metrics.aggregates.clear()
+
+    def scrape(self, **headers):
+        response = self.client.get('/metrics', **headers)
+        self.assertEqual(response.status_code, 200)
+        samples = {}
+        for line in response.content.decode().splitlines():
+            if not line.startswith('#'):
+                name, value = line.rsplit(' ', 1)
+                samples[name] = float(value)
+        return samples
+
+    def test_records_each_view_and_method(self):
+        self.make_issues(3)
+        client = self.client_for(self.student)
+        sizes = [len(client.get('/api/issues/').content) for _ in range(2)]
+        client.post('/api/issues/', {'title': 'Missing marks', 'description': 'CS101'}, format='json')
+
+        samples = self.scrape()
+        series = 'view="issue-list",method="GET"'
+        self.assertEqual(samples[f'aits_requests_total{{{series},status="200"}}'], 2)
+        self.assertEqual(samples[f'aits_requests_total{{view="issue-list",method="POST",status="201"}}'], 1)
+        self.assertEqual(samples[f'aits_request_duration_seconds_count{{{series}}}'], 2)
+        self.assertEqual(samples[f'aits_request_duration_seconds_bucket{{{series},le="+Inf"}}'], 2)
+        self.assertEqual(samples[f'aits_db_queries_total{{{series}}}'], 2)
+        self.assertGreater(samples[f'aits_db_seconds_total{{{series}}}'], 0)
+        self.assertGreater(samples[f'aits_serializer_seconds_total{{{series}}}'], 0)
+        self.assertEqual(samples[f'aits_response_bytes_total{{{series}}}'], sum(sizes))
+        buckets = [value for name, value in samples.items() if re.match(rf'aits_request_duration_seconds_bucket{{{series}', name)]
+        self.assertEqual(buckets, sorted(buckets))
+
+    def test_adds_up_other_processes(self):
+        self.client_for(self.student).get('/api/issues/')
+        with open(os.path.join(self.directory, f'{os.getppid()}.json'), 'w') as other:
+            json.dump(metrics.aggregates.snapshot(), other)
+        samples = self.scrape()
+        self.assertEqual(samples['aits_requests_total{view="issue-list",method="GET",status="200"}'], 2)
+
+    def test_exited_workers_are_folded_into_one_file(self):
+        self.client_for(self.student).get('/api/issues/')
+        exited = subprocess.Popen(['true'])
+        exited.wait()
+        with open(os.path.join(self.directory, f'{exited.pid}.json'), 'w') as other:
+            json.dump(metrics.aggregates.snapshot(), other)
+        series = 'aits_requests_total{view="issue-list",method="GET",status="200"}'
+        self.assertEqual(self.scrape()[series], 2)
+        self.assertEqual(sorted(os.listdir(self.directory)), ['.lock', f'{os.getpid()}.json', metrics.RETIRED])
+        # Counted once, from the retired file
+        self.assertEqual(self.scrape()[series], 2)
+
+    def test_requests_do_not_write_files(self):
+        self.client_for(self.student).get('/api/issues/')
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_token(self):
+        with self.settings(METRICS={'DIRECTORY': self.directory, 'TOKEN': 'scraper'}):
+            self.assertEqual(self.client.get('/metrics').status_code, 401)
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+            self.scrape(HTTP_AUTHORIZATION='Bearer scraper')
+
+    def test_loopback_only_without_token(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.7').status_code, 403)
+        self.scrape()
+
+class QueryDetectorTests(APITestBase):
+    def test_templates_ignore_values(self):
+        self.assertEqual(
+            normalize('SELECT "id" FROM "t" WHERE ("id" IN (%s, %s) AND "name" = \'x\')  LIMIT 21'),
+            'SELECT "id" FROM "t" WHERE ("id" IN (...) AND "name" = \'?\') LIMIT ?',
+        )
+
+    def test_finds_query_per_row(self):
+        self.make_issues(6)
+        with QueryDetector() as detector:
+            names = [issue.created_by.username for issue in Issue.objects.all()]
+        [finding] = detector.findings()
+        self.assertEqual((finding.kind, finding.count), ('n+1', 6))
+        self.assertIn('issues/tests.py', finding.locations[0])
+
+        with self.assertNoQueryProblems():
+            self.assertEqual(
+                [issue.created_by.username for issue in Issue.objects.select_related('created_by')], names
+            )
+
+    def test_requests_raise_or_log(self):
+        client = self.client_for(self.student)
+        with self.settings(QUERY_DETECTOR={'ENABLED': True, 'ACTION': 'raise', 'SLOW_QUERY_MS': 0}):
+            with self.assertRaises(QueryProblems) as raised:
+                client.get('/api/issues/')
+        self.assertEqual({finding.kind for finding in raised.exception.findings}, {'slow'})
+        self.assertIn('GET /api/issues/', str(raised.exception))
+
+        client = self.client_for(self.student)
+        with self.settings(QUERY_DETECTOR={'ENABLED': True, 'ACTION': 'log', 'SLOW_QUERY_MS': 0}):
+            with self.assertLogs('issues.queries', 'WARNING') as logs:
+                self.assertEqual(client.get('/api/issues/').status_code, 200)
+        problem = json.loads(logs.records[0].getMessage())
+        self.assertEqual((problem['event'], problem['kind'], problem['where']), ('query_problem', 'slow', 'GET /api/issues/'))
+
+
+class BenchmarkDataTests(APITestBase):
+    def seed(self, *args):
+        call_command(
+            'seed_benchmark', '--users', '40', '--issues', '150', '--comments', '200', '--notifications', '300',
+            '--batch-size', '64', *args, stdout=StringIO(),
+        )
+
+    def test_seed_loads_consistent_data(self):
+        self.seed()
+        bench_users = User.objects.filter(username__startswith='bench_')
+        self.assertEqual(bench_users.count(), 40)
+        self.assertEqual(set(bench_users.values_list('role', flat=True)), {User.STUDENT, User.LECTURER, User.ACADEMIC_REGISTRAR})
+        self.assertEqual((Issue.objects.count(), Comment.objects.count(), Notification.objects.count()), (150, 200, 300))
+        self.assertFalse(Issue.objects.filter(assigned_to__isnull=True).exclude(status=Issue.PENDING).exists())
+        self.assertFalse(Issue.objects.exclude(created_by__role=User.STUDENT).exists())
+        self.assertEqual(counters.verify(), [])
+        # Skewed: the first student is the most active
+        self.assertEqual(
+            Issue.objects.values('created_by').annotate(n=Count('id')).order_by('-n')[0]['created_by'],
+            User.objects.get(username='bench_student_0').pk,
+        )
+
+        client = APIClient()
+        response = client.post('/api/token/', {'username': 'bench_lecturer_0', 'password': 'benchmark'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertRaises(CommandError):
+            self.seed()
+        self.seed('--flush', '--seed', '7')
+        self.assertEqual((User.objects.filter(username__startswith='bench_').count(), Issue.objects.count()), (40, 150))
+        self.assertTrue(User.objects.filter(pk=self.student.pk).exists())
+
+    def test_compare_reports_improvement_as_positive(self):
+        before = {'throughput': 100.0, 'p50_ms': 20.0, 'p95_ms': 40.0, 'p99_ms': 0.0}
+        after = {'throughput': 150.0, 'p50_ms': 10.0, 'p95_ms': 50.0, 'p99_ms': 5.0}
+        self.assertEqual(bench_api.compare(before, after), {'throughput': 50.0, 'p50_ms': 50.0, 'p95_ms': -25.0})
+
+# TestCase wraps every test in a transaction, and run_with_retry only retries outermost ones
+@override_settings(SQLITE_WRITE_RETRY={'RETRIES': 2, 'BACKOFF': 0})
+class SQLiteWriteRetryTests(TransactionTestCase):
+    def setUp(self):
+        self.attempts = 0
+
+    def locked_until(self, attempt, error='database is locked'):
+        def write():
+            self.attempts += 1
+            self.assertTrue(connection.in_atomic_block)
+            if self.attempts < attempt:
+                raise OperationalError(error)
+            return 'written'
+        return write
+
+    def test_retries_while_locked(self):
+        self.assertEqual(sqlite.run_with_retry(self.locked_until(3)), 'written')
+        self.assertEqual(self.attempts, 3)
+
+    def test_gives_up_after_retries(self):
+        with self.assertRaisesMessage(OperationalError, 'database is locked'):
+            sqlite.run_with_retry(self.locked_until(4))
+        self.assertEqual(self.attempts, 3)
+
+    def test_other_errors_are_not_retried(self):
+        with self.assertRaisesMessage(OperationalError, 'no such table'):
+            sqlite.run_with_retry(self.locked_until(2, error='no such table: nowhere'))
+        self.assertEqual(self.attempts, 1)
+
+    def test_enclosing_transaction_runs_once(self):
+        with self.assertRaises(OperationalError):
+            with transaction.atomic():
+                sqlite.run_with_retry(self.locked_until(2))
+        self.assertEqual(self.attempts, 1)
+
+    def flaky(self, model, method='save'):
+        """Patch ``model.<method>`` to run, then report the database locked, on its first call"""
+        original = getattr(model, method)
+        calls = []
+
+        def flaky_method(instance, *args, **kwargs):
+            calls.append(instance.pk)
+            result = original(instance, *args, **kwargs)
+            if len(calls) == 1:
+                raise OperationalError('database is locked')
+            return result
+        return mock.patch.object(model, method, flaky_method), calls
+
+    def test_create_is_retried_without_rerunning_the_request(self):
+        user = User.objects.create_user(username='student', password='pass', role=User.STUDENT)
+        client = APIClient()
+        client.force_authenticate(user=user)
+        patch, calls = self.flaky(Issue)
+        check_permissions = mock.patch.object(
+            IssueViewSet, 'check_permissions', autospec=True, side_effect=IssueViewSet.check_permissions,
+        )
+        with patch, check_permissions as checked:
+            response = client.post('/api/issues/', {'title': 'Missing marks', 'description': 'CS101'}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(len(calls), 2)
+        # Only the save ran again; the first attempt's row was rolled back
+        self.assertEqual(checked.call_count, 1)
+        self.assertEqual(Issue.objects.count(), 1)
+        self.assertEqual(response.json()['id'], Issue.objects.get().pk)
+
+    def test_update_is_retried_from_the_stored_row(self):
+        student = User.objects.create_user(username='student', password='pass', role=User.STUDENT, college='Law')
+        registrar = User.objects.create_user(username='registrar', password='pass', role=User.ACADEMIC_REGISTRAR)
+        issue = Issue.objects.create(title='Missing marks', description='CS101', created_by=student)
+        client = APIClient()
+        client.force_authenticate(user=registrar)
+        patch, calls = self.flaky(Issue)
+        with patch:
+            response = client.patch(f'/api/issues/{issue.pk}/', {'status': Issue.IN_PROGRESS}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(len(calls), 2)
+        # The retry still saw the change from pending, so it notified and counted it
+        self.assertEqual(
+            Notification.objects.filter(user=student, notification_type=Notification.STATUS_CHANGED).count(), 1
+        )
+        self.assertEqual(counters.verify(), [])
+        self.assertEqual(counters.counts_by_status((IssueCounter.GLOBAL, '', 1)).get(Issue.IN_PROGRESS), 1)
+
+    def test_write_action_is_retried(self):
+        user = User.objects.create_user(username='student', password='pass', role=User.STUDENT)
+        notification = Notification.objects.create(user=user, notification_type=Notification.ASSIGNED, message='m')
+        client = APIClient()
+        client.force_authenticate(user=user)
+        patch, calls = self.flaky(Notification)
+        with patch:
+            response = client.post(f'/api/notifications/{notification.pk}/mark_read/')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(calls, [notification.pk, notification.pk])
+        notification.refresh_from_db()
+        self.assertTrue(notification.is_read)
+
+
+# The backup reads committed pages, so nothing may hold the test's transaction open
+class SQLiteBackupTests(TransactionTestCase):
+    def test_backup_copies_the_primary(self):
+        user = User.objects.create_user(username='student', password='pass', role=User.STUDENT)
+        for number in range(3):
+            Issue.objects.create(title=f'Issue {number}', description='Missing marks', created_by=user)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'replica.sqlite3')
+            sqlite.backup_to(path)
+            copy = sqlite3.connect(path)
+            try:
+                self.assertEqual(copy.execute('SELECT COUNT(*) FROM issues_issue').fetchone()[0], 3)
+            finally:
+                copy.close()
@@ -1,7 +1,12 @@
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer 
-from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer 
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 import logging
 
+from .authentication import with_user_claims
+from .models import User
+
 logger = logging.getLogger(__name__)
  # Tpken craetion and validation
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
@@ -11,6 +16,8 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
                 
             # Add extra user info to the token response
             user = self.user
+            # ...and the role and college to the access token, for permission checks
+            data['access'] = with_user_claims(data['access'], user)
             data.update({
                 'id': user.id,
                 'username': user.username, 
@@ -33,3 +40,16 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        # Claims are read from the user at refresh time, so role changes apply from the next refresh
+        user_id = AccessToken(data['access']).get(api_settings.USER_ID_CLAIM)
+        user = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is not None:
+            data['access'] = with_user_claims(data['access'], user)
+        return data
+
+class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = CustomTokenRefreshSerializer
@@ -1,10 +1,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_nested import routers 
-from rest_framework_simplejwt.views import TokenRefreshView
 # In issues/urls.py 
-from .token_views import CustomTokenObtainPairView
-from .token_views import CustomTokenObtainPairView
+from .token_views import CustomTokenObtainPairView, CustomTokenRefreshView
 from .views import (
     RegisterView, 
     UserProfileView, 
@@ -15,8 +13,11 @@ from .views import (
     CollegesView,
     CourseUnitsView,
     RoleFieldsView,
-    DashboardView
+    DashboardView,
+    ImportView
 )
+from .streams import notification_stream
+from . import async_views
 from .models import User
 
 router = DefaultRouter()
@@ -28,7 +29,17 @@ issues_router = routers.NestedSimpleRouter(router, r'issues', lookup='issue')
 issues_router.register(r'comments', CommentViewSet, basename='issue-comments')
 
 urlpatterns = [
+    # Before the router so 'stream' is not taken for a notification pk
+    path('notifications/stream/', notification_stream, name='notification-stream'),
     path('', include(router.urls)),
+    
+    # Native async read endpoints for the ASGI entry point; see issues.async_views
+    path('async/dashboard/', async_views.dashboard, name='async-dashboard'),
+    path('async/issues/', async_views.issue_list, name='async-issue-list'),
+    path('async/issues/stats/', async_views.issue_stats, name='async-issue-stats'),
+    path('async/issues/<int:pk>/', async_views.issue_detail, name='async-issue-detail'),
+    path('async/notifications/', async_views.notification_list, name='async-notification-list'),
+    path('async/notifications/unread-count/', async_views.unread_count, name='async-unread-count'),
     path('', include(issues_router.urls)),
     path('register/', RegisterView.as_view(), name='register'),
     path('profile/', UserProfileView.as_view(), name='profile'),
@@ -36,7 +47,10 @@ urlpatterns = [
     
     # Use custom token views
     path('token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
+    
+    # Admin bulk import of users or issues
+    path('import/<str:kind>/', ImportView.as_view(), name='import'),
     
     # Dashboard endpoint
     path('dashboard/', DashboardView.as_view(), name='dashboard'),
@@ -2,16 +2,27 @@ from rest_framework import viewsets, permissions, status, generics
 from rest_framework.response import Response
 from rest_framework.decorators import action 
 from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser
+from rest_framework.utils.urls import replace_query_param
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
-from django.db.models import Count
-from .models import Issue, Comment, User, Notification
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from .models import Issue, IssueCounter, Comment, User, Notification
+from . import bulk, counters, exports, fast_serializers, imports, reference, response_cache, search
+from .notifications import NotificationBatch
+from .conditional import ConditionalGetMixin
+from .sqlite import WriteRetryMixin, retry_writes
+from .filters import IssueFilter
 from .serializers import (
     UserSerializer,  
     UserProfileSerializer, 
     UserListSerializer, 
     IssueSerializer,  
+    BulkIssueUpdateSerializer, 
     CommentSerializer, 
     NotificationSerializer 
 )
@@ -28,29 +39,21 @@ class RegisterView(generics.CreateAPIView):
         serializer.is_valid(raise_exception=True)
         
         # Additional validation for role-specific fields
-        role = serializer.validated_data.get('role') 
-        if role == User.STUDENT and not serializer.validated_data.get('student_number'):
-            return Response(
-                {"student_number": "Student number is required for students."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        if not serializer.validated_data.get('college'): 
-            if role == User.STUDENT:
-                return Response(
-                    {"college": "College is required for students."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            elif role in [User.LECTURER, User.ACADEMIC_REGISTRAR]: 
-                return Response(
-                    {"college": "College is required."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+        errors = User.role_field_errors(
+            serializer.validated_data.get('role'),
+            serializer.validated_data.get('student_number'),
+            serializer.validated_data.get('college'),
+        )
+        if errors:
+            # Report the first missing field, as registration always has
+            field = next(iter(errors))
+            return Response({field: errors[field]}, status=status.HTTP_400_BAD_REQUEST)
         
         self.perform_create(serializer) 
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
-class UserProfileView(generics.RetrieveUpdateAPIView):  
+class UserProfileView(WriteRetryMixin, generics.RetrieveUpdateAPIView):  
     serializer_class = UserProfileSerializer 
     permission_classes = (permissions.IsAuthenticated,) 
     
@@ -60,6 +63,7 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
 class UserListView(generics.ListAPIView): 
     serializer_class = UserListSerializer
     permission_classes = (permissions.IsAuthenticated,) 
+    keyset_field = 'date_joined'
     
     def get_queryset(self): 
         role = self.kwargs.get('role') or self.request.query_params.get('role')
@@ -67,9 +71,10 @@ class UserListView(generics.ListAPIView):
             return User.objects.filter(role=role)
         return User.objects.all()
 
-class IssueViewSet(viewsets.ModelViewSet):
-    queryset = Issue.objects.all()
+class IssueViewSet(WriteRetryMixin, ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Issue.objects.select_related('created_by', 'assigned_to')
     serializer_class = IssueSerializer
+    fast_serializer = fast_serializers.issues
     
     def get_permissions(self): 
         if self.action in ['create']:
@@ -78,20 +83,47 @@ class IssueViewSet(viewsets.ModelViewSet):
             permission_classes = [IsOwnerOrReadOnly | IsAdminUser | IsAcademicRegistrar] 
         elif self.action in ['request_info']:
             permission_classes = [permissions.IsAuthenticated, IsLecturerAssignedToIssue]
+        elif self.action in ['bulk_update']:
+            permission_classes = [permissions.IsAuthenticated, IsAdminUser | IsAcademicRegistrar]
         else:
             permission_classes = [permissions.IsAuthenticated] 
         return [permission() for permission in permission_classes] 
     
     def get_queryset(self): 
-        user = self.request.user 
-        if user.role == User.ADMIN or user.role == User.ACADEMIC_REGISTRAR: 
-            return Issue.objects.all()
-        elif user.role == User.LECTURER: 
-            return Issue.objects.filter(assigned_to=user) | Issue.objects.filter(created_by=user)
-        else:  # Student
-            return Issue.objects.filter(created_by=user) 
+        # Load both user FKs in the same query so serializing names costs nothing per row
+        return Issue.objects.visible_to(self.request.user).select_related('created_by', 'assigned_to')
+    
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action in ('list', 'export'):
+            queryset = self.list_filter.filter_queryset(queryset)
+        return queryset
+    
+    @property
+    def list_filter(self):
+        if not hasattr(self, '_list_filter'):
+            params = self.request.query_params
+            if self.action == 'export':
+                # The export's own options are not filters
+                params = params.copy()
+                for name in ('output', 'kind'):
+                    params.pop(name, None)
+            self._list_filter = IssueFilter(params)
+        return self._list_filter
+    
+    def get_keyset(self):
+        if self.action == 'list':
+            return self.list_filter.keyset
+        return 'created_at', True
+    
+    @response_cache.cached_response(
+        'issue-list', lambda view, request: response_cache.issue_scopes(request.user) + ['users']
+    )
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
     
     @action(detail=True, methods=['post'])
+    @retry_writes
     def assign(self, request, pk=None): 
         issue = self.get_object()
         user_id = request.data.get('user_id')
@@ -105,49 +137,107 @@ class IssueViewSet(viewsets.ModelViewSet):
                 return Response({"error": "Can only assign to staff members"}, status=status.HTTP_400_BAD_REQUEST)
             
             issue.assigned_to = user
-            issue.save(update_fields=['assigned_to']) 
+            issue.save(update_fields=['assigned_to', 'updated_at']) 
             
-            Notification.objects.create(
-                user=user,
-                notification_type=Notification.ASSIGNED, 
-                issue=issue,
-                message=f"Issue '{issue.title}' has been assigned to you by {request.user.get_full_name()}"
+            notifications = NotificationBatch()
+            notifications.add(
+                user, Notification.ASSIGNED, issue,
+                f"Issue '{issue.title}' has been assigned to you by {request.user.get_full_name()}"
             )
+            notifications.send()
             
             return Response(IssueSerializer(issue).data)
         except User.DoesNotExist:
             return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND) 
     
+    @action(detail=False, methods=['post'], url_path='bulk')
+    @retry_writes
+    def bulk_update(self, request):
+        """Assign, re-status or re-prioritise many issues in one transaction"""
+        serializer = BulkIssueUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        changes = {
+            field: serializer.validated_data[field] for field in bulk.FIELDS if field in serializer.validated_data
+        }
+        report = bulk.update_issues(
+            Issue.objects.visible_to(request.user), serializer.validated_data['ids'], changes, request.user
+        )
+        return Response(report)
+    
     @action(detail=False, methods=['get'])
+    @response_cache.cached_response(
+        'issue-stats', lambda view, request: response_cache.issue_scopes(request.user)
+    )
     def stats(self, request):
         """Get statistics about issues for dashboard"""
         user = request.user
         
-        # Base queryset depends on user role
-        if user.role == User.ADMIN or user.role == User.ACADEMIC_REGISTRAR: 
-            queryset = Issue.objects.all() 
-        elif user.role == User.LECTURER: 
-            queryset = Issue.objects.filter(assigned_to=user) | Issue.objects.filter(created_by=user)
-        else:  # Student
-            queryset = Issue.objects.filter(created_by=user) 
-        
-        # Count issues by status
-        status_counts = queryset.values('status').annotate(count=Count('status'))
+        # Read the maintained counters for the user's role scope
+        counts = counters.visible_counts(user)
         
         # Format the response
         stats = {
-            'total': queryset.count(),
-            'by_status': {item['status']: item['count'] for item in status_counts},
+            'total': sum(counts.values()),
+            'by_status': {status: count for status, count in counts.items() if count},
         }
         
         # Add college stats for academic registrar
         if user.role == User.ACADEMIC_REGISTRAR:
-            college_counts = queryset.values('created_by__college').annotate(count=Count('created_by__college'))
-            stats['by_college'] = {item['created_by__college'] or 'Unknown': item['count'] for item in college_counts}
+            stats['by_college'] = {
+                college or 'Unknown': count for college, count in counters.college_totals().items()
+            }
         
         return Response(stats)
     
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream the issues the list view would show, or their comments, as CSV or NDJSON"""
+        output = request.query_params.get('output', exports.CSV)
+        kind = request.query_params.get('kind', 'issues')
+        if output not in exports.CONTENT_TYPES:
+            return Response({"output": "Expected 'csv' or 'ndjson'."}, status=status.HTTP_400_BAD_REQUEST)
+        if kind not in ('issues', 'comments'):
+            return Response({"kind": "Expected 'issues' or 'comments'."}, status=status.HTTP_400_BAD_REQUEST)
+        
+        issues = self.filter_queryset(self.get_queryset())
+        if kind == 'comments':
+            names, rows = exports.comment_rows(issues)
+        else:
+            names, rows = exports.issue_rows(issues, self.list_filter.ordering)
+        blocks = exports.render(names, rows, output)
+        if isinstance(request._request, ASGIRequest):
+            blocks = exports.as_async(blocks)
+        
+        response = StreamingHttpResponse(blocks, content_type=exports.CONTENT_TYPES[output])
+        filename = f"{kind}-{timezone.now():%Y%m%d-%H%M%S}.{output}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+    
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Full-text search over issues and their comments, best match first"""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"error": "Search query 'q' is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+        except ValueError:
+            return Response({"error": "limit and offset must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        issues = search.search(self.get_queryset(), query, limit + 1, offset)
+        next_url = None
+        if len(issues) > limit:
+            issues = issues[:limit]
+            next_url = replace_query_param(request.build_absolute_uri(), 'offset', offset + limit)
+        return Response({
+            'next': next_url,
+            'results': IssueSerializer(issues, many=True).data,
+        })
+    
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated, IsLecturerAssignedToIssue])
+    @retry_writes
     def request_info(self, request, pk=None):
         """Request more information from a student about an issue"""
         issue = self.get_object()
@@ -163,17 +253,17 @@ class IssueViewSet(viewsets.ModelViewSet):
 
         
         # Notify the student who created the issue
-        Notification.objects.create(
-            user=issue.created_by,
-            notification_type=Notification.COMMENT_ADDED,
-            issue=issue,
-            message=f"A lecturer has requested more information on your issue '{issue.title}'"
+        notifications = NotificationBatch()
+        notifications.add(
+            issue.created_by, Notification.COMMENT_ADDED, issue,
+            f"A lecturer has requested more information on your issue '{issue.title}'"
         )
+        notifications.send()
         
         # Update the issue status to in_progress if it's pending
         if issue.status == Issue.PENDING: 
             issue.status = Issue.IN_PROGRESS 
-            issue.save(update_fields=['status'])
+            issue.save(update_fields=['status', 'updated_at'])
          
         return Response({
             'success': True,
@@ -181,13 +271,20 @@ class IssueViewSet(viewsets.ModelViewSet):
             'issue': IssueSerializer(issue).data
         }) 
 
-class CommentViewSet(viewsets.ModelViewSet):
-    queryset = Comment.objects.all()
+class CommentViewSet(WriteRetryMixin, ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Comment.objects.select_related('created_by')
     serializer_class = CommentSerializer
+    fast_serializer = fast_serializers.comments
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Comment.objects.filter(issue_id=self.kwargs.get('issue_pk'))
+        return Comment.objects.filter(issue_id=self.kwargs.get('issue_pk')).select_related('created_by')
+    
+    @response_cache.cached_response(
+        'comment-list', lambda view, request: [f"comments:issue:{view.kwargs.get('issue_pk')}", 'users']
+    )
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
     
     def get_permissions(self):
         if self.action in ['update', 'partial_update', 'destroy']:
@@ -196,53 +293,88 @@ class CommentViewSet(viewsets.ModelViewSet):
             permission_classes = [permissions.IsAuthenticated]
         return [permission() for permission in permission_classes]
 
-class NotificationViewSet(viewsets.ModelViewSet): 
+class NotificationViewSet(WriteRetryMixin, ConditionalGetMixin, viewsets.ModelViewSet): 
     serializer_class = NotificationSerializer 
     permission_classes = [permissions.IsAuthenticated] 
+    fast_serializer = fast_serializers.notifications
+    
+    # Marking read changes no timestamp, so read state is the validator and
+    # there is no Last-Modified
+    last_modified_field = None
+    validator_fields = ('pk', 'is_read')
     
     def get_queryset(self):
         return Notification.objects.filter(user=self.request.user) 
     
+    @action(detail=False, methods=['get'], url_path='unread-count')
+    def unread_count(self, request):
+        return Response({'unread': Notification.objects.filter(user=request.user, is_read=False).count()})
+    
     @action(detail=False, methods=['post']) 
+    @retry_writes
     def mark_all_read(self, request):
         notifications = Notification.objects.filter(user=request.user, is_read=False)
-        notifications.update(is_read=True)
+        if notifications.update(is_read=True):
+            # update() sends no post_save
+            response_cache.bump(f'notifications:user:{request.user.pk}')
         return Response({"status": "All notifications marked as read"})
     
     @action(detail=True, methods=['post'])
+    @retry_writes
     def mark_read(self, request, pk=None):
         notification = self.get_object()
         notification.is_read = True
         notification.save()
         return Response({"status": "Notification marked as read"})
 
+class ImportView(APIView):
+    """Admin-only upload of a CSV or NDJSON file of users or issues; see issues.imports"""
+    permission_classes = [permissions.IsAuthenticated, IsAdminUser]
+    parser_classes = [MultiPartParser]
+    
+    def post(self, request, kind):
+        if kind not in imports.IMPORTERS:
+            return Response({"error": f"Unknown import kind '{kind}'"}, status=status.HTTP_404_NOT_FOUND)
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"file": "A CSV or NDJSON file is required."}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.data.get('file_format') or imports.detect_format(upload.name)
+        if file_format not in (imports.CSV, imports.NDJSON):
+            return Response(
+                {"file_format": "Expected 'csv' or 'ndjson', or a .csv/.ndjson/.jsonl file name."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # Large uploads are spooled to a temporary file, which is read row by row
+        report = imports.run_import(kind, imports.text_stream(upload.file), file_format)
+        return Response(report)
+
+def reference_response(request, document):
+    """Serve a pre-rendered reference document, or 304 when the client's copy is current"""
+    response = get_conditional_response(request, etag=document.etag)
+    if response is None:
+        response = HttpResponse(document.body, content_type='application/json')
+    response['ETag'] = document.etag
+    patch_cache_control(response, public=True, max_age=reference.reference_settings()['MAX_AGE'])
+    return response
+
 class CollegesView(APIView):
     permission_classes = [permissions.AllowAny]
+    # Public data: skip token checks, so a stale token in the browser cannot 401 it
+    authentication_classes = []
     
     def get(self, request):
-        colleges = [
-            "College of Computing and Information Sciences",
-            "College of Engineering",
-            "College of Business and Management Sciences",
-            "College of Education and External Studies"
-        ]
-        return Response(colleges)
+        return reference_response(request, reference.current().documents['colleges'])
 
 class CourseUnitsView(APIView):
     permission_classes = [permissions.AllowAny]
+    authentication_classes = []
     
     def get(self, request):
-        course_units = [
-            "Introduction to Programming",
-            "Data Structures and Algorithms",
-            "Database Systems",
-            "Software Engineering",
-            "Computer Networks"
-        ]
-        return Response(course_units)
+        return reference_response(request, reference.current().documents['course_units'])
 
 class RoleFieldsView(APIView):
     permission_classes = [permissions.AllowAny]
+    authentication_classes = []
     
     def get(self, request):
         role = request.query_params.get('role', None)
@@ -250,22 +382,17 @@ class RoleFieldsView(APIView):
         if not role:
             return Response({"error": "Role parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
         
-        if role == User.STUDENT:
-            return Response({
-                "required_fields": ["student_number", "college", "phone_number"],
-                "optional_fields": []
-            })
-        elif role in [User.LECTURER, User.ACADEMIC_REGISTRAR]:
-            return Response({
-                "required_fields": ["college", "phone_number"],
-                "optional_fields": []
-            })
-        else:
+        document = reference.ROLE_FIELD_DOCUMENTS.get(role)
+        if document is None:
             return Response({"error": "Invalid role"}, status=status.HTTP_400_BAD_REQUEST)
+        return reference_response(request, document)
 
 class DashboardView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
+    @response_cache.cached_response('dashboard', lambda view, request: (
+        response_cache.issue_scopes(request.user) + response_cache.notification_scopes(request.user) + ['users']
+    ))
     def get(self, request):
         user = request.user
         
@@ -283,57 +410,39 @@ class DashboardView(APIView):
         if user.role == User.STUDENT:
             # Get student's issues  
             issues = Issue.objects.filter(created_by=user)
-            data['issues'] = {
-                'total': issues.count(),
-                'pending': issues.filter(status=Issue.PENDING).count(),
-                'in_progress': issues.filter(status=Issue.IN_PROGRESS).count(),
-                'resolved': issues.filter(status=Issue.RESOLVED).count(),
-                'closed': issues.filter(status=Issue.CLOSED).count(),
-            }
+            data['issues'] = counters.breakdown(
+                counters.counts_by_status((IssueCounter.CREATOR, str(user.pk), 1))
+            )
             
             # Get recent issues
             recent_issues = issues.order_by('-created_at')[:5]
-            data['recent_issues'] = IssueSerializer(recent_issues, many=True).data
+            data['recent_issues'] = fast_serializers.issues.serialize(fast_serializers.issues.queryset(recent_issues))
             
         elif user.role == User.LECTURER:
             # Get assigned issues
             assigned_issues = Issue.objects.filter(assigned_to=user)
-            data['assigned_issues'] = {
-                'total': assigned_issues.count(),
-                'pending': assigned_issues.filter(status=Issue.PENDING).count(),
-                'in_progress': assigned_issues.filter(status=Issue.IN_PROGRESS).count(),
-                'resolved': assigned_issues.filter(status=Issue.RESOLVED).count(),
-                'closed': assigned_issues.filter(status=Issue.CLOSED).count(),
-            }
+            data['assigned_issues'] = counters.breakdown(
+                counters.counts_by_status((IssueCounter.ASSIGNEE, str(user.pk), 1))
+            )
             
             # Get recent assigned issues
             recent_assigned = assigned_issues.order_by('-created_at')[:5]
-            data['recent_assigned'] = IssueSerializer(recent_assigned, many=True).data
+            data['recent_assigned'] = fast_serializers.issues.serialize(fast_serializers.issues.queryset(recent_assigned))
             
         elif user.role == User.ACADEMIC_REGISTRAR:
             # Get all issues
-            all_issues = Issue.objects.all()
-            data['all_issues'] = {
-                'total': all_issues.count(),
-                'pending': all_issues.filter(status=Issue.PENDING).count(),
-                'in_progress': all_issues.filter(status=Issue.IN_PROGRESS).count(),
-                'resolved': all_issues.filter(status=Issue.RESOLVED).count(),
-                'closed': all_issues.filter(status=Issue.CLOSED).count(),
-            }
-            
-            # Get issues by college
-            college_stats = []
-            colleges = User.objects.values_list('college', flat=True).distinct()
-            for college in colleges:
-                if college:  # Skip None values
-                    count = Issue.objects.filter(created_by__college=college).count()
-                    college_stats.append({'college': college, 'count': count})
+            data['all_issues'] = counters.breakdown(
+                counters.counts_by_status((IssueCounter.GLOBAL, '', 1))
+            )
             
-            data['college_stats'] = college_stats
+            # Get issues by college, colleges without issues included
+            data['college_stats'] = [
+                {'college': college, 'count': count} for college, count in counters.college_breakdown()
+            ]
             
             # Get unassigned issues
             unassigned = Issue.objects.filter(assigned_to__isnull=True).order_by('-created_at')[:5]
-            data['unassigned_issues'] = IssueSerializer(unassigned, many=True).data
+            data['unassigned_issues'] = fast_serializers.issues.serialize(fast_serializers.issues.queryset(unassigned))
         
         # Get unread notifications counted
         data['unread_notifications'] = Notification.objects.filter(user=user, is_read=False).count()
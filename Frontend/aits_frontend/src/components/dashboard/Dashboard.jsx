@@ -18,20 +18,23 @@ const Dashboard = () => {
     pendingIssues: 0,
     resolvedIssues: 0,
     inProgressIssues: 0,
+    closedIssues: 0,
   })
   const [loading, setLoading] = useState(true) 
 
   useEffect(() => {
     const fetchStats = async () => {
       try {
-        const response = await api.get("/issues/")
-        const issues = response.data 
+        // Counted on the server: /issues/ only returns the first page
+        const response = await api.get("/issues/stats/")
+        const { total, by_status } = response.data
 
         setStats({
-          totalIssues: issues.length, 
-          pendingIssues: issues.filter((issue) => issue.status === "pending").length,
-          inProgressIssues: issues.filter((issue) => issue.status === "in_progress").length,
-          resolvedIssues: issues.filter((issue) => issue.status === "resolved").length,
+          totalIssues: total,
+          pendingIssues: by_status.pending || 0,
+          inProgressIssues: by_status.in_progress || 0,
+          resolvedIssues: by_status.resolved || 0,
+          closedIssues: by_status.closed || 0,
         })
 
         setLoading(false)
@@ -9,29 +9,28 @@ import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContaine
 
 const LecturerDashboard = ({ stats }) => {
   const { user } = useAuth()
-  const [assignedIssues, setAssignedIssues] = useState([]) 
+  const [pendingIssues, setPendingIssues] = useState([])
+  const [inProgressIssues, setInProgressIssues] = useState([])
+  const [counts, setCounts] = useState({ total: 0, pending: 0, in_progress: 0, resolved: 0, closed: 0 })
   const [loading, setLoading] = useState(true)
   const [chartData, setChartData] = useState([]) 
   
   useEffect(() => {
     const fetchAssignedIssues = async () => {
       try {
-        const response = await api.get("/issues/")
-        // Filter issues assigned to the current lecturer
-        const userIssues = response.data.filter((issue) => issue.assigned_to === user.id) 
-        // Sort by creation date (newest first)
-        const sortedIssues = userIssues.sort((a, b) => new Date(b.created_at) - new Date(a.created_at))
+        // Counts come from the server; /issues/ only returns one page
+        const [dashboardResponse, pendingResponse, inProgressResponse] = await Promise.all([
+          api.get("/dashboard/"),
+          api.get("/issues/", { params: { status: "pending", page_size: 5 } }),
+          api.get("/issues/", { params: { status: "in_progress", page_size: 3 } }),
+        ])
+        const statusCounts = dashboardResponse.data.assigned_issues
 
-        setAssignedIssues(sortedIssues)
+        setCounts(statusCounts)
+        setPendingIssues(pendingResponse.data)
+        setInProgressIssues(inProgressResponse.data)
 
         // Prepare data for the bar chart
-        const statusCounts = {
-          pending: userIssues.filter((issue) => issue.status === "pending").length,
-          in_progress: userIssues.filter((issue) => issue.status === "in_progress").length, 
-          resolved: userIssues.filter((issue) => issue.status === "resolved").length,
-          closed: userIssues.filter((issue) => issue.status === "closed").length,
-        }
-
         setChartData([
           { name: "Pending", count: statusCounts.pending },
           { name: "In Progress", count: statusCounts.in_progress }, 
@@ -64,9 +63,6 @@ const LecturerDashboard = ({ stats }) => {
     }
   }
 
-  const pendingIssues = assignedIssues.filter((issue) => issue.status === "pending")
-  const inProgressIssues = assignedIssues.filter((issue) => issue.status === "in_progress")
-
   return (
     <div className="dashboard-container">
       <div className="dashboard-header">
@@ -76,19 +72,19 @@ const LecturerDashboard = ({ stats }) => {
 
       <div className="dashboard-stats">
         <div className="stat-card">
-          <div className="stat-value">{assignedIssues.length}</div>
+          <div className="stat-value">{counts.total}</div>
           <div className="stat-label">Assigned Issues</div>
         </div>
         <div className="stat-card">
-          <div className="stat-value">{pendingIssues.length}</div>
+          <div className="stat-value">{counts.pending}</div>
           <div className="stat-label">Pending</div>
         </div>
         <div className="stat-card">
-          <div className="stat-value">{inProgressIssues.length}</div>
+          <div className="stat-value">{counts.in_progress}</div>
           <div className="stat-label">In Progress</div>
         </div>
         <div className="stat-card">
-          <div className="stat-value">{assignedIssues.filter((issue) => issue.status === "resolved").length}</div>
+          <div className="stat-value">{counts.resolved}</div>
           <div className="stat-label">Resolved</div>
         </div>
       </div>
@@ -22,37 +22,31 @@ import {
 const RegistrarDashboard = ({ stats }) => {
   const { user } = useAuth()
 
+  const [unassignedIssues, setUnassignedIssues] = useState([])
+  const [collegeStats, setCollegeStats] = useState([])
+  const [priorityIssues, setPriorityIssues] = useState([])
+  const [loading, setLoading] = useState(true)
+
   useEffect(() => {
-    const fetchAllIssues = async () => {
+    const fetchRegistrarData = async () => {
       try {
-        const response = await api.get("/issues/") 
-        const issues = response.data
-        setAllIssues(issues)
-
-        // Calculate college statistics
-        const collegeMap = {}
-        issues.forEach((issue) => {
-          const createdBy = issue.created_by_name
-          const college = issue.college || "Unknown" 
-
-          if (!collegeMap[college]) {
-            collegeMap[college] = { name: college, count: 0 }
-          }
-          collegeMap[college].count++
-        })
-
-        setCollegeStats(Object.values(collegeMap))
-
-        // Identify priority issues (pending for more than 7 days) 
+        // Priority issues: pending for more than 7 days
         const sevenDaysAgo = new Date()
         sevenDaysAgo.setDate(sevenDaysAgo.getDate() - 7)
 
-        const priority = issues.filter((issue) => {
-          const createdDate = new Date(issue.created_at)
-          return issue.status === "pending" && createdDate < sevenDaysAgo
-        })
+        // Aggregated on the server: /issues/ only returns the first page
+        const [dashboardResponse, priorityResponse] = await Promise.all([
+          api.get("/dashboard/"),
+          api.get("/issues/", {
+            params: { status: "pending", created_before: sevenDaysAgo.toISOString(), page_size: 5 },
+          }),
+        ])
 
-        setPriorityIssues(priority)
+        setCollegeStats(
+          dashboardResponse.data.college_stats.map(({ college, count }) => ({ name: college, count })),
+        )
+        setUnassignedIssues(dashboardResponse.data.unassigned_issues)
+        setPriorityIssues(priorityResponse.data)
         setLoading(false)
       } catch (error) {
         console.error("Error fetching issues for registrar:", error)
@@ -60,7 +54,7 @@ const RegistrarDashboard = ({ stats }) => {
       }
     }
 
-    fetchAllIssues()
+    fetchRegistrarData()
   }, [])
 
   // Prepare data for the pie chart
@@ -68,7 +62,7 @@ const RegistrarDashboard = ({ stats }) => {
     { name: "Pending", value: stats.pendingIssues, color: "#FFA500" },
     { name: "In Progress", value: stats.inProgressIssues, color: "#3B82F6" },
     { name: "Resolved", value: stats.resolvedIssues, color: "#10B981" },
-    { name: "Closed", value: allIssues.filter((issue) => issue.status === "closed").length, color: "#6B7280" },
+    { name: "Closed", value: stats.closedIssues, color: "#6B7280" },
   ].filter((item) => item.value > 0)
 
   const getStatusClass = (status) => {
@@ -217,31 +211,28 @@ const RegistrarDashboard = ({ stats }) => {
           <div className="loading">Loading unassigned issues...</div>
         ) : (
           <div className="issue-list">
-            {allIssues
-              .filter((issue) => !issue.assigned_to)
-              .slice(0, 5)
-              .map((issue) => (
-                <div key={issue.id} className="issue-card">
-                  <div className="issue-header">
-                    <h3>
-                      <Link to={`/issues/${issue.id}`}>{issue.title}</Link>
-                    </h3>
-                    <span className={`status-badge ${getStatusClass(issue.status)}`}>
-                      {issue.status.replace("_", " ")}
-                    </span>
-                  </div>
-                  <p className="issue-description">{issue.description.substring(0, 100)}...</p>
-                  <div className="issue-footer">
-                    <span>Created by: {issue.created_by_name}</span>
-                    <span>Created: {new Date(issue.created_at).toLocaleDateString()}</span>
-                  </div>
-                  <div className="issue-actions">
-                    <Link to={`/issues/${issue.id}`} className="btn btn-primary">
-                      Assign Issue
-                    </Link>
-                  </div>
+            {unassignedIssues.map((issue) => (
+              <div key={issue.id} className="issue-card">
+                <div className="issue-header">
+                  <h3>
+                    <Link to={`/issues/${issue.id}`}>{issue.title}</Link>
+                  </h3>
+                  <span className={`status-badge ${getStatusClass(issue.status)}`}>
+                    {issue.status.replace("_", " ")}
+                  </span>
                 </div>
-              ))}
+                <p className="issue-description">{issue.description.substring(0, 100)}...</p>
+                <div className="issue-footer">
+                  <span>Created by: {issue.created_by_name}</span>
+                  <span>Created: {new Date(issue.created_at).toLocaleDateString()}</span>
+                </div>
+                <div className="issue-actions">
+                  <Link to={`/issues/${issue.id}`} className="btn btn-primary">
+                    Assign Issue
+                  </Link>
+                </div>
+              </div>
+            ))}
           </div>
         )}
       </div>
@@ -19,13 +19,10 @@ const StudentDashboard = ({ stats }) => {
   useEffect(() => {
     const fetchRecentIssues = async () => {
       try {
-        const response = await api.get("/issues/")
-        // Filter issues created by the current student
-        const userIssues = response.data.filter((issue) => issue.created_by === user.id)
-        // Sort by creation date (newest first) and take the first 5
-        const sortedIssues = userIssues.sort((a, b) => new Date(b.created_at) - new Date(a.created_at)).slice(0, 5)
+        // Students only see their own issues, newest first
+        const response = await api.get("/issues/", { params: { page_size: 5 } })
 
-        setRecentIssues(sortedIssues)
+        setRecentIssues(response.data)
         setLoading(false)
       } catch (error) {
         console.error("Error fetching recent issues:", error)
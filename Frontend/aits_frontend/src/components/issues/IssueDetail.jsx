@@ -3,7 +3,7 @@
 import { useState, useEffect } from "react"
 import { useParams, useNavigate, Link } from "react-router-dom"
 import { useAuth } from "../../contexts/AuthContext"
-import api, { getLecturers } from "../../services/api"
+import api, { getComments, getLecturers } from "../../services/api"
 import { MessageSquare, Edit, Trash2, AlertCircle, Clock, Check, X } from "lucide-react"
 
 
@@ -42,8 +42,7 @@ const IssueDetail = () => {
         })
 
         // Fetch comments
-        const commentsResponse = await api.get(`/issues/${id}/comments/`)
-        setComments(commentsResponse.data)
+        setComments(await getComments(id))
 
         // Fetch lecturers for assignment
         const lecturersResponse = await getLecturers()
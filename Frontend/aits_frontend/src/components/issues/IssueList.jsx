@@ -12,6 +12,8 @@ const IssueList = () => {
   const [issues, setIssues] = useState([]);
   const [filteredIssues, setFilteredIssues] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [nextPage, setNextPage] = useState(null);
   const [error, setError] = useState(null);
   const [filters, setFilters] = useState({
     status: 'all',
@@ -20,11 +22,15 @@ const IssueList = () => {
   });
 
   useEffect(() => {
+    // Status and priority are filtered by the API, so every page matches them
     const fetchIssues = async () => {
       try {
-        const response = await api.get('/issues/');
+        const params = {};
+        if (filters.status !== 'all') params.status = filters.status;
+        if (filters.priority !== 'all') params.priority = filters.priority;
+        const response = await api.get('/issues/', { params });
         setIssues(response.data);
-        setFilteredIssues(response.data);
+        setNextPage(response.pagination?.next || null);
         setLoading(false);
       } catch (error) {
         console.error('Error fetching issues:', error);
@@ -34,22 +40,26 @@ const IssueList = () => {
     };
 
     fetchIssues();
-  }, []);
+  }, [filters.status, filters.priority]);
+
+  const loadMore = async () => {
+    try {
+      setLoadingMore(true);
+      const response = await api.get(nextPage);
+      setIssues(prev => [...prev, ...response.data]);
+      setNextPage(response.pagination?.next || null);
+    } catch (error) {
+      console.error('Error fetching issues:', error);
+      setError('Failed to load more issues. Please try again.');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
   useEffect(() => {
-    // Apply filters
+    // Search the issues loaded so far
     let result = issues;
     
-    // Filter by status
-    if (filters.status !== 'all') {
-      result = result.filter(issue => issue.status === filters.status);
-    }
-    
-    // Filter by priority
-    if (filters.priority !== 'all') {
-      result = result.filter(issue => issue.priority === filters.priority);
-    }
-    
     // Filter by search term
     if (filters.search) {
       const searchTerm = filters.search.toLowerCase();
@@ -60,7 +70,7 @@ const IssueList = () => {
     }
     
     setFilteredIssues(result);
-  }, [filters, issues]);
+  }, [filters.search, issues]);
 
   const handleFilterChange = (e) => {
     const { name, value } = e.target;
@@ -192,6 +202,14 @@ const IssueList = () => {
           ))}
         </div>
       )}
+
+      {nextPage && (
+        <div className="load-more">
+          <button className="btn btn-secondary" onClick={loadMore} disabled={loadingMore}>
+            {loadingMore ? 'Loading...' : 'Load more issues'}
+          </button>
+        </div>
+      )}
     </div>
   );
 };
@@ -10,15 +10,21 @@ const AssignedIssuesList = () => {
   const { user } = useAuth()
   const [issues, setIssues] = useState([])
   const [loading, setLoading] = useState(true)
+  const [loadingMore, setLoadingMore] = useState(false)
+  const [nextPage, setNextPage] = useState(null)
   const [filter, setFilter] = useState("all") 
 
+  // A lecturer also sees issues they created; keep the ones assigned to them
+  const assignedToUser = (rows) => rows.filter((issue) => issue.assigned_to === user.id)
+
   useEffect(() => {
     const fetchAssignedIssues = async () => {
       try {
-        const response = await api.get("/issues/")
-        // Filter issues assigned to the current lecturer
-        const userIssues = response.data.filter((issue) => issue.assigned_to === user.id)
-        setIssues(userIssues)
+        // The status filter is applied by the API, so every page matches it
+        const params = filter === "all" ? {} : { status: filter }
+        const response = await api.get("/issues/", { params })
+        setIssues(assignedToUser(response.data))
+        setNextPage(response.pagination?.next || null)
         setLoading(false)
       } catch (error) { 
         console.error("Error fetching assigned issues:", error)
@@ -27,7 +33,20 @@ const AssignedIssuesList = () => {
     }
 
     fetchAssignedIssues()
-  }, [user.id]) 
+  }, [user.id, filter]) 
+
+  const loadMore = async () => {
+    try {
+      setLoadingMore(true)
+      const response = await api.get(nextPage)
+      setIssues((prev) => [...prev, ...assignedToUser(response.data)])
+      setNextPage(response.pagination?.next || null)
+    } catch (error) {
+      console.error("Error fetching assigned issues:", error)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
 
   const getStatusClass = (status) => { 
     switch (status) {
@@ -44,8 +63,6 @@ const AssignedIssuesList = () => {
     }
   }
 
-  const filteredIssues = filter === "all" ? issues : issues.filter((issue) => issue.status === filter)
-
   return (
     <div className="container mx-auto px-4 py-8">
       <div className="flex justify-between items-center mb-6">
@@ -83,13 +100,13 @@ const AssignedIssuesList = () => {
           <div className="inline-block animate-spin rounded-full h-8 w-8 border-4 border-blue-500 border-t-transparent"></div>
           <p className="mt-2">Loading issues...</p>
         </div>
-      ) : filteredIssues.length === 0 ? (
+      ) : issues.length === 0 ? (
         <div className="bg-white rounded-lg shadow p-8 text-center">
           <p className="text-gray-600">No {filter !== "all" ? filter.replace("_", " ") : ""} issues assigned to you.</p>
         </div>
       ) : (
         <div className="grid gap-6 md:grid-cols-2 lg:grid-cols-3">
-          {filteredIssues.map((issue) => (
+          {issues.map((issue) => (
             <div key={issue.id} className="bg-white rounded-lg shadow overflow-hidden">
               <div className="p-6">
                 <div className="flex justify-between items-start mb-4">
@@ -114,6 +131,18 @@ const AssignedIssuesList = () => {
           ))}
         </div>
       )}
+
+      {nextPage && (
+        <div className="text-center mt-6">
+          <button
+            onClick={loadMore}
+            disabled={loadingMore}
+            className="px-4 py-2 rounded-md bg-gray-200 hover:bg-gray-300 disabled:opacity-50"
+          >
+            {loadingMore ? "Loading..." : "Load more issues"}
+          </button>
+        </div>
+      )}
     </div>
   )
 }
@@ -2,7 +2,7 @@
 
 import { useState, useEffect } from "react"
 import { useParams, useNavigate } from "react-router-dom"
-import api from "../../services/api"
+import api, { getComments } from "../../services/api"
 import { useAuth } from "../../contexts/AuthContext"
 
 
@@ -25,8 +25,7 @@ const IssueDetail = () => {
         const issueResponse = await api.get(`/issues/${id}/`)
         setIssue(issueResponse.data)
 
-        const commentsResponse = await api.get(`/issues/${id}/comments/`)
-        setComments(commentsResponse.data)
+        setComments(await getComments(id))
 
         setLoading(false)
       } catch (error) {
@@ -56,8 +55,7 @@ const IssueDetail = () => {
       await api.post(`/issues/${id}/comments/`, statusComment)
 
       // Refresh comments
-      const commentsResponse = await api.get(`/issues/${id}/comments/`)
-      setComments(commentsResponse.data)
+      setComments(await getComments(id))
     } catch (error) {
       console.error("Error updating issue status:", error)
     } finally {
@@ -11,26 +11,38 @@ const NotificationBell = () => {
   const [unreadCount, setUnreadCount] = useState(0)
   const [isOpen, setIsOpen] = useState(false) 
   const [loading, setLoading] = useState(true)
+  const [loadingMore, setLoadingMore] = useState(false)
+  const [nextPage, setNextPage] = useState(null)
   const bellRef = useRef(null)
 
-  useEffect(() => {
-    const fetchNotifications = async () => {
-      try {
-        const response = await api.get("/notifications/")
-        const data = response.data
-        setNotifications(data)
-        setUnreadCount(data.filter((n) => !n.is_read).length) 
-        setLoading(false)
-      } catch (error) {
-        console.error("Error fetching notifications:", error)
-        setLoading(false)
-      }
-    } 
+  // Counted on the server: the list only holds the pages loaded so far
+  const fetchUnreadCount = async () => {
+    try {
+      const response = await api.get("/notifications/unread-count/")
+      setUnreadCount(response.data.unread)
+    } catch (error) {
+      console.error("Error fetching unread notifications:", error)
+    }
+  }
 
-    fetchNotifications()
+  const fetchNotifications = async () => {
+    try {
+      setLoading(true)
+      const response = await api.get("/notifications/")
+      setNotifications(response.data)
+      setNextPage(response.pagination?.next || null)
+      setLoading(false)
+    } catch (error) {
+      console.error("Error fetching notifications:", error)
+      setLoading(false)
+    }
+  }
+
+  useEffect(() => {
+    fetchUnreadCount()
 
     // Set up polling for new notifications every 30 seconds
-    const intervalId = setInterval(fetchNotifications, 30000)
+    const intervalId = setInterval(fetchUnreadCount, 30000)
 
     const handleClickOutside = (event) => {
       if (bellRef.current && !bellRef.current.contains(event.target)) {
@@ -46,6 +58,38 @@ const NotificationBell = () => {
     }
   }, [])
 
+  const togglePanel = () => {
+    if (!isOpen) {
+      // Start from the newest page each time the panel opens
+      fetchNotifications()
+    }
+    setIsOpen(!isOpen)
+  }
+
+  const loadMore = async () => {
+    try {
+      setLoadingMore(true)
+      const response = await api.get(nextPage)
+      setNotifications((prev) => [...prev, ...response.data])
+      setNextPage(response.pagination?.next || null)
+    } catch (error) {
+      console.error("Error fetching notifications:", error)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
+  const handleNotificationUpdate = (updatedNotifications) => {
+    setNotifications(updatedNotifications)
+    fetchUnreadCount()
+  }
+
+  return () => {
+      clearInterval(intervalId)
+      document.removeEventListener("mousedown", handleClickOutside)
+    }
+  }, [])
+
   const togglePanel = () => {
     setIsOpen(!isOpen)
   }
@@ -65,8 +109,12 @@ const NotificationBell = () => {
       {isOpen && (
         <NotificationList
           notifications={notifications}
+          unreadCount={unreadCount}
           loading={loading}
           onUpdate={handleNotificationUpdate}
+          hasMore={Boolean(nextPage)}
+          loadingMore={loadingMore}
+          onLoadMore={loadMore}
           onClose={() => setIsOpen(false)}
         />
       )}
@@ -4,7 +4,16 @@ import { Link } from "react-router-dom"
 import api from "../../services/api"
 import { X, Check, AlertCircle, MessageSquare, Clock, User } from "lucide-react"
  
-const NotificationList = ({ notifications, loading, onUpdate, onClose }) => {
+const NotificationList = ({
+  notifications,
+  unreadCount,
+  loading,
+  onUpdate,
+  onClose,
+  hasMore,
+  loadingMore,
+  onLoadMore,
+}) => {
   const markAsRead = async (id) => {
     try {
       await api.post(`/notifications/${id}/mark_read/`)
@@ -54,7 +63,7 @@ const NotificationList = ({ notifications, loading, onUpdate, onClose }) => {
       <div className="notification-header">
         <h3>Notifications</h3>
         <div className="notification-actions">
-          <button onClick={markAllAsRead} className="btn btn-sm" disabled={!notifications.some((n) => !n.is_read)}>
+          <button onClick={markAllAsRead} className="btn btn-sm" disabled={!unreadCount}>
             Mark all as read
           </button>
           <button onClick={onClose} className="btn btn-sm btn-icon">
@@ -90,6 +99,13 @@ const NotificationList = ({ notifications, loading, onUpdate, onClose }) => {
             </div>
           ))
         )}
+        {hasMore && (
+          <div className="notification-more">
+            <button onClick={onLoadMore} className="btn btn-sm" disabled={loadingMore}>
+              {loadingMore ? "Loading..." : "Load more"}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   )
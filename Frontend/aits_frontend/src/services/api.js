@@ -21,7 +21,16 @@ api.interceptors.request.use(
 
 // Add a response interceptor
 api.interceptors.response.use(
-  (response) => response,
+  (response) => {
+    // List endpoints are cursor-paginated; keep callers working with plain arrays
+    // and expose the cursor links on response.pagination
+    const data = response.data
+    if (data && Array.isArray(data.results) && "next" in data) {
+      response.pagination = { next: data.next, previous: data.previous }
+      response.data = data.results
+    }
+    return response
+  },
   async (error) => {
     const originalRequest = error.config
 
@@ -69,6 +78,23 @@ api.interceptors.response.use(
   },
 )
 
+// Largest page the API serves (KeysetPagination.max_page_size)
+export const MAX_PAGE_SIZE = 200
+
+// Every row of a paginated list, following the cursor links; only for lookups
+// that stay small, such as the lecturers offered for assignment
+export const fetchAll = async (url, params = {}) => {
+  const rows = []
+  let response = await api.get(url, { params: { page_size: MAX_PAGE_SIZE, ...params } })
+  rows.push(...response.data)
+  while (response.pagination?.next) {
+    // The next link is absolute and already carries the parameters
+    response = await api.get(response.pagination.next)
+    rows.push(...response.data)
+  }
+  return rows
+}
+
 // Issues API
 export const getIssues = async () => {
   const response = await api.get("/issues/")
@@ -100,10 +126,15 @@ export const assignIssue = async (id, userId) => {
   return response.data
 }
 
+// changes: any of { assigned_to, status, priority }; resolves to { updated, unchanged, not_found } id lists
+export const bulkUpdateIssues = async (ids, changes) => {
+  const response = await api.post("/issues/bulk/", { ids, ...changes })
+  return response.data
+}
+
 // Comments API
 export const getComments = async (issueId) => {
-  const response = await api.get(`/issues/${issueId}/comments/`)
-  return response.data
+  return fetchAll(`/issues/${issueId}/comments/`)
 }
 
 export const addComment = async (issueId, content) => {
@@ -132,13 +163,11 @@ export const markAllNotificationsAsRead = async () => {
 
 // Users API
 export const getLecturers = async () => {
-  const response = await api.get("/users/?role=lecturer")
-  return response.data
+  return fetchAll("/users/", { role: "lecturer" })
 }
 
 export const getUsers = async () => {
-  const response = await api.get("/users/")
-  return response.data
+  return fetchAll("/users/")
 }
 
 export default api